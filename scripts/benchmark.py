@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+性能基准（Benchmark）
+
+角色定位：parse_html_to_config() 与 post_process() 没有任何性能测试，变慢只能等批量任务
+超时才发现。本脚本在全部 15 个参考模板上运行解析器和后处理，并生成 10 倍、100 倍规模的合成页面
+（重复区块、大量图片槽位、大段内联数据），记录：
+
+  - 耗时：重复 N 次取最小值（ms）
+  - 峰值内存：单独一次 tracemalloc 运行的 Python 分配峰值（KB）
+  - 吞吐量：输入字节 / 耗时（MB/s）
+
+结果保存为 JSON 基线，之后每次运行都与基线对比，耗时或内存超出容差时退出码为 1。
+
+用法：
+  python benchmark.py [--templates=01,05] [--scales=1,10,100] [--repeat=3]
+                      [--stages=minify,prune-css] [--baseline=PATH] [--tolerance=0.25] [--save] [--json]
+
+默认基线：<skill>/.benchmarks/baseline.json（不存在时本次结果写为基线）；--save 用本次结果覆盖基线。
+基线与机器相关，不纳入版本库。
+"""
+
+import gc
+import glob
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from generate_landing_page import IMAGE_SLOT_MAP, OPTIONAL_STAGES, post_process
+from instrumentation import reset_traced_peak, traced_peak
+from parse_landing_page import parse_html_to_config
+
+
+SKILL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(SKILL_DIR, "template")
+DEFAULT_BASELINE = os.path.join(SKILL_DIR, ".benchmarks", "baseline.json")
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+BASELINE_VERSION = 1
+OPERATIONS = ("parse", "post_process")
+
+# 低于这些绝对差值的变化视为噪声，不判定为回退
+NOISE_FLOOR_MS = 2.0
+NOISE_FLOOR_KB = 256
+
+# 合成页面每倍规模追加的图片槽位数与内联数据记录数
+SYNTHETIC_GALLERY_SLOTS = 4
+SYNTHETIC_DATA_RECORDS = 200
+
+# 槽位 → 生成合成 config 时写入的字段（列表字段按槽位数量填充）
+_SLOT_FIELDS = {
+    "hero": ("hero", "image_url", False),
+    "immersive": ("immersive_section", "image_url", False),
+    "video-thumbnail": ("video_thumbnail", None, False),
+    "step": ("connected_sections", "image_url", True),
+    "section": ("structured_sections", "image_url", True),
+    "content": ("content_sections", "image_url", True),
+    "gallery": ("gallery_images", "url", True),
+    "story": ("story_images", None, True),
+    "editorial": ("editorial_images", "url", True),
+}
+assert set(_SLOT_FIELDS) == set(IMAGE_SLOT_MAP.values())
+
+_SECTION_RE = re.compile(r"<section\b.*?</section\s*>", re.I | re.S)
+_SLOT_RE = re.compile(r"""<img\b[^>]*\sdata-slot\s*=\s*["']([^"']+)["']""", re.I)
+_INSERT_RE = re.compile(r"[ \t]*(?:<footer\b|</main\s*>|</body\s*>)", re.I)
+
+
+# ============================================================
+# 合成页面
+# ============================================================
+
+def synthesize_page(html: str, scale: int) -> str:
+    """
+    生成 scale 倍规模的页面：<section> 重复 scale 倍，追加 scale × SYNTHETIC_GALLERY_SLOTS 个
+    gallery 槽位和 scale × SYNTHETIC_DATA_RECORDS 条内联 JSON 数据。scale 为 1 时原样返回。
+    """
+    if scale <= 1:
+        return html
+    sections = _SECTION_RE.findall(html)
+    gallery = "".join(
+        f'\n            <img data-slot="gallery" src="" alt="Gallery {i + 1}">'
+        for i in range(scale * SYNTHETIC_GALLERY_SLOTS)
+    )
+    records = [
+        {"id": i, "name": f"Item {i}", "description": "Lorem ipsum dolor sit amet " * 2, "tags": ["a", "b", "c"]}
+        for i in range(scale * SYNTHETIC_DATA_RECORDS)
+    ]
+    block = (
+        "\n".join(sections * (scale - 1))
+        + f'\n    <section class="bench-gallery">{gallery}\n    </section>\n'
+        + f'    <script type="application/json" id="bench-data">{json.dumps(records)}</script>\n'
+    )
+    m = _INSERT_RE.search(html)
+    at = m.start() if m else len(html)
+    return html[:at] + block + html[at:]
+
+
+def synthesize_config(template_id: str, html: str) -> dict:
+    """按页面中各槽位的数量生成刚好填满槽位的 config"""
+    counts = {}
+    for slot in _SLOT_RE.findall(html):
+        counts[slot] = counts.get(slot, 0) + 1
+    config = {
+        "template_id": template_id,
+        "product": {
+            "name": "Benchmark Product",
+            "tagline": "A synthetic page for performance baselines",
+            "description": "Synthetic product used by benchmark.py to measure parsing and post-processing cost.",
+        },
+        "features": [{"title": f"Feature {i}", "description": "Synthetic feature"} for i in range(1, 5)],
+        "cta": {"text": "Get started", "url": "#"},
+    }
+    for slot, count in sorted(counts.items()):
+        if slot not in _SLOT_FIELDS:
+            continue
+        key, field, is_list = _SLOT_FIELDS[slot]
+        urls = [f"https://example.com/bench/{slot}-{i}.jpg" for i in range(count if is_list else 1)]
+        values = [{field: url} if field else url for url in urls]
+        config[key] = values if is_list else values[0]
+    return config
+
+
+# ============================================================
+# 测量
+# ============================================================
+
+def _measure(fn, repeat: int) -> dict:
+    """耗时取 repeat 次最小值；峰值内存单独运行一次（tracemalloc 本身会拖慢执行）"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # 被测函数内的 StageTimer 会重置 tracemalloc 峰值，需用 traced_peak() 取整次运行的峰值
+        reset_traced_peak()
+        fn()
+        peak = traced_peak()
+    finally:
+        tracemalloc.stop()
+    return {"time_ms": round(min(times), 3), "peak_kb": round(peak / 1024, 1)}
+
+
+def run_benchmarks(templates=None, scales=DEFAULT_SCALES, repeat: int = DEFAULT_REPEAT, stages=()) -> dict:
+    """返回 {"<template>@<scale>x/<operation>": {"time_ms", "peak_kb", "bytes", "mb_per_s"}}"""
+    paths = sorted(glob.glob(os.path.join(TEMPLATE_DIR, "landing-page-*.html")))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="lp-bench-") as work:
+        for path in paths:
+            number = re.search(r"(\d+)\.html$", path).group(1)
+            if templates and number not in templates:
+                continue
+            template_id = f"template-{number}"
+            with open(path, "r", encoding="utf-8") as f:
+                original = f.read()
+            for scale in scales:
+                html = synthesize_page(original, scale)
+                case_dir = os.path.join(work, f"{number}-{scale}")
+                os.makedirs(case_dir)
+                html_path = os.path.join(case_dir, "draft.html")
+                config_path = os.path.join(case_dir, "config.json")
+                with open(html_path, "w", encoding="utf-8") as f:
+                    f.write(html)
+                with open(config_path, "w", encoding="utf-8") as f:
+                    json.dump(synthesize_config(template_id, html), f, ensure_ascii=False)
+                size = os.path.getsize(html_path)
+
+                operations = {
+                    "parse": lambda: parse_html_to_config(html_path, os.path.join(case_dir, "parsed.json")),
+                    "post_process": lambda: post_process(
+                        config_path, html_path, os.path.join(case_dir, "output", "index.html"),
+                        stages=stages, options={"force": True}),
+                }
+                for operation in OPERATIONS:
+                    result = _measure(operations[operation], repeat)
+                    result["bytes"] = size
+                    result["mb_per_s"] = round(size / 1024 / 1024 / (result["time_ms"] / 1000), 2) \
+                        if result["time_ms"] else 0.0
+                    results[f"{template_id}@{scale}x/{operation}"] = result
+    return results
+
+
+# ============================================================
+# 基线
+# ============================================================
+
+def load_baseline(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return baseline if baseline.get("version") == BASELINE_VERSION else {}
+
+
+def save_baseline(path: str, results: dict, settings: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    document = {
+        "version": BASELINE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": settings,
+        "results": results,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    与基线逐项对比，返回 [{"case", "metric", "baseline", "current", "change", "regression"}, ...]；
+    变化超过 tolerance 且绝对差值超过噪声下限时 regression 为 True。
+    """
+    rows = []
+    for case, current in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        for metric, floor in (("time_ms", NOISE_FLOOR_MS), ("peak_kb", NOISE_FLOOR_KB)):
+            old, new = base.get(metric), current[metric]
+            if not old:
+                continue
+            change = new / old - 1
+            rows.append({
+                "case": case,
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(change, 4),
+                "regression": change > tolerance and new - old > floor,
+            })
+    return rows
+
+
+def _print_results(results: dict, rows: list, baseline_path: str, has_baseline: bool):
+    changes = {(r["case"], r["metric"]): r for r in rows}
+
+    def fmt_change(case, metric):
+        row = changes.get((case, metric))
+        if not row:
+            return ""
+        mark = " ✗" if row["regression"] else ""
+        return f"{row['change'] * 100:+.0f}%{mark}"
+
+    print("=" * 84)
+    print("  性能基准")
+    print("=" * 84)
+    print(f"\n  {'用例':<34}{'耗时(ms)':>10}{'变化':>9}{'峰值(KB)':>11}{'变化':>9}{'MB/s':>9}")
+    for case, r in results.items():
+        print(f"  {case:<34}{r['time_ms']:>10.1f}{fmt_change(case, 'time_ms'):>9}"
+              f"{r['peak_kb']:>11.0f}{fmt_change(case, 'peak_kb'):>9}{r['mb_per_s']:>9.2f}")
+
+    regressions = [r for r in rows if r["regression"]]
+    if not has_baseline:
+        print(f"\n  ✓ 基线不存在或运行设置不同，本次结果已写入基线: {baseline_path}")
+    elif regressions:
+        print(f"\n  ✗ {len(regressions)} 项超出基线容差:")
+        for r in regressions:
+            unit = "ms" if r["metric"] == "time_ms" else "KB"
+            print(f"      - {r['case']} {r['metric']}: {r['baseline']:.1f} → {r['current']:.1f} {unit}"
+                  f"（{r['change'] * 100:+.0f}%）")
+    else:
+        print(f"\n  ✓ 与基线相比无回退（{baseline_path}）")
+    print("=" * 84)
+
+
+def main():
+    """命令行入口"""
+    flags = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    if "help" in flags:
+        print(__doc__)
+        sys.exit(0)
+
+    try:
+        templates = {t.strip().zfill(2) for t in flags["templates"].split(",")} if flags.get("templates") else None
+        scales = tuple(int(s) for s in flags["scales"].split(",")) if flags.get("scales") else DEFAULT_SCALES
+        repeat = max(1, int(flags.get("repeat") or DEFAULT_REPEAT))
+        tolerance = float(flags.get("tolerance") or DEFAULT_TOLERANCE)
+    except ValueError as e:
+        print(f"✗ 参数错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    stages = tuple(s for s in (flags.get("stages") or "").split(",") if s)
+    unknown = [s for s in stages if s not in OPTIONAL_STAGES]
+    if unknown:
+        print(f"✗ 未知的可选阶段: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+    baseline_path = flags.get("baseline") or DEFAULT_BASELINE
+
+    settings = {"repeat": repeat, "stages": list(stages)}
+    results = run_benchmarks(templates, scales, repeat, stages)
+    baseline = load_baseline(baseline_path)
+    # 设置不同（阶段组合、重复次数）的基线不可比
+    comparable = baseline.get("settings") == settings
+    rows = compare(results, baseline.get("results", {}), tolerance) if comparable else []
+
+    if "save" in flags or not comparable:
+        save_baseline(baseline_path, {**(baseline.get("results", {}) if comparable else {}), **results}, settings)
+
+    if "json" in flags:
+        print(json.dumps({"results": results, "comparison": rows}, ensure_ascii=False, indent=2))
+    else:
+        _print_results(results, rows, baseline_path, comparable)
+    sys.exit(1 if any(r["regression"] for r in rows) and "save" not in flags else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+CDN 导出（预压缩 + 内容哈希资源 + manifest.json）
+
+角色定位：output/ 部署在 CDN 之后，文件名不变导致每次发布都要重新压缩 index.html
+并回源校验全部资源。本模块把 output/ 导出为可直接上传的发布目录：
+
+  1. assets/ 下的文件改名为带内容哈希的文件名（如 hero.3f2a9c1b7e.jpg），可设置永久缓存；
+     文件名中已带内容哈希的（styles.<hash>.css、响应式变体、字体子集）保持原名，
+     只有真正带内容哈希名的文件才在 manifest 中标记为可永久缓存
+  2. 改写 HTML / CSS 中对这些文件的引用（相对路径按引用文件所在目录解析）
+  3. 并行为文本文件（html/css/js/svg/json 等）生成 .gz 和 .br 同级文件
+     （.br 需要 brotli：pip install brotli；未安装时只生成 .gz）
+  4. 写出 manifest.json：每个文件的哈希、大小、压缩后大小、是否可永久缓存；
+     与上次导出对比得到变化的文件列表，发布时只需上传这些文件
+
+用法：
+  python cdn_export.py <output_dir> <dist_dir> [--workers=N]
+
+也可在后处理时直接导出：
+  python generate_landing_page.py config.json draft.html output/index.html --export[=dist]
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 10
+COMPRESSIBLE_EXTENSIONS = {".html", ".htm", ".css", ".js", ".mjs", ".json", ".svg", ".txt",
+                           ".xml", ".webmanifest", ".map", ".ico"}
+# 需要改写内部引用的文本文件
+REWRITE_EXTENSIONS = {".html", ".htm", ".css"}
+DEFAULT_WORKERS = 8
+_COMPRESSED = (("gzip", ".gz"), ("br", ".br"))
+
+# 文件名末尾的哈希段：与文件内容的 sha256 前缀一致时视为已是内容哈希名（如 styles.<hash>.css）
+_HASH_SUFFIX_RE = re.compile(r"[.-]([0-9a-f]{%d})$" % HASH_LENGTH)
+# 其他阶段生成、哈希取自输入（源图 / 源字体 + 参数）而非输出内容的文件，同样内容不可变
+_PREHASHED_ASSETS = (
+    ("assets/responsive/", re.compile(r"-\d+w-[0-9a-f]{10}$")),   # responsive_images：{stem}-{宽}w-{哈希}
+    ("assets/fonts/", re.compile(r"\.[0-9a-f]{10}$")),             # font_subset：{字体}-{字重}.{哈希}
+)
+# 引用候选：相对路径形式的文件名（不含协议和查询串）
+_REF_RE = re.compile(r"(?<![\w./@:%-])((?:\.{1,2}/)*[\w@%-][\w./@%-]*\.[A-Za-z0-9]{1,10})(?![\w/])")
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _walk_site(output_dir: str) -> list:
+    """站点文件的相对路径（跳过隐藏文件、临时文件和已有的压缩副本）"""
+    files = []
+    for root, dirs, names in os.walk(output_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.startswith(".") or name.endswith((".tmp", ".gz", ".br")):
+                continue
+            rel = os.path.relpath(os.path.join(root, name), output_dir)
+            files.append(rel.replace(os.sep, "/"))
+    return files
+
+
+def _is_prehashed(rel: str, data: bytes) -> bool:
+    """文件名是否已带内容哈希（photo-20250101.jpg、logo.deadbeef.svg 这类名称不算）"""
+    stem = os.path.splitext(os.path.basename(rel))[0]
+    match = _HASH_SUFFIX_RE.search(stem)
+    if match and _digest(data).startswith(match.group(1)):
+        return True
+    return any(rel.startswith(prefix) and pattern.search(stem) for prefix, pattern in _PREHASHED_ASSETS)
+
+
+def _hashed_name(rel: str, data: bytes) -> str:
+    if _is_prehashed(rel, data):
+        return rel
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}.{_digest(data)[:HASH_LENGTH]}{ext}"
+
+
+def rewrite_references(text: str, rel: str, renames: dict) -> tuple:
+    """
+    改写 text（位于 rel）中指向已改名文件的相对路径引用。返回 (新文本, 改写次数)。
+    """
+    base = os.path.dirname(rel)
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        ref = match.group(1)
+        target = os.path.normpath(os.path.join(base, ref)).replace(os.sep, "/")
+        new = renames.get(target)
+        if new is None:
+            return ref
+        count += 1
+        new_ref = os.path.relpath(new, base or ".").replace(os.sep, "/")
+        return new_ref
+
+    return _REF_RE.sub(replace, text), count
+
+
+def _compress(task: tuple) -> dict:
+    """线程池 worker：写出文件的 .gz / .br 同级文件（压缩后不更小时不写）"""
+    path, data = task
+    sizes = {}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        with open(path + ".gz", "wb") as f:
+            f.write(gz)
+        sizes["gzip"] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            with open(path + ".br", "wb") as f:
+                f.write(br)
+            sizes["br"] = len(br)
+    return sizes
+
+
+def _load_manifest(dist_dir: str) -> dict:
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def export_output(output_dir: str, dist_dir: str, workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    将 output_dir 导出到 dist_dir。返回统计：
+    {"files", "changed": [...], "removed": [...], "renamed", "rewritten", "bytes", "text_bytes",
+     "gzip_bytes", "br_bytes", "brotli": 是否生成 .br, "dist_dir"}
+    """
+    output_dir = os.path.abspath(output_dir)
+    dist_dir = os.path.abspath(dist_dir)
+    if dist_dir == output_dir or dist_dir.startswith(output_dir + os.sep):
+        raise ValueError(f"导出目录不能位于输出目录内: {dist_dir}")
+    os.makedirs(dist_dir, exist_ok=True)
+
+    # 1. 读取站点文件；先确定二进制资源的哈希名，再改写并哈希引用它们的 CSS，最后处理 HTML
+    files = _walk_site(output_dir)
+    contents = {}
+    for rel in files:
+        with open(os.path.join(output_dir, rel), "rb") as f:
+            contents[rel] = f.read()
+
+    def order(rel):
+        ext = os.path.splitext(rel)[1].lower()
+        if ext in (".html", ".htm"):
+            return 2
+        return 1 if ext in REWRITE_EXTENSIONS else 0
+
+    renames = {}
+    hashed = set()  # 导出后文件名带内容哈希的文件（改名的 + 原本就带哈希的）
+    rewritten = 0
+    for rel in sorted(files, key=order):
+        data = contents[rel]
+        if os.path.splitext(rel)[1].lower() in REWRITE_EXTENSIONS:
+            text, count = rewrite_references(data.decode("utf-8"), rel, renames)
+            if count:
+                data = text.encode("utf-8")
+                contents[rel] = data
+                rewritten += count
+        if rel.startswith("assets/"):
+            renames[rel] = _hashed_name(rel, data)
+            hashed.add(rel)
+
+    # 2. 对比上次的 manifest，只写出变化的文件
+    previous = _load_manifest(dist_dir).get("files", {})
+    manifest = {}
+    changed = []
+    tasks = []
+    for rel in files:
+        data = contents[rel]
+        name = renames.get(rel, rel)
+        digest = _digest(data)
+        entry = {
+            "source": rel,
+            "hash": digest,
+            "size": len(data),
+            # 哈希文件名的资源内容永不变化，可设置 Cache-Control: immutable
+            "immutable": rel in hashed,
+        }
+        path = os.path.join(dist_dir, name)
+        old = previous.get(name)
+        if (old and old.get("hash") == digest and os.path.exists(path)
+                and all(os.path.exists(path + ext) for key, ext in _COMPRESSED if key in old)):
+            entry.update({key: old[key] for key, _ in _COMPRESSED if key in old})
+            manifest[name] = entry
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        for _, ext in _COMPRESSED:
+            if os.path.exists(path + ext):
+                os.remove(path + ext)
+        if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            tasks.append((name, (path, data)))
+        manifest[name] = entry
+        changed.append(name)
+
+    # 3. 并行预压缩
+    if tasks:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as pool:
+            for (name, _), sizes in zip(tasks, pool.map(_compress, [task for _, task in tasks])):
+                manifest[name].update(sizes)
+
+    # 4. 删除上次导出、本次已不存在的文件
+    removed = []
+    for name in previous:
+        if name in manifest:
+            continue
+        path = os.path.join(dist_dir, name)
+        for stale in [path] + [path + ext for _, ext in _COMPRESSED]:
+            if os.path.exists(stale):
+                os.remove(stale)
+        removed.append(name)
+
+    document = {
+        "version": 1,
+        "files": dict(sorted(manifest.items())),
+        "assets": dict(sorted(renames.items())),
+    }
+    tmp_path = os.path.join(dist_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(dist_dir, MANIFEST_NAME))
+
+    text_entries = [e for name, e in manifest.items()
+                    if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS]
+    return {
+        "dist_dir": dist_dir,
+        "files": len(manifest),
+        "changed": changed,
+        "removed": removed,
+        "renamed": sum(1 for rel, name in renames.items() if rel != name),
+        "rewritten": rewritten,
+        "bytes": sum(e["size"] for e in manifest.values()),
+        "text_bytes": sum(e["size"] for e in text_entries),
+        "gzip_bytes": sum(e.get("gzip", e["size"]) for e in text_entries),
+        "br_bytes": sum(e.get("br", e["size"]) for e in text_entries),
+        "brotli": brotli is not None,
+    }
+
+
+def export_summary(stats: dict) -> str:
+    summary = (
+        f"{stats['files']} 个文件（{len(stats['changed'])} 个变化"
+        + (f"，删除 {len(stats['removed'])} 个" if stats["removed"] else "")
+        + f"），{stats['renamed']} 个资源改为哈希文件名 → {stats['dist_dir']}"
+    )
+    if not stats["brotli"]:
+        summary += "（未安装 brotli，仅生成 .gz）"
+    return summary
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if len(args) < 2:
+        print("CDN 导出")
+        print()
+        print("用法:")
+        print("  python cdn_export.py <output_dir> <dist_dir> [--workers=N]")
+        print()
+        print("assets/ 改为内容哈希文件名并改写引用，文本文件生成 .gz/.br，写出 manifest.json。")
+        sys.exit(1)
+
+    try:
+        stats = export_output(args[0], args[1], int(flags.get("workers", DEFAULT_WORKERS)))
+    except Exception as e:
+        print(f"✗ 导出失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print("=" * 60)
+    print("  CDN 导出报告")
+    print("=" * 60)
+    print(f"\n  ✓ {export_summary(stats)}")
+    print(f"  文本文件: {stats['text_bytes'] / 1024:.1f} KB 原始, gzip 后 {stats['gzip_bytes'] / 1024:.1f} KB"
+          + (f", brotli 后 {stats['br_bytes'] / 1024:.1f} KB" if stats["brotli"] else ""))
+    if stats["changed"]:
+        print(f"\n  需要上传的文件（{len(stats['changed'])} 个）:")
+        for name in stats["changed"]:
+            print(f"    + {name}")
+    print(f"\n  清单: {os.path.join(stats['dist_dir'], MANIFEST_NAME)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,761 @@
+#!/usr/bin/env python3
+"""
+内联 CSS 优化（Unused CSS Pruning / Critical CSS）
+
+角色定位：模板的内联 <style> 往往 30–70 KB，其中包含 AI 草稿已删除的区块、变体和动画。
+本模块解析内联 CSS，把选择器与页面中实际存在的元素比对，删除无法命中的规则和未被引用的
+@keyframes，并报告每页节省的字节数。
+
+用法：
+  python css_optimizer.py <input.html> <output.html> [--keep=cls1,cls2]
+
+也可作为 generate_landing_page.py 的可选阶段：--prune-css [--prune-css-keep=cls1,cls2]
+
+判定规则（宁可多留，不可误删）：
+  1. 选择器中的 类名 / id / 标签名 / 属性名 必须全部出现在文档中才算命中；
+     伪类、伪元素以及 :not()/:is()/:where()/:has() 等函数参数不作要求
+  2. 内联脚本中出现的所有标识符都视为"可能被脚本添加"的类名、id 和标签
+     （classList.add、createElement 等）
+  3. @media / @supports 等条件规则递归处理，内部规则全部删除时整块删除；
+     @font-face、@page 等其他 at-rule 原样保留
+  4. @keyframes 仅在保留规则、内联 style 属性和脚本中都未引用其名称时删除
+
+关键 CSS：--critical-css [--critical-sections=N]
+  只内联首屏区域（导航、Hero 及其后的区块，范围按模板在 CRITICAL_FOLD 中配置）用到的规则，
+  其余规则写入带内容哈希的 assets/css/styles.<hash>.css 并以非阻塞方式加载。
+"""
+
+import hashlib
+import os
+import re
+import sys
+from html.parser import HTMLParser
+
+
+# 内部为规则列表、可递归处理的条件 at-rule
+NESTED_AT_RULES = {"media", "supports", "layer", "container", "document", "-moz-document"}
+KEYFRAMES_AT_RULES = {"keyframes", "-webkit-keyframes", "-moz-keyframes", "-o-keyframes"}
+
+_STYLE_BLOCK_RE = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.I | re.S)
+_IDENT_RE = re.compile(r"-?[A-Za-z_][\w-]*")
+_ANIMATION_DECL_RE = re.compile(r"animation(?:-name)?\s*:\s*([^;}]+)", re.I)
+
+
+# ============================================================
+# CSS 解析
+# ============================================================
+
+def _skip_comment(css: str, i: int) -> int:
+    end = css.find("*/", i + 2)
+    return len(css) if end == -1 else end + 2
+
+
+def _skip_string(css: str, i: int) -> int:
+    quote = css[i]
+    i += 1
+    while i < len(css):
+        c = css[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == quote or c == "\n":
+            return i + 1
+        i += 1
+    return i
+
+
+def _find_block_end(css: str, i: int) -> int:
+    """i 指向 "{" 之后，返回匹配的 "}" 位置（不存在时为文本末尾）"""
+    depth = 1
+    n = len(css)
+    while i < n:
+        c = css[i]
+        if c == "/" and css.startswith("/*", i):
+            i = _skip_comment(css, i)
+            continue
+        if c in "\"'":
+            i = _skip_string(css, i)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return n
+
+
+def parse_stylesheet(css: str, start: int = 0, end: int = None) -> list:
+    """
+    将样式表解析为节点列表（保留原文位置，便于按片段删除而不改变其余格式）。
+    节点：{"type": "rule" | "at", "name": at-rule 名（小写，无 @）, "prelude": 选择器或条件,
+           "start", "end"（整个节点的切片范围）, "body": (起, 止) 或 None,
+           "children": 条件 at-rule 的子节点列表或 None}
+    """
+    end = len(css) if end is None else end
+    nodes = []
+    i = start
+    while i < end:
+        c = css[i]
+        if c.isspace() or c == "}" or c == ";":
+            i += 1
+            continue
+        if c == "/" and css.startswith("/*", i):
+            i = _skip_comment(css, i)
+            continue
+
+        node_start = i
+        # 读取 prelude，直到 "{" 或 ";"
+        while i < end:
+            c = css[i]
+            if c == "/" and css.startswith("/*", i):
+                i = _skip_comment(css, i)
+                continue
+            if c in "\"'":
+                i = _skip_string(css, i)
+                continue
+            if c == "(":
+                depth = 1
+                i += 1
+                while i < end and depth:
+                    if css[i] in "\"'":
+                        i = _skip_string(css, i)
+                        continue
+                    depth += {"(": 1, ")": -1}.get(css[i], 0)
+                    i += 1
+                continue
+            if c in "{;":
+                break
+            i += 1
+        prelude = css[node_start:i].strip()
+        is_at = prelude.startswith("@")
+        name = _IDENT_RE.match(prelude, 1).group(0).lower() if is_at and _IDENT_RE.match(prelude, 1) else ""
+
+        if i >= end or css[i] == ";":
+            # 语句型 at-rule（@import / @charset）或残缺内容，原样保留
+            i = min(i + 1, end)
+            nodes.append({"type": "at", "name": name, "prelude": prelude,
+                          "start": node_start, "end": i, "body": None, "children": None})
+            continue
+
+        body_start = i + 1
+        body_end = min(_find_block_end(css, body_start), end)
+        node = {
+            "type": "at" if is_at else "rule",
+            "name": name,
+            "prelude": prelude,
+            "start": node_start,
+            "end": min(body_end + 1, end),
+            "body": (body_start, body_end),
+            "children": None,
+        }
+        if is_at and name in NESTED_AT_RULES:
+            node["children"] = parse_stylesheet(css, body_start, body_end)
+        nodes.append(node)
+        i = node["end"]
+    return nodes
+
+
+def split_selector_list(selector: str) -> list:
+    """按顶层逗号拆分选择器列表（忽略括号和中括号内的逗号）"""
+    parts = []
+    depth = 0
+    current = []
+    for c in selector:
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        if c == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(c)
+    parts.append("".join(current).strip())
+    return [p for p in parts if p]
+
+
+# ============================================================
+# 选择器匹配
+# ============================================================
+
+_FUNCTIONAL_PSEUDO_RE = re.compile(r"::?[\w-]+\(")
+_PSEUDO_RE = re.compile(r"::?[\w-]+")
+_ATTR_RE = re.compile(r"\[\s*([\w-]+)[^\]]*\]")
+_CLASS_RE = re.compile(r"\.((?:[\w-]|\\.)+)")
+_ID_RE = re.compile(r"#((?:[\w-]|\\.)+)")
+_COMBINATOR_RE = re.compile(r"[\s>+~]+")
+_ESCAPE_RE = re.compile(r"\\(.)")
+
+
+def _strip_functional_pseudos(selector: str) -> str:
+    out = []
+    pos = 0
+    for m in _FUNCTIONAL_PSEUDO_RE.finditer(selector):
+        if m.start() < pos:
+            continue
+        out.append(selector[pos:m.start()])
+        depth = 1
+        i = m.end()
+        while i < len(selector) and depth:
+            depth += {"(": 1, ")": -1}.get(selector[i], 0)
+            i += 1
+        pos = i
+    out.append(selector[pos:])
+    return "".join(out)
+
+
+def selector_requirements(selector: str) -> tuple:
+    """
+    提取单个复杂选择器命中所需的 (标签名集合, 类名集合, id 集合, 属性名集合)。
+    """
+    sel = _strip_functional_pseudos(selector)
+    sel = _PSEUDO_RE.sub("", sel)
+    attrs = {a.lower() for a in _ATTR_RE.findall(sel)}
+    sel = _ATTR_RE.sub("", sel)
+    classes = {_ESCAPE_RE.sub(r"\1", c) for c in _CLASS_RE.findall(sel)}
+    ids = {_ESCAPE_RE.sub(r"\1", i) for i in _ID_RE.findall(sel)}
+    sel = _CLASS_RE.sub(" ", _ID_RE.sub(" ", sel))
+    tags = set()
+    for compound in _COMBINATOR_RE.split(sel):
+        m = _IDENT_RE.match(compound)
+        if m and m.group(0) != "-":
+            tags.add(m.group(0).lower())
+    return tags, classes, ids, attrs
+
+
+class _DocumentInventory(HTMLParser):
+    """收集文档中的标签、类名、id、属性名、内联脚本和 style 属性"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags = set()
+        self.classes = set()
+        self.ids = set()
+        self.attrs = set()
+        self.scripts = []
+        self.inline_styles = []
+        self._in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        for name, value in attrs:
+            self.attrs.add(name)
+            if value is None:
+                continue
+            if name == "class":
+                self.classes.update(value.split())
+            elif name == "id":
+                self.ids.add(value)
+            elif name == "style":
+                self.inline_styles.append(value)
+            elif name.startswith("on"):
+                self.scripts.append(value)
+        self._in_script = tag == "script"
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self._in_script = False
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_script = False
+
+    def handle_data(self, data):
+        if self._in_script:
+            self.scripts.append(data)
+
+
+def collect_document_tokens(html: str, keep=()) -> dict:
+    """
+    返回文档令牌集合：{"tags", "classes", "ids", "attrs", "dynamic", "inline_styles"}。
+    dynamic 为内联脚本中出现的全部标识符，视为可能被脚本动态添加的类名 / id / 标签
+    （classList.add、createElement、innerHTML 模板字符串等）。
+    """
+    parser = _DocumentInventory()
+    parser.feed(html)
+    parser.close()
+    dynamic = set(keep)
+    for script in parser.scripts:
+        dynamic.update(_IDENT_RE.findall(script))
+    return {
+        "tags": parser.tags | {word.lower() for word in dynamic},
+        "classes": parser.classes | dynamic,
+        "ids": parser.ids | dynamic,
+        "attrs": parser.attrs,
+        "dynamic": dynamic,
+        "inline_styles": parser.inline_styles,
+    }
+
+
+def selector_matches(selector: str, tokens: dict) -> bool:
+    """保守判断单个选择器是否可能命中文档中的元素"""
+    tags, classes, ids, attrs = selector_requirements(selector)
+    return (
+        tags <= tokens["tags"]
+        and classes <= tokens["classes"]
+        and ids <= tokens["ids"]
+        and attrs <= tokens["attrs"]
+    )
+
+
+def rule_matches(selector_list: str, tokens: dict) -> bool:
+    return any(selector_matches(sel, tokens) for sel in split_selector_list(selector_list))
+
+
+# ============================================================
+# 剪枝
+# ============================================================
+
+def _keyframes_name(prelude: str) -> str:
+    parts = prelude.split(None, 1)
+    return parts[1].strip().strip("\"'") if len(parts) > 1 else ""
+
+
+def _animation_names(text: str) -> set:
+    names = set()
+    for value in _ANIMATION_DECL_RE.findall(text):
+        names.update(_IDENT_RE.findall(value))
+    return names
+
+
+def _rebuild(css: str, nodes: list, keep_node, start: int, end: int) -> tuple:
+    """按 keep_node 判定复制保留的节点片段；返回 (新文本, 删除的规则数)"""
+    out = []
+    pos = start
+    removed = 0
+    for node in nodes:
+        if node["children"] is not None:
+            body_start, body_end = node["body"]
+            inner, inner_removed = _rebuild(css, node["children"], keep_node, body_start, body_end)
+            removed += inner_removed
+            if inner.strip():
+                out.append(css[pos:body_start])
+                out.append(inner)
+                pos = body_end
+                continue
+            keep = False
+        else:
+            keep = keep_node(node)
+        if not keep:
+            out.append(css[pos:node["start"]].rstrip(" \t"))
+            pos = node["end"]
+            removed += 1
+    out.append(css[pos:end])
+    return "".join(out), removed
+
+
+def _walk_rules(nodes: list):
+    for node in nodes:
+        if node["children"] is not None:
+            yield from _walk_rules(node["children"])
+        else:
+            yield node
+
+
+def stylesheet_stats(css: str) -> dict:
+    """样式表规模：{"rules", "selectors", "at_rules", "keyframes"}（条件规则内部的规则计入 rules）"""
+    stats = {"rules": 0, "selectors": 0, "at_rules": 0, "keyframes": 0}
+
+    def walk(nodes):
+        for node in nodes:
+            if node["type"] == "rule":
+                stats["rules"] += 1
+                stats["selectors"] += len(split_selector_list(node["prelude"]))
+                continue
+            stats["at_rules"] += 1
+            if node["name"] in KEYFRAMES_AT_RULES:
+                stats["keyframes"] += 1
+            if node["children"] is not None:
+                walk(node["children"])
+
+    walk(parse_stylesheet(css))
+    return stats
+
+
+def prune_stylesheet(css: str, tokens: dict) -> tuple:
+    """
+    删除单个样式表中无法命中的规则和未引用的 @keyframes。
+    返回 (新 CSS, {"rules_removed", "keyframes_removed"})。
+    """
+    nodes = parse_stylesheet(css)
+
+    # 1. 删除无法命中的普通规则
+    def keep_rule(node):
+        if node["type"] != "rule":
+            return True
+        return rule_matches(node["prelude"], tokens)
+
+    pruned, rules_removed = _rebuild(css, nodes, keep_rule, 0, len(css))
+
+    # 2. 基于剩余规则、style 属性和脚本判断 @keyframes 是否被引用
+    nodes = parse_stylesheet(pruned)
+    used = set(tokens["dynamic"])
+    for node in _walk_rules(nodes):
+        if node["type"] == "rule" and node["body"]:
+            used |= _animation_names(pruned[node["body"][0]:node["body"][1]])
+    for style in tokens["inline_styles"]:
+        used |= _animation_names(style)
+
+    def keep_keyframes(node):
+        if node["type"] == "at" and node["name"] in KEYFRAMES_AT_RULES:
+            return _keyframes_name(node["prelude"]) in used
+        return True
+
+    pruned, keyframes_removed = _rebuild(pruned, nodes, keep_keyframes, 0, len(pruned))
+    return pruned, {"rules_removed": rules_removed, "keyframes_removed": keyframes_removed}
+
+
+def prune_unused_css(html: str, keep=()) -> tuple:
+    """
+    对 HTML 中所有内联 <style> 执行剪枝。keep 为额外保留的类名 / id（外部脚本添加的状态类等）。
+    返回 (新 HTML, 统计)。
+    """
+    tokens = collect_document_tokens(html, keep)
+    stats = {"rules_removed": 0, "keyframes_removed": 0, "bytes_before": 0, "bytes_after": 0}
+
+    def prune_block(match):
+        css = match.group(2)
+        pruned, block_stats = prune_stylesheet(css, tokens)
+        stats["rules_removed"] += block_stats["rules_removed"]
+        stats["keyframes_removed"] += block_stats["keyframes_removed"]
+        stats["bytes_before"] += len(css.encode("utf-8"))
+        stats["bytes_after"] += len(pruned.encode("utf-8"))
+        return match.group(1) + pruned + match.group(3)
+
+    html = _STYLE_BLOCK_RE.sub(prune_block, html)
+    stats["bytes_saved"] = stats["bytes_before"] - stats["bytes_after"]
+    return html, stats
+
+
+def prune_css_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    keep = ctx["options"].get("prune-css-keep") or ""
+    html, stats = prune_unused_css(html, [k for k in str(keep).split(",") if k])
+    stats["summary"] = (
+        f"删除 {stats['rules_removed']} 条规则、{stats['keyframes_removed']} 个 @keyframes，"
+        f"CSS {stats['bytes_before'] / 1024:.1f} KB → {stats['bytes_after'] / 1024:.1f} KB"
+        f"（节省 {stats['bytes_saved'] / 1024:.1f} KB）"
+    )
+    ctx["report"]["stages"]["prune-css"] = stats
+    return html
+
+
+# ============================================================
+# 关键 CSS（Critical CSS）
+# ============================================================
+
+# 首屏范围：<body> 下第 sections 个顶层 <section> 结束之前的所有顶层元素
+# （导航、固定背景装饰层、Hero 及其后的区块）。模板 Hero 均为 100vh，
+# 默认取 Hero + 下一个区块，以覆盖短屏和移动端露出的部分。
+DEFAULT_FOLD = {"sections": 2}
+CRITICAL_FOLD = {
+    "template-01": {"sections": 2},
+    "template-02": {"sections": 2},
+    "template-03": {"sections": 2},
+    "template-04": {"sections": 2},   # Hero + 数据条
+    "template-05": {"sections": 2},
+    "template-06": {"sections": 2},
+    "template-07": {"sections": 2},
+    "template-08": {"sections": 2},
+    "template-09": {"sections": 2},
+    "template-10": {"sections": 2},
+    "template-11": {"sections": 2},   # 固定 ambient 背景 + Hero + 便当网格
+    "template-12": {"sections": 1},   # 电影感 Hero 占满首屏，其后区块有 160px 留白
+    "template-13": {"sections": 2},   # 固定 ASCII 背景 + Hero + 对比区块
+    "template-14": {"sections": 2},   # 固定背景层 + Hero + 功能区块
+    "template-15": {"sections": 1},   # cinematic 区块即首屏（100vh, 最小 700px）
+}
+
+# 与层叠顺序无关、始终内联的全局 at-rule
+GLOBAL_AT_RULES = {"font-face", "property", "counter-style", "font-feature-values", "page", "namespace"}
+
+CRITICAL_CSS_DIR = "css"
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+              "source", "track", "wbr"}
+_HEAD_END_RE = re.compile(r"</head\s*>", re.I)
+_CSS_URL_RE = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""", re.I)
+# 绝对 URL、协议相对、根路径、data:/blob: 及片段引用不受样式表位置影响
+_ABSOLUTE_URL_RE = re.compile(r"^(?:[a-z][a-z0-9+.-]*:|/|#)", re.I)
+
+
+class _FoldInventory(_DocumentInventory):
+    """在文档令牌之外，单独收集首屏范围内元素（及 html/body）的令牌"""
+
+    def __init__(self, sections: int):
+        super().__init__()
+        self.sections = sections
+        self.fold = {"tags": set(), "classes": set(), "ids": set(), "attrs": set()}
+        self._stack = None  # 进入 <body> 后为未闭合的元素栈
+        self._sections_done = 0
+
+    def _record(self, tag, attrs):
+        self.fold["tags"].add(tag)
+        for name, value in attrs:
+            self.fold["attrs"].add(name)
+            if value is None:
+                continue
+            if name == "class":
+                self.fold["classes"].update(value.split())
+            elif name == "id":
+                self.fold["ids"].add(value)
+
+    def handle_starttag(self, tag, attrs):
+        super().handle_starttag(tag, attrs)
+        if tag in ("html", "body"):
+            self._record(tag, attrs)
+            if tag == "body":
+                self._stack = []
+            return
+        if self._stack is None:
+            return
+        if self._sections_done < self.sections:
+            self._record(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        super().handle_startendtag(tag, attrs)
+        # 自闭合标签（SVG 内常见）没有结束标签，撤销入栈
+        if self._stack and tag not in _VOID_TAGS and self._stack[-1] == tag:
+            self._stack.pop()
+
+    def handle_endtag(self, tag):
+        super().handle_endtag(tag)
+        if not self._stack or tag not in self._stack:
+            return
+        # 容忍未闭合的子元素：弹出到匹配的开始标签为止
+        while self._stack:
+            top = self._stack.pop()
+            if top == tag:
+                break
+        if tag == "section" and not self._stack:
+            self._sections_done += 1
+
+
+def fold_spec(template_id: str, sections: int = None) -> dict:
+    spec = dict(CRITICAL_FOLD.get(template_id, DEFAULT_FOLD))
+    if sections:
+        spec["sections"] = sections
+    return spec
+
+
+def collect_fold_tokens(html: str, sections: int) -> dict:
+    """
+    返回首屏令牌集合，结构同 collect_document_tokens，另含 "static"：首屏中静态出现的令牌。
+    脚本标识符只在与静态令牌组合时生效（如 .navbar.scrolled），避免脚本里查询的
+    .faq-item 等首屏外类名被误判为关键规则。
+    """
+    parser = _FoldInventory(sections)
+    parser.feed(html)
+    parser.close()
+    dynamic = set()
+    for script in parser.scripts:
+        dynamic.update(_IDENT_RE.findall(script))
+    static = parser.fold
+    return {
+        "tags": static["tags"] | {word.lower() for word in dynamic},
+        "classes": static["classes"] | dynamic,
+        "ids": static["ids"] | dynamic,
+        "attrs": static["attrs"],
+        "dynamic": dynamic,
+        "static": static,
+        "inline_styles": parser.inline_styles,
+    }
+
+
+def _is_critical_selector(selector: str, tokens: dict) -> bool:
+    tags, classes, ids, attrs = selector_requirements(selector)
+    if not (tags <= tokens["tags"] and classes <= tokens["classes"]
+            and ids <= tokens["ids"] and attrs <= tokens["attrs"]):
+        return False
+    static = tokens["static"]
+    if not (tags or classes or ids or attrs):
+        return True  # *、:root 等
+    return bool(tags & static["tags"] or classes & static["classes"]
+                or ids & static["ids"] or attrs & static["attrs"])
+
+
+def _node_text(css: str, node: dict) -> str:
+    return css[node["start"]:node["end"]].strip()
+
+
+def split_critical(css: str, tokens: dict) -> tuple:
+    """
+    将样式表拆分为 (关键 CSS, 延迟加载 CSS, 统计)。
+
+    关键 CSS 内联后一直保留，外部样式表在其后加载。为保证层叠顺序与原样式表一致，
+    出现在第一条延迟规则之后的关键规则会同时写入外部样式表（统计为 duplicated）。
+    """
+    stats = {"rules_inlined": 0, "rules_deferred": 0, "duplicated": 0}
+    state = {"deferred": False}
+    nodes = parse_stylesheet(css)
+
+    def rule_is_critical(node):
+        return any(_is_critical_selector(sel, tokens) for sel in split_selector_list(node["prelude"]))
+
+    # 关键规则引用的 @keyframes 一并内联
+    critical_animations = set()
+    for node in _walk_rules(nodes):
+        if node["type"] == "rule" and node["body"] and rule_is_critical(node):
+            critical_animations |= _animation_names(css[node["body"][0]:node["body"][1]])
+
+    def split(nodes):
+        critical, deferred = [], []
+        for node in nodes:
+            if node["children"] is not None:
+                inner_critical, inner_deferred = split(node["children"])
+                head = css[node["start"]:node["body"][0]].strip()
+                if inner_critical:
+                    critical.append(head + "\n" + "\n".join(inner_critical) + "\n}")
+                if inner_deferred:
+                    deferred.append(head + "\n" + "\n".join(inner_deferred) + "\n}")
+                continue
+            text = _node_text(css, node)
+            if node["type"] == "at":
+                if node["body"] is None or node["name"] in GLOBAL_AT_RULES:
+                    critical.append(text)
+                elif node["name"] in KEYFRAMES_AT_RULES:
+                    name = _keyframes_name(node["prelude"])
+                    (critical if name in critical_animations else deferred).append(text)
+                else:
+                    deferred.append(text)
+                continue
+            if rule_is_critical(node):
+                critical.append(text)
+                stats["rules_inlined"] += 1
+                if state["deferred"]:
+                    deferred.append(text)
+                    stats["duplicated"] += 1
+            else:
+                deferred.append(text)
+                stats["rules_deferred"] += 1
+                state["deferred"] = True
+        return critical, deferred
+
+    critical, deferred = split(nodes)
+    return "\n".join(critical), "\n".join(deferred), stats
+
+
+def rebase_css_urls(css: str, prefix: str) -> str:
+    """给相对 url() 加上 prefix，使从页面目录解析的路径在另一目录下的样式表中仍然有效"""
+    def rewrite(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if _ABSOLUTE_URL_RE.match(url):
+            return match.group(0)
+        return f"url({quote}{prefix}{url}{quote})"
+    return _CSS_URL_RE.sub(rewrite, css)
+
+
+def extract_critical_css(html: str, output_dir: str, template_id: str = None, sections: int = None) -> tuple:
+    """
+    将 <head> 中的内联样式拆分为首屏关键 CSS（保留内联）和其余部分（写入
+    assets/css/styles.<hash>.css，以 media="print" + onload 方式非阻塞加载）。
+    返回 (新 HTML, 统计)。
+    """
+    spec = fold_spec(template_id, sections)
+    stats = {"fold_sections": spec["sections"], "stylesheet": None,
+             "bytes_before": 0, "critical_bytes": 0, "deferred_bytes": 0,
+             "rules_inlined": 0, "rules_deferred": 0, "duplicated": 0}
+
+    head_end = _HEAD_END_RE.search(html)
+    blocks = [m for m in _STYLE_BLOCK_RE.finditer(html, 0, head_end.start() if head_end else len(html))
+              if "media=" not in m.group(1).lower()]
+    if not blocks:
+        return html, stats
+
+    css = "\n".join(m.group(2) for m in blocks)
+    tokens = collect_fold_tokens(html, spec["sections"])
+    critical, deferred, split_stats = split_critical(css, tokens)
+    stats.update(split_stats)
+    stats["bytes_before"] = len(css.encode("utf-8"))
+    stats["critical_bytes"] = len(critical.encode("utf-8"))
+    stats["deferred_bytes"] = len(deferred.encode("utf-8"))
+
+    replacement = blocks[0].group(1) + "\n" + critical + "\n" + blocks[0].group(3)
+    if deferred.strip():
+        # 外部样式表位于 assets/css/，其中的相对 url() 需相对页面目录改写
+        depth = f"assets/{CRITICAL_CSS_DIR}".count("/") + 1
+        data = rebase_css_urls(deferred, "../" * depth).encode("utf-8")
+        name = f"styles.{hashlib.sha256(data).hexdigest()[:10]}.css"
+        css_dir = os.path.join(output_dir, "assets", CRITICAL_CSS_DIR)
+        os.makedirs(css_dir, exist_ok=True)
+        path = os.path.join(css_dir, name)
+        if not os.path.exists(path):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        href = f"assets/{CRITICAL_CSS_DIR}/{name}"
+        stats["stylesheet"] = href
+        replacement += (
+            f'\n    <link rel="stylesheet" href="{href}" media="print" onload="this.media=\'all\'">'
+            f'\n    <noscript><link rel="stylesheet" href="{href}"></noscript>'
+        )
+
+    out = []
+    pos = 0
+    for i, match in enumerate(blocks):
+        out.append(html[pos:match.start()])
+        if i == 0:
+            out.append(replacement)
+        pos = match.end()
+    out.append(html[pos:])
+    return "".join(out), stats
+
+
+def critical_css_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    sections = ctx["options"].get("critical-sections")
+    html, stats = extract_critical_css(
+        html,
+        ctx["output_dir"],
+        ctx["config"].get("template_id"),
+        int(sections) if sections else None,
+    )
+    if stats["stylesheet"]:
+        stats["summary"] = (
+            f"首屏 {stats['fold_sections']} 个区块，内联 {stats['rules_inlined']} 条规则 "
+            f"{stats['critical_bytes'] / 1024:.1f} KB（原 {stats['bytes_before'] / 1024:.1f} KB），"
+            f"其余 {stats['deferred_bytes'] / 1024:.1f} KB 延迟加载 → {stats['stylesheet']}"
+        )
+    else:
+        stats["summary"] = "所有规则均为首屏关键规则，未生成外部样式表"
+    ctx["report"]["stages"]["critical-css"] = stats
+    return html
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    keep = [a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--keep=")]
+    if len(args) < 2:
+        print("内联 CSS 剪枝")
+        print()
+        print("用法:")
+        print("  python css_optimizer.py <input.html> <output.html> [--keep=cls1,cls2]")
+        sys.exit(1)
+
+    try:
+        with open(args[0], "r", encoding="utf-8") as f:
+            html = f.read()
+        html, stats = prune_unused_css(html, [k for value in keep for k in value.split(",") if k])
+        with open(args[1], "w", encoding="utf-8") as f:
+            f.write(html)
+    except Exception as e:
+        print(f"✗ 剪枝失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print("=" * 60)
+    print("  内联 CSS 剪枝报告")
+    print("=" * 60)
+    print(f"\n  ✓ 删除规则: {stats['rules_removed']} 条")
+    print(f"  ✓ 删除 @keyframes: {stats['keyframes_removed']} 个")
+    print(f"\n  CSS 大小: {stats['bytes_before'] / 1024:.1f} KB → {stats['bytes_after'] / 1024:.1f} KB"
+          f"（节省 {stats['bytes_saved'] / 1024:.1f} KB）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
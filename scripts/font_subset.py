@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+字体本地化与子集化（Font Self-hosting）
+
+角色定位：template-13 / 14 / 15 通过 <link> 引用 Google Fonts 样式表，带来一次阻塞渲染的
+跨域请求，也违反 config-guide.md 中 output/ 完全自包含的约定；中文页面使用完整字体则动辄
+数 MB。本模块把字体引用解析到本地字体缓存目录，按页面实际用到的字符生成子集：
+
+  1. 解析 Google Fonts <link>（css2 与旧版 css 语法）和内联 CSS 中引用远程文件的 @font-face，
+     得到所需的 (字体族, 字重, 斜体)
+  2. 在本地字体缓存目录中按字体内部名称匹配（静态字体按 usWeightClass，可变字体按 wght 轴范围）
+  3. 收集页面文本（可见文本、alt/title 等属性、CSS content、内联脚本中的字符串）作为子集字符集
+  4. 子集写入 output/assets/fonts/*.woff2（文件名带输入哈希，未变化时直接复用），
+     生成 font-display: swap 的 @font-face，并为首选字重添加 <link rel="preload">
+  5. 某个 <link> 中只要有字体在缓存中找不到，就保留该 <link> 原样并给出警告
+
+作为 generate_landing_page.py 的可选阶段使用：--self-host-fonts
+  --font-cache=DIR     本地字体缓存目录（默认 assets/fonts/，即本技能目录下）
+  --font-preload=N     preload 的字体文件数（默认 2）
+
+依赖：fontTools（pip install fonttools brotli）。未安装 brotli 时退化为 WOFF 格式；
+未安装 fontTools 时阶段跳过并给出提示。
+"""
+
+import hashlib
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, unquote_plus, urlsplit
+
+try:
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+except ImportError:  # fontTools 为可选依赖
+    subset = None
+    TTFont = None
+
+try:
+    import brotli  # noqa: F401  fontTools 写 WOFF2 需要
+    DEFAULT_FLAVOR = "woff2"
+except ImportError:
+    DEFAULT_FLAVOR = "woff"
+
+from css_optimizer import parse_stylesheet
+
+
+DEFAULT_FONT_CACHE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "fonts")
+DEFAULT_PRELOAD = 2
+FONTS_DIR = "fonts"
+FONT_EXTENSIONS = (".ttf", ".otf", ".woff", ".woff2")
+FONT_MIME_TYPES = {"woff2": "font/woff2", "woff": "font/woff"}
+
+# 始终保留的字符：ASCII 可打印字符（计数器、表单输入等动态文本）
+BASE_CHARSET = "".join(chr(c) for c in range(0x20, 0x7F))
+WEIGHT_KEYWORDS = {"normal": 400, "bold": 700}
+
+GOOGLE_FONTS_HOSTS = ("fonts.googleapis.com", "fonts.gstatic.com")
+_LINK_RE = re.compile(r"<link\b[^>]*>", re.I)
+_HREF_RE = re.compile(r"""\bhref\s*=\s*(["'])(.*?)\1""", re.I | re.S)
+_STYLE_BLOCK_RE = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.I | re.S)
+_HEAD_OPEN_RE = re.compile(r"<head\b[^>]*>", re.I)
+_DECL_RE = r"{name}\s*:\s*([^;}}]+)"
+_URL_RE = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""", re.I)
+_CSS_CONTENT_RE = re.compile(r"""content\s*:\s*(["'])(.*?)\1""", re.I)
+_JS_STRING_RE = re.compile(r"""(["'`])((?:\\.|(?!\1).)*)\1""", re.S)
+_TEXT_ATTRS = {"alt", "title", "placeholder", "aria-label", "value", "content", "label"}
+
+
+# ============================================================
+# 字体需求解析
+# ============================================================
+
+def parse_google_fonts_url(url: str) -> list:
+    """
+    解析 Google Fonts 样式表 URL，返回 [(family, weight, italic), ...]。
+    支持 css2（family=Inter:ital,wght@0,400;1,700）和旧版 css（family=Roboto:400,700italic|Lato）。
+    """
+    parts = urlsplit(url)
+    faces = []
+    families = parse_qs(parts.query).get("family", [])
+    if parts.path.rstrip("/").endswith("css"):
+        families = [f for value in families for f in value.split("|")]
+    for spec in families:
+        name, _, variants = unquote_plus(spec).partition(":")
+        name = name.strip()
+        if not variants:
+            faces.append((name, 400, False))
+            continue
+        if "@" in variants:  # css2
+            axes, _, tuples = variants.partition("@")
+            axes = axes.split(",")
+            for item in tuples.split(";"):
+                values = dict(zip(axes, item.split(",")))
+                italic = values.get("ital", "0") == "1"
+                weight = values.get("wght", "400")
+                if ".." in weight:  # 范围：wght@100..900
+                    low, high = (int(w) for w in weight.split(".."))
+                    faces.extend((name, w, italic) for w in range(low, high + 1, 100))
+                else:
+                    faces.append((name, int(weight), italic))
+        else:  # 旧版 css
+            for item in variants.split(","):
+                italic = item.endswith(("italic", "i"))
+                digits = re.match(r"\d+", item)
+                faces.append((name, int(digits.group(0)) if digits else 400, italic))
+    return list(dict.fromkeys(faces))
+
+
+def _declaration(body: str, name: str) -> str:
+    m = re.search(_DECL_RE.format(name=re.escape(name)), body, re.I)
+    return m.group(1).strip() if m else ""
+
+
+def parse_font_face(body: str) -> dict:
+    """解析 @font-face 描述符：family、字重范围、斜体与 src 中的 URL"""
+    family = _declaration(body, "font-family").strip("\"'")
+    weights = []
+    for value in _declaration(body, "font-weight").lower().split():
+        if value.isdigit():
+            weights.append(int(value))
+        elif value in WEIGHT_KEYWORDS:
+            weights.append(WEIGHT_KEYWORDS[value])
+    weights = weights or [400]
+    style = _declaration(body, "font-style").lower()
+    return {
+        "family": family,
+        "weight": (min(weights), max(weights)),
+        "italic": style.startswith(("italic", "oblique")),
+        "urls": [m.group(2) for m in _URL_RE.finditer(_declaration(body, "src"))],
+    }
+
+
+def _is_remote(url: str) -> bool:
+    return url.startswith(("http://", "https://", "//"))
+
+
+# ============================================================
+# 本地字体缓存
+# ============================================================
+
+_INDEX_CACHE = {}
+
+
+def font_cache_digest(cache_dir: str) -> str:
+    """字体缓存目录的摘要（文件名 + 大小 + mtime），供构建缓存判断字体是否有增删改"""
+    h = hashlib.sha256(os.path.abspath(cache_dir).encode())
+    try:
+        names = sorted(n for n in os.listdir(cache_dir) if n.lower().endswith(FONT_EXTENSIONS))
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        st = os.stat(os.path.join(cache_dir, name))
+        h.update(f"\0{name}\0{st.st_size}\0{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def index_font_cache(cache_dir: str) -> list:
+    """
+    扫描字体缓存目录，返回 [{"path", "family", "weight": (min, max), "italic"}, ...]。
+    结果按目录内容（文件名 + mtime）缓存在进程内。
+    """
+    try:
+        names = sorted(n for n in os.listdir(cache_dir) if n.lower().endswith(FONT_EXTENSIONS))
+    except FileNotFoundError:
+        return []
+    key = (cache_dir, tuple((n, os.path.getmtime(os.path.join(cache_dir, n))) for n in names))
+    if key in _INDEX_CACHE:
+        return _INDEX_CACHE[key]
+
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            font = TTFont(path, lazy=True)
+        except Exception:
+            continue  # 无法解析的文件（或缺少 brotli 的 WOFF2）跳过
+        with font:
+            names_table = font["name"]
+            family = names_table.getDebugName(16) or names_table.getDebugName(1) or ""
+            os2 = font["OS/2"] if "OS/2" in font else None
+            weight = (os2.usWeightClass,) * 2 if os2 else (400, 400)
+            italic = bool(os2 and os2.fsSelection & 1) or (font["post"].italicAngle != 0 if "post" in font else False)
+            if "fvar" in font:
+                for axis in font["fvar"].axes:
+                    if axis.axisTag == "wght":
+                        weight = (int(axis.minValue), int(axis.maxValue))
+        entries.append({"path": path, "family": family.strip(), "weight": weight, "italic": italic})
+    _INDEX_CACHE.clear()
+    _INDEX_CACHE[key] = entries
+    return entries
+
+
+def resolve_face(index: list, family: str, weight: tuple, italic: bool):
+    """在缓存索引中查找覆盖所需字重范围的字体文件；找不到返回 None"""
+    family = family.lower()
+    for entry in index:
+        if entry["family"].lower() != family or entry["italic"] != italic:
+            continue
+        if entry["weight"][0] <= weight[0] and weight[1] <= entry["weight"][1]:
+            return entry
+    return None
+
+
+# ============================================================
+# 页面字符集
+# ============================================================
+
+class _TextCollector(HTMLParser):
+    """收集可能以网页字体渲染的全部字符"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chars = set(BASE_CHARSET)
+        self._raw = None
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if value and name in _TEXT_ATTRS:
+                self.chars.update(value)
+        self._raw = tag if tag in ("script", "style") else None
+
+    def handle_endtag(self, tag):
+        self._raw = None
+
+    def handle_data(self, data):
+        if self._raw == "style":
+            for m in _CSS_CONTENT_RE.finditer(data):
+                self.chars.update(m.group(2))
+        elif self._raw == "script":
+            # 脚本写入页面的文本（打字机效果、计数器等）
+            for m in _JS_STRING_RE.finditer(data):
+                self.chars.update(m.group(2))
+        else:
+            self.chars.update(data)
+
+
+def page_charset(html: str) -> str:
+    collector = _TextCollector()
+    collector.feed(html)
+    collector.close()
+    return "".join(sorted(c for c in collector.chars if not c.isspace() or c == " "))
+
+
+# ============================================================
+# 子集化
+# ============================================================
+
+def _subset_font(task: tuple) -> tuple:
+    """进程池 worker：生成一个子集文件，已存在时直接复用。返回 (输出路径, 字节数, 是否新生成)"""
+    src_path, out_path, text, flavor = task
+    if os.path.exists(out_path):
+        return out_path, os.path.getsize(out_path), False
+    options = subset.Options()
+    options.flavor = flavor
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    font = subset.load_font(src_path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    tmp_path = out_path + ".tmp"
+    subset.save_font(font, tmp_path, options)
+    font.close()
+    os.replace(tmp_path, out_path)
+    return out_path, os.path.getsize(out_path), True
+
+
+def _run_tasks(tasks: list) -> list:
+    # 批量模式下已处于守护进程中，不能再创建子进程，改为串行
+    if len(tasks) <= 1 or multiprocessing.current_process().daemon:
+        return [_subset_font(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1)) as pool:
+        return list(pool.map(_subset_font, tasks))
+
+
+def _line_span(html: str, start: int, end: int) -> tuple:
+    """标签独占一行时扩展到整行（删除时不留下空行）"""
+    line_start = html.rfind("\n", 0, start) + 1
+    line_end = html.find("\n", end)
+    line_end = len(html) if line_end == -1 else line_end + 1
+    if html[line_start:start].strip() or html[end:line_end].strip():
+        return start, end
+    return line_start, line_end
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def _face_css(family: str, weight: tuple, italic: bool, href: str, flavor: str, extra: str = "") -> str:
+    weight_value = str(weight[0]) if weight[0] == weight[1] else f"{weight[0]} {weight[1]}"
+    return (
+        "@font-face {"
+        f" font-family: '{family}';"
+        f" font-style: {'italic' if italic else 'normal'};"
+        f" font-weight: {weight_value};"
+        " font-display: swap;"
+        f" src: url({href}) format('{flavor}');"
+        f"{extra} }}"
+    )
+
+
+# ============================================================
+# 页面改写
+# ============================================================
+
+def self_host_fonts(html: str, output_dir: str, cache_dir: str = DEFAULT_FONT_CACHE,
+                    preload: int = DEFAULT_PRELOAD, flavor: str = DEFAULT_FLAVOR) -> tuple:
+    """
+    将页面字体引用改为 output/assets/fonts/ 下的本地子集。返回 (新 HTML, 统计)。
+    """
+    stats = {"faces": 0, "subsets": 0, "reused": 0, "source_bytes": 0, "subset_bytes": 0,
+             "links_removed": 0, "chars": 0, "flavor": flavor, "missing": [], "files": []}
+    index = index_font_cache(cache_dir)
+    charset = page_charset(html)
+    stats["chars"] = len(charset)
+    out_dir = os.path.join(output_dir, "assets", FONTS_DIR)
+
+    jobs = {}  # 源文件 → (族名, 字重范围, 斜体)
+    link_sources = set()  # 由 <link> 引入、需要新增 @font-face 的源文件
+
+    def request(entry, family):
+        jobs.setdefault(entry["path"], (family, entry["weight"], entry["italic"]))
+
+    # 1. Google Fonts <link>：全部字体都能在本地解析时才移除
+    link_plans = []
+    for match in _LINK_RE.finditer(html):
+        tag = match.group(0)
+        href = _HREF_RE.search(tag)
+        if not href or urlsplit(href.group(2)).hostname not in GOOGLE_FONTS_HOSTS:
+            continue
+        if "stylesheet" not in tag.lower():
+            link_plans.append((match, None))  # preconnect / dns-prefetch，视样式表是否移除而定
+            continue
+        faces = parse_google_fonts_url(href.group(2).replace("&amp;", "&"))
+        resolved = [(face, resolve_face(index, face[0], (face[1], face[1]), face[2])) for face in faces]
+        missing = [f"{family} {weight}{' italic' if italic else ''}"
+                   for (family, weight, italic), entry in resolved if entry is None]
+        if missing:
+            stats["missing"].extend(missing)
+            link_plans.append((match, False))
+            continue
+        for (family, _, _), entry in resolved:
+            request(entry, family)
+            link_sources.add(entry["path"])
+        link_plans.append((match, True))
+
+    # 2. 内联 CSS 中引用远程文件的 @font-face
+    face_rewrites = []  # (style 块匹配, 节点, 源文件, 原描述符)
+    for block in _STYLE_BLOCK_RE.finditer(html):
+        css = block.group(2)
+        for node in parse_stylesheet(css):
+            if node["type"] != "at" or node["name"] != "font-face" or not node["body"]:
+                continue
+            body = css[node["body"][0]:node["body"][1]]
+            face = parse_font_face(body)
+            if not face["family"] or not any(_is_remote(url) for url in face["urls"]):
+                continue
+            entry = resolve_face(index, face["family"], face["weight"], face["italic"])
+            if entry is None:
+                stats["missing"].append(f"{face['family']} {face['weight'][0]}")
+                continue
+            request(entry, face["family"])
+            face_rewrites.append((block, node, entry, body))
+
+    if not jobs:
+        return html, stats
+
+    # 3. 子集化（并行，输入未变化时复用）
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = []
+    for src_path, (family, weight, italic) in jobs.items():
+        with open(src_path, "rb") as f:
+            data = f.read()
+        stats["source_bytes"] += len(data)
+        key = hashlib.sha256(data + charset.encode("utf-8") + flavor.encode()).hexdigest()[:10]
+        weight_name = str(weight[0]) if weight[0] == weight[1] else f"{weight[0]}-{weight[1]}"
+        name = f"{_slug(family)}-{weight_name}{'-italic' if italic else ''}.{key}.{flavor}"
+        tasks.append((src_path, os.path.join(out_dir, name), charset, flavor))
+    hrefs = {}
+    for (src_path, _, _, _), (out_path, size, fresh) in zip(tasks, _run_tasks(tasks)):
+        href = f"assets/{FONTS_DIR}/{os.path.basename(out_path)}"
+        hrefs[src_path] = href
+        stats["subset_bytes"] += size
+        stats["subsets" if fresh else "reused"] += 1
+        stats["files"].append(href)
+    stats["faces"] = len(hrefs)
+
+    # 4. 改写：移除已本地化的 <link>，插入 @font-face 与 preload；改写内联 @font-face
+    replacements = []
+    # preconnect 只在所有 Google Fonts 样式表都已本地化时移除
+    all_localized = any(plan for _, plan in link_plans) and not any(plan is False for _, plan in link_plans)
+    for match, plan in link_plans:
+        if plan or (plan is None and all_localized):
+            replacements.append(_line_span(html, match.start(), match.end()) + ("",))
+            stats["links_removed"] += plan is True
+    for block, node, entry, body in face_rewrites:
+        body = re.sub(r"\s*(src|font-display)\s*:[^;}]*;?", "", body).rstrip()
+        new_body = (f"{body}\n            font-display: swap;"
+                    f"\n            src: url({hrefs[entry['path']]}) format('{flavor}');\n        ")
+        start = block.start(2)
+        replacements.append((start + node["body"][0], start + node["body"][1], new_body))
+
+    head = []
+    if link_sources:
+        faces_css = "\n".join(
+            "        " + _face_css(family, weight, italic, hrefs[src], flavor)
+            for src, (family, weight, italic) in jobs.items() if src in link_sources
+        )
+        head.append(f"    <style>\n{faces_css}\n    </style>")
+    # 优先 preload 常规字重（正文字体），其次按字重接近 400 排序
+    ranked = sorted(jobs.items(), key=lambda item: (item[1][2], abs((item[1][1][0] + item[1][1][1]) / 2 - 400)))
+    for src, _ in ranked[:max(0, preload)]:
+        head.insert(0, f'    <link rel="preload" href="{hrefs[src]}" as="font" '
+                       f'type="{FONT_MIME_TYPES[flavor]}" crossorigin>')
+
+    out = []
+    pos = 0
+    for start, end, text in sorted(replacements):
+        out.append(html[pos:start])
+        out.append(text)
+        pos = end
+    out.append(html[pos:])
+    html = "".join(out)
+
+    if head:
+        head_open = _HEAD_OPEN_RE.search(html)
+        insert_at = head_open.end() if head_open else 0
+        # 放在 <head> 中第一个样式之前，使后续样式可以引用这些字体
+        first_style = _STYLE_BLOCK_RE.search(html, insert_at)
+        first_link = re.compile(r"<link\b[^>]*stylesheet", re.I).search(html, insert_at)
+        candidates = [m.start() for m in (first_style, first_link) if m]
+        if candidates:
+            insert_at = min(candidates)
+            line_start = html.rfind("\n", 0, insert_at) + 1
+            if not html[line_start:insert_at].strip():
+                insert_at = line_start
+        html = html[:insert_at] + "\n".join(head) + "\n" + html[insert_at:]
+    return html, stats
+
+
+def self_host_fonts_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    report = ctx["report"]
+    if subset is None:
+        report["stages"]["self-host-fonts"] = {"summary": "未安装 fontTools，已跳过"}
+        report["html_warnings"].append("字体本地化阶段需要 fontTools：pip install fonttools brotli")
+        return html
+
+    options = ctx["options"]
+    cache_dir = options.get("font-cache") or DEFAULT_FONT_CACHE
+    preload = int(options.get("font-preload", DEFAULT_PRELOAD))
+    html, stats = self_host_fonts(html, ctx["output_dir"], cache_dir, preload)
+
+    summary = (
+        f"{stats['faces']} 个字体文件（新生成 {stats['subsets']}, 复用 {stats['reused']}）, "
+        f"{stats['chars']} 个字符, {stats['source_bytes'] / 1024:.0f} KB → "
+        f"{stats['subset_bytes'] / 1024:.0f} KB {stats['flavor'].upper()}"
+    )
+    if stats["missing"]:
+        summary += f", {len(stats['missing'])} 个字体未找到"
+        report["html_warnings"].append(
+            f"字体在本地缓存 {cache_dir} 中未找到，仍使用在线字体: {', '.join(stats['missing'])}")
+    if stats["flavor"] != "woff2":
+        report["html_warnings"].append("未安装 brotli，字体子集以 WOFF 格式输出：pip install brotli")
+    stats["summary"] = summary
+    report["stages"]["self-host-fonts"] = stats
+    return html
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if len(args) < 2:
+        print("字体本地化与子集化")
+        print()
+        print("用法:")
+        print("  python font_subset.py <input.html> <output.html> [--font-cache=DIR] [--font-preload=N]")
+        print()
+        print("子集写入 <output.html> 所在目录的 assets/fonts/，需要 fontTools（pip install fonttools brotli）。")
+        sys.exit(1)
+    if subset is None:
+        print("✗ 需要 fontTools：pip install fonttools brotli", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        with open(args[0], "r", encoding="utf-8") as f:
+            html = f.read()
+        output_dir = os.path.dirname(os.path.abspath(args[1]))
+        html, stats = self_host_fonts(
+            html,
+            output_dir,
+            flags.get("font-cache", DEFAULT_FONT_CACHE),
+            int(flags.get("font-preload", DEFAULT_PRELOAD)),
+        )
+        with open(args[1], "w", encoding="utf-8") as f:
+            f.write(html)
+    except Exception as e:
+        print(f"✗ 字体处理失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✓ {stats['faces']} 个字体文件, {stats['chars']} 个字符, "
+          f"{stats['source_bytes'] / 1024:.0f} KB → {stats['subset_bytes'] / 1024:.0f} KB {stats['flavor'].upper()}")
+    for href in stats["files"]:
+        print(f"  + {href}")
+    for face in stats["missing"]:
+        print(f"  ⚠ 本地缓存中未找到: {face}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,18 +8,35 @@ Landing Page 后处理工具（Post-Processor）
 用法：
   python generate_landing_page.py <config_path> <html_input> <html_output>
   python generate_landing_page.py config.json draft.html landing.html
+  python generate_landing_page.py --batch <manifest.jsonl|目录> <report.jsonl> [--jobs=N]
+  python generate_landing_page.py config.json draft.html output/index.html --localize-assets
 
 功能：
   1. 基于 config-guide.md 规范校验 config.json
   2. 将 config 中的图片 URL 注入到 HTML 的 data-slot 标记位
   3. 验证 HTML 基础结构（必要元素检查）
   4. 输出校验报告 + 最终 HTML
+  5. 批量模式：进程池并行后处理多个页面，逐页输出 JSONL 报告
+  6. 可选阶段（--localize-assets 等，见 OPTIONAL_STAGES）
+  7. 体积报告：输出前后大小，可设预算（--budget=60KB），超出时构建失败
+  8. 页面分析（--analyze）：按类型统计字节数、阻塞渲染资源、DOM 规模、CSS 规则数，按模板预算检查
+  9. CDN 导出（--export）：资源改为内容哈希文件名、预压缩 .br/.gz、生成 manifest.json
+  10. 阶段计时（--timings / --memory / --profile）与 JSON 报告（--json），见 instrumentation.py
 """
 
+import glob
+import hashlib
+import importlib
 import json
 import re
 import sys
 import os
+import time
+import tracemalloc
+from functools import partial
+from multiprocessing import Pool
+
+from instrumentation import StageTimer, format_timings, profile_call
 
 
 # ============================================================
@@ -72,15 +89,36 @@ TEMPLATE_OPTIONAL_FIELDS = {
 }
 
 # 图片 URL 字段映射：config 字段 → data-slot 名称
+# 同一 slot 的多个字段按表中顺序依次填充槽位；新增槽位只需添加一行
 IMAGE_SLOT_MAP = {
     "product.image": "hero",
     "hero.image_url": "hero",
     "immersive_section.image_url": "immersive",
-    "story_images[]": "story",
-    "editorial_images[].url": "editorial",
-    "video_thumbnail": "video-thumbnail",
+    "connected_sections[].image_url": "step",        # template-09 趣味连接型
+    "structured_sections[].image_url": "section",    # template-10 动态商务风
+    "zigzag_sections[].image_url": "section",        # template-06 极简插画风
+    "content_sections[].image_url": "content",       # template-04 双列布局+视频
+    "gallery_images[].url": "gallery",               # template-15 数字工坊/静谧艺廊
+    "story_images[]": "story",                       # template-03 故事讲述型
+    "editorial_images[].url": "editorial",           # template-15 数字工坊/静谧艺廊
+    "video_thumbnail": "video-thumbnail",            # template-04 双列布局+视频
 }
 
+# 参考模板目录（template/landing-page-NN.html），槽位数量由 template_slot_counts() 从中统计
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template")
+
+# 必填字段（template_id 另有枚举校验）；数组项字段用 "xxx[].field" 表示
+REQUIRED_FIELDS = ["product.name", "product.tagline", "features[].title"]
+
+# 推荐提供的数组字段 → 缺失时的提示
+RECOMMENDED_ARRAYS = {
+    "features": "大多数模板推荐提供3-6个功能",
+}
+
+# 主题色字段（#RRGGBB）
+THEME_COLOR_FIELDS = ["primary_color", "secondary_color", "background_color", "text_color"]
+HEX_COLOR_RE = re.compile(r"^#[0-9a-fA-F]{6}$")
+
 
 def _is_valid_image_path(path: str) -> bool:
     """检查图片路径是否为合法格式：本地相对路径 assets/... 或外部 URL http(s)://..."""
@@ -102,86 +140,221 @@ def load_config(config_path: str) -> dict:
         raise ValueError(f"JSON 格式错误: {e}")
 
 
-def validate_config(config: dict) -> list:
+def _compile_path(path: str):
     """
-    基于 config-guide.md 规范校验配置。
-    返回 (errors, warnings) 元组，errors 是致命问题，warnings 是建议。
+    将 "product.price"、"features[].title"、"story_images[]" 这类字段路径编译为取值函数。
+    取值函数接收 config，返回 [(具体 JSON 路径, 值), ...]；路径不存在时返回空列表。
     """
-    errors = []
-    warnings = []
+    steps = []
+    for part in path.split("."):
+        if part.endswith("[]"):
+            steps.append((part[:-2], True))
+        else:
+            steps.append((part, False))
+
+    def resolve(config):
+        nodes = [("", config)]
+        for key, is_array in steps:
+            found = []
+            for prefix, node in nodes:
+                if not isinstance(node, dict) or key not in node:
+                    continue
+                value = node[key]
+                node_path = f"{prefix}.{key}" if prefix else key
+                if not is_array:
+                    found.append((node_path, value))
+                elif isinstance(value, list):
+                    found.extend((f"{node_path}[{i}]", item) for i, item in enumerate(value))
+            nodes = found
+        return nodes
+
+    return resolve
+
+
+def _issue(level: str, path: str, message: str) -> dict:
+    return {"level": level, "path": path, "message": message}
+
+
+def _compile_config_schema() -> list:
+    """
+    将 REQUIRED_FIELDS、LENGTH_RULES、RECOMMENDED_ARRAYS、THEME_COLOR_FIELDS、
+    IMAGE_SLOT_MAP（图片路径）和 TEMPLATE_OPTIONAL_FIELDS 编译为校验闭包列表。
+    每个闭包签名为 check(config, issues)，按顺序向 issues 追加问题。
+    """
+    checks = []
+
+    # --- template_id ---
+    def check_template_id(config, issues):
+        template_id = config.get("template_id")
+        if not template_id:
+            issues.append(_issue("error", "template_id", "缺少必填字段: template_id"))
+        elif template_id not in VALID_TEMPLATE_IDS:
+            issues.append(_issue(
+                "error", "template_id",
+                f"无效的 template_id: {template_id}（有效范围: template-01 到 template-15）",
+            ))
+    checks.append(check_template_id)
+
+    # 按顶层数组分组数组项规则，使每个数组只遍历一次：{数组路径: [(字段, 必填, 长度范围)]}
+    item_rules = {}
+    for path in list(REQUIRED_FIELDS) + list(LENGTH_RULES):
+        if "[]." not in path:
+            continue
+        array_path, field = path.split("[].", 1)
+        fields = item_rules.setdefault(array_path, {})
+        fields.setdefault(field, [path in REQUIRED_FIELDS, LENGTH_RULES.get(path)])
 
     # --- 必填字段 ---
-    template_id = config.get("template_id")
-    if not template_id:
-        errors.append("缺少必填字段: template_id")
-    elif template_id not in VALID_TEMPLATE_IDS:
-        errors.append(f"无效的 template_id: {template_id}（有效范围: template-01 到 template-15）")
-
-    product = config.get("product", {})
-    if not product.get("name"):
-        errors.append("缺少必填字段: product.name")
-    if not product.get("tagline"):
-        errors.append("缺少必填字段: product.tagline")
+    for path in REQUIRED_FIELDS:
+        if "[]" in path:
+            continue
+        resolve = _compile_path(path)
+
+        def check_required(config, issues, path=path, resolve=resolve):
+            if not any(value for _, value in resolve(config)):
+                issues.append(_issue("error", path, f"缺少必填字段: {path}"))
+        checks.append(check_required)
 
     # --- 长度校验 ---
-    length_checks = [
-        ("product.name", product.get("name", "")),
-        ("product.tagline", product.get("tagline", "")),
-        ("product.description", product.get("description", "")),
-    ]
-    for field_name, value in length_checks:
-        if value and field_name in LENGTH_RULES:
-            min_len, max_len = LENGTH_RULES[field_name]
-            if len(value) < min_len:
-                warnings.append(f"{field_name} 过短（{len(value)}字符，建议≥{min_len}）")
-            elif len(value) > max_len:
-                warnings.append(f"{field_name} 过长（{len(value)}字符，建议≤{max_len}）")
-
-    # --- features 校验 ---
-    features = config.get("features", [])
-    if features:
-        for i, feat in enumerate(features):
-            title = feat.get("title", "")
-            desc = feat.get("description", "")
-            if not title:
-                errors.append(f"features[{i}] 缺少 title")
-            elif len(title) < 2 or len(title) > 30:
-                warnings.append(f"features[{i}].title 长度({len(title)})超出建议范围(2-30)")
-            if desc and (len(desc) < 10 or len(desc) > 200):
-                warnings.append(f"features[{i}].description 长度({len(desc)})超出建议范围(10-200)")
-    else:
-        warnings.append("未提供 features 数组（大多数模板推荐提供3-6个功能）")
+    for path, (min_len, max_len) in LENGTH_RULES.items():
+        if "[]" in path:
+            continue
+        resolve = _compile_path(path)
+
+        def check_length(config, issues, resolve=resolve, min_len=min_len, max_len=max_len):
+            for node_path, value in resolve(config):
+                if not value:
+                    continue
+                if not isinstance(value, str):
+                    issues.append(_issue("warning", node_path, f"{node_path} 应为字符串: {value!r}"))
+                    continue
+                if len(value) < min_len:
+                    issues.append(_issue(
+                        "warning", node_path,
+                        f"{node_path} 过短（{len(value)}字符，建议≥{min_len}）",
+                    ))
+                elif len(value) > max_len:
+                    issues.append(_issue(
+                        "warning", node_path,
+                        f"{node_path} 过长（{len(value)}字符，建议≤{max_len}）",
+                    ))
+        checks.append(check_length)
+
+    # --- 数组项校验（如 features[].title / features[].description） ---
+    for array_path, fields in item_rules.items():
+        resolve = _compile_path(f"{array_path}[]")
+        field_rules = [(field, required, bounds) for field, (required, bounds) in fields.items()]
+        hint = RECOMMENDED_ARRAYS.get(array_path)
+
+        def check_items(config, issues, array_path=array_path, resolve=resolve,
+                        field_rules=field_rules, hint=hint):
+            items = resolve(config)
+            if not items:
+                if hint:
+                    issues.append(_issue("warning", array_path, f"未提供 {array_path} 数组（{hint}）"))
+                return
+            for item_path, item in items:
+                if not isinstance(item, dict):
+                    item = {}
+                for field, required, bounds in field_rules:
+                    value = item.get(field, "")
+                    if not value:
+                        if required:
+                            issues.append(_issue("error", f"{item_path}.{field}", f"{item_path} 缺少 {field}"))
+                        continue
+                    if not isinstance(value, str):
+                        issues.append(_issue(
+                            "warning", f"{item_path}.{field}", f"{item_path}.{field} 应为字符串: {value!r}",
+                        ))
+                        continue
+                    if bounds and not bounds[0] <= len(value) <= bounds[1]:
+                        issues.append(_issue(
+                            "warning", f"{item_path}.{field}",
+                            f"{item_path}.{field} 长度({len(value)})超出建议范围({bounds[0]}-{bounds[1]})",
+                        ))
+        checks.append(check_items)
 
     # --- 颜色格式校验 ---
-    theme = config.get("theme", {})
-    hex_pattern = re.compile(r"^#[0-9a-fA-F]{6}$")
-    for color_field in ["primary_color", "secondary_color", "background_color", "text_color"]:
-        color_val = theme.get(color_field)
-        if color_val and not hex_pattern.match(color_val):
-            warnings.append(f"theme.{color_field} 格式不标准: {color_val}（建议 #RRGGBB）")
+    color_resolvers = [
+        (field, _compile_path(f"theme.{field}")) for field in THEME_COLOR_FIELDS
+    ]
+
+    def check_colors(config, issues):
+        for field, resolve in color_resolvers:
+            for node_path, value in resolve(config):
+                if value and not (isinstance(value, str) and HEX_COLOR_RE.match(value)):
+                    issues.append(_issue(
+                        "warning", node_path,
+                        f"theme.{field} 格式不标准: {value}（建议 #RRGGBB）",
+                    ))
+    checks.append(check_colors)
 
     # --- 图片路径格式校验 ---
-    image_url = product.get("image")
-    if image_url and not _is_valid_image_path(image_url):
-        warnings.append(f"product.image 路径格式不合法: {image_url}（应为 assets/xxx.png 或 http(s)://...）")
+    image_resolvers = [_compile_path(path) for path in IMAGE_SLOT_MAP]
+
+    def check_image_paths(config, issues):
+        for resolve in image_resolvers:
+            for node_path, value in resolve(config):
+                if value and not (isinstance(value, str) and _is_valid_image_path(value)):
+                    issues.append(_issue(
+                        "warning", node_path,
+                        f"{node_path} 路径格式不合法: {value}（应为 assets/xxx.png 或 http(s)://...）",
+                    ))
+    checks.append(check_image_paths)
 
     # --- 模板特定字段建议 ---
-    if template_id and template_id in TEMPLATE_OPTIONAL_FIELDS:
-        for field in TEMPLATE_OPTIONAL_FIELDS[template_id]:
-            # 检查嵌套字段
-            parts = field.split(".")
-            obj = config
-            found = True
-            for part in parts:
-                if isinstance(obj, dict) and part in obj:
-                    obj = obj[part]
-                else:
-                    found = False
-                    break
-            if not found:
-                style_name = TEMPLATE_NAMES.get(template_id, template_id)
-                warnings.append(f"「{style_name}」风格建议提供 {field} 字段")
+    optional_resolvers = {
+        template_id: [(field, _compile_path(field)) for field in fields]
+        for template_id, fields in TEMPLATE_OPTIONAL_FIELDS.items()
+    }
+
+    def check_optional_fields(config, issues):
+        template_id = config.get("template_id")
+        if not isinstance(template_id, str) or template_id not in optional_resolvers:
+            return
+        style_name = TEMPLATE_NAMES.get(template_id, template_id)
+        for field, resolve in optional_resolvers[template_id]:
+            if not resolve(config):
+                issues.append(_issue("warning", field, f"「{style_name}」风格建议提供 {field} 字段"))
+    checks.append(check_optional_fields)
+
+    return checks
+
 
+# 编译后的校验闭包（首次使用时编译）
+_CONFIG_SCHEMA = None
+
+
+def validate_config_issues(config: dict) -> list:
+    """
+    基于 config-guide.md 规范校验配置，返回结构化问题列表：
+    [{"level": "error" | "warning", "path": "features[0].title", "message": "..."}, ...]
+    """
+    global _CONFIG_SCHEMA
+    if _CONFIG_SCHEMA is None:
+        _CONFIG_SCHEMA = _compile_config_schema()
+
+    issues = []
+    if not isinstance(config, dict):
+        issues.append(_issue("error", "", "config 顶层必须是 JSON 对象"))
+        return issues
+    for check in _CONFIG_SCHEMA:
+        check(config, issues)
+    return issues
+
+
+def validate_config(config: dict) -> list:
+    """
+    基于 config-guide.md 规范校验配置。
+    返回 (errors, warnings) 元组，errors 是致命问题，warnings 是建议。
+    """
+    errors = []
+    warnings = []
+    for issue in validate_config_issues(config):
+        if issue["level"] == "error":
+            errors.append(issue["message"])
+        else:
+            warnings.append(issue["message"])
     return errors, warnings
 
 
@@ -189,240 +362,976 @@ def validate_config(config: dict) -> list:
 # 图片注入
 # ============================================================
 
+def _compile_slot_plan(slot_map: dict) -> dict:
+    """
+    将 IMAGE_SLOT_MAP 编译为前缀树形式的遍历计划：共享前缀的字段合并到同一节点，
+    遍历 config 时每个节点只访问一次。
+    节点结构：{"emit": [(表中行号, slot)], "keys": {key: 子节点}, "items": 数组项节点或 None}
+    """
+    def new_node():
+        return {"emit": [], "keys": {}, "items": None}
+
+    root = new_node()
+    for row, (path, slot) in enumerate(slot_map.items()):
+        node = root
+        for part in path.split("."):
+            is_array = part.endswith("[]")
+            key = part[:-2] if is_array else part
+            node = node["keys"].setdefault(key, new_node())
+            if is_array:
+                if node["items"] is None:
+                    node["items"] = new_node()
+                node = node["items"]
+        node["emit"].append((row, slot))
+    return root
+
+
+def _walk_slot_plan(node: dict, value, found: list):
+    for row, slot in node["emit"]:
+        if value:
+            found.append((row, slot, value))
+    if node["keys"] and isinstance(value, dict):
+        for key, child in node["keys"].items():
+            if key in value:
+                _walk_slot_plan(child, value[key], found)
+    if node["items"] is not None and isinstance(value, list):
+        for item in value:
+            _walk_slot_plan(node["items"], item, found)
+
+
+# 编译后的槽位遍历计划（首次使用时编译）
+_SLOT_PLAN = None
+
+
 def get_image_urls_from_config(config: dict) -> dict:
     """
     从 config 中提取所有图片 URL，返回 {slot_name: [url, ...]} 映射。
+    按 IMAGE_SLOT_MAP 编译的遍历计划只遍历 config 一次；同一 slot 内按表中顺序排列。
     """
-    urls = {}
+    global _SLOT_PLAN
+    if _SLOT_PLAN is None:
+        _SLOT_PLAN = _compile_slot_plan(IMAGE_SLOT_MAP)
 
-    # product.image → hero slot
-    product_image = config.get("product", {}).get("image")
-    if product_image:
-        urls.setdefault("hero", []).append(product_image)
-
-    # hero.image_url → hero slot
-    hero_image = config.get("hero", {}).get("image_url")
-    if hero_image:
-        urls.setdefault("hero", []).append(hero_image)
-
-    # immersive_section.image_url → immersive slot
-    immersive_image = config.get("immersive_section", {}).get("image_url")
-    if immersive_image:
-        urls.setdefault("immersive", []).append(immersive_image)
-
-    # connected_sections[].image_url → step slot
-    for section in config.get("connected_sections", []):
-        img = section.get("image_url")
-        if img:
-            urls.setdefault("step", []).append(img)
-
-    # structured_sections[].image_url → section slot
-    for section in config.get("structured_sections", []):
-        img = section.get("image_url")
-        if img:
-            urls.setdefault("section", []).append(img)
-
-    # zigzag_sections[].image_url → section slot
-    for section in config.get("zigzag_sections", []):
-        img = section.get("image_url")
-        if img:
-            urls.setdefault("section", []).append(img)
-
-    # content_sections[].image_url → content slot
-    for section in config.get("content_sections", []):
-        img = section.get("image_url")
-        if img:
-            urls.setdefault("content", []).append(img)
-
-    # gallery_images[].url → gallery slot
-    for img_obj in config.get("gallery_images", []):
-        img = img_obj.get("url")
-        if img:
-            urls.setdefault("gallery", []).append(img)
-
-    # story_images[] → story slot（template-03 故事讲述型）
-    for img in config.get("story_images", []):
-        if img:
-            urls.setdefault("story", []).append(img)
-
-    # editorial_images[].url → editorial slot（template-15 数字工坊/静谧艺廊）
-    for img_obj in config.get("editorial_images", []):
-        img = img_obj.get("url")
-        if img:
-            urls.setdefault("editorial", []).append(img)
-
-    # video_thumbnail → video-thumbnail slot（template-04 双列布局+视频）
-    video_thumb = config.get("video_thumbnail")
-    if video_thumb:
-        urls.setdefault("video-thumbnail", []).append(video_thumb)
+    found = []
+    _walk_slot_plan(_SLOT_PLAN, config, found)
+    found.sort(key=lambda entry: entry[0])
 
+    urls = {}
+    for _, slot, url in found:
+        urls.setdefault(slot, []).append(url)
     return urls
 
 
+def slot_usage(image_urls: dict, slot_counts: dict) -> dict:
+    """
+    对比 config 提供的图片与 HTML 中的槽位数量，返回
+    {slot: {"slots": 槽位数, "provided": 提供的 URL 数, "consumed": 实际注入数}}。
+    slot_counts 可取 template_slot_counts(template_id)（预估）或注入后的 slot_counters（实际）。
+    """
+    usage = {}
+    for slot in list(slot_counts) + [s for s in image_urls if s not in slot_counts]:
+        slots = slot_counts.get(slot, 0)
+        provided = len(image_urls.get(slot, []))
+        usage[slot] = {"slots": slots, "provided": provided, "consumed": min(slots, provided)}
+    return usage
+
+
+# 流式读写的块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class SlotImageInjector:
+    """
+    流式图片注入引擎：单次扫描输入文本，将带 data-slot 的 <img> 标签的 src
+    替换为 config 中对应槽位的 URL。
+
+    feed() 接收任意切分的文本块，返回可立即写出的部分；跨块的标签会暂存到
+    下一个块到达为止。close() 返回剩余内容。匹配规则等价于正则
+    <img\\b[^>]*data-slot=[^>]*>，注入统计与整篇 re.sub 一致。
+    """
+
+    def __init__(self, image_urls: dict):
+        self.image_urls = image_urls
+        self.stats = {"injected": 0, "empty_slots": 0}
+        # 为每个 slot 维护一个索引计数器
+        self.slot_counters = {}
+        self._tail = ""      # 块末尾可能被截断的 "<img" 前缀
+        self._pending = []   # 尚未遇到 ">" 的标签片段
+
+    def feed(self, chunk: str) -> str:
+        if self._pending:
+            end = chunk.find(">")
+            if end == -1:
+                self._pending.append(chunk)
+                return ""
+            self._pending.append(chunk[:end + 1])
+            tag = "".join(self._pending)
+            self._pending = []
+            new_tag = self._rewrite(tag)
+            if new_tag is None:
+                # 非 data-slot 标签：与正则一致，从 "<img" 之后继续扫描
+                return "<img" + self._scan(tag[4:] + chunk[end + 1:])
+            return new_tag + self._scan(chunk[end + 1:])
+
+        text = self._tail + chunk if self._tail else chunk
+        self._tail = ""
+        return self._scan(text)
+
+    def close(self) -> str:
+        # 未闭合的标签不会被正则匹配，原样输出
+        rest = "".join(self._pending) + self._tail
+        self._pending = []
+        self._tail = ""
+        return rest
+
+    def _scan(self, text: str) -> str:
+        out = []
+        pos = 0
+        n = len(text)
+        while True:
+            start = text.find("<img", pos)
+            if start == -1:
+                keep = max(pos, n - 3)
+                out.append(text[pos:keep])
+                self._tail = text[keep:]
+                break
+            if start + 4 >= n:
+                # 需要下一个字符才能判断单词边界
+                out.append(text[pos:start])
+                self._tail = text[start:]
+                break
+            nxt = text[start + 4]
+            if nxt.isalnum() or nxt == "_":
+                out.append(text[pos:start + 4])
+                pos = start + 4
+                continue
+            end = text.find(">", start + 4)
+            if end == -1:
+                out.append(text[pos:start])
+                self._pending = [text[start:]]
+                break
+            out.append(text[pos:start])
+            new_tag = self._rewrite(text[start:end + 1])
+            if new_tag is None:
+                out.append("<img")
+                pos = start + 4
+            else:
+                out.append(new_tag)
+                pos = end + 1
+        return "".join(out)
+
+    def _rewrite(self, tag: str):
+        """处理单个 <img> 标签；不含 data-slot= 时返回 None"""
+        if "data-slot=" not in tag:
+            return None
+
+        # 提取 data-slot="..."
+        slot_start = tag.find('data-slot="')
+        if slot_start == -1:
+            return tag
+        slot_start += len('data-slot="')
+        slot_end = tag.find('"', slot_start)
+        if slot_end == -1:
+            return tag
+
+        slot_name = tag[slot_start:slot_end]
+        available = self.image_urls.get(slot_name, [])
+
+        # 获取该 slot 的当前索引
+        idx = self.slot_counters.get(slot_name, 0)
+        self.slot_counters[slot_name] = idx + 1
+
+        if idx >= len(available):
+            self.stats["empty_slots"] += 1
+            return tag
+
+        self.stats["injected"] += 1
+        # 替换第一个 src="..." 为实际 URL
+        src_start = tag.find('src="')
+        if src_start == -1:
+            return tag
+        src_end = tag.find('"', src_start + 5)
+        if src_end == -1:
+            return tag
+        return f'{tag[:src_start]}src="{available[idx]}"{tag[src_end + 1:]}'
+
+
 def inject_images(html: str, image_urls: dict) -> tuple:
     """
     将图片 URL 注入到 HTML 中带有 data-slot 属性的 <img> 标签。
     返回 (修改后的 HTML, 注入统计)。
     """
-    stats = {"injected": 0, "empty_slots": 0}
+    injector = SlotImageInjector(image_urls)
+    result = injector.feed(html) + injector.close()
+    return result, injector.stats
+
 
-    # 为每个 slot 维护一个索引计数器
-    slot_counters = {}
+# 模板槽位统计缓存：template_id -> {slot: 槽位数}
+_TEMPLATE_SLOT_CACHE = {}
 
-    def replace_img(match):
-        full_tag = match.group(0)
 
-        # 提取 data-slot
-        slot_match = re.search(r'data-slot="([^"]*)"', full_tag)
-        if not slot_match:
-            return full_tag
+def template_slot_counts(template_id: str, template_dir: str = TEMPLATE_DIR) -> dict:
+    """
+    统计参考模板中带 data-slot 的 <img> 槽位数量，返回 {slot: 数量}。
+    与注入使用同一扫描逻辑；模板文件不存在时返回空 dict。
+    """
+    if template_id not in _TEMPLATE_SLOT_CACHE:
+        path = os.path.join(template_dir, f"landing-page-{template_id.rsplit('-', 1)[-1]}.html")
+        injector = SlotImageInjector({})
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                injector.feed(f.read())
+            injector.close()
+        except OSError:
+            return {}
+        _TEMPLATE_SLOT_CACHE[template_id] = dict(injector.slot_counters)
+    return _TEMPLATE_SLOT_CACHE[template_id]
 
-        slot_name = slot_match.group(1)
-        available = image_urls.get(slot_name, [])
 
-        # 获取该 slot 的当前索引
-        idx = slot_counters.get(slot_name, 0)
-        slot_counters[slot_name] = idx + 1
-
-        if idx < len(available):
-            url = available[idx]
-            # 替换 src="" 为实际 URL
-            new_tag = re.sub(r'src="[^"]*"', f'src="{url}"', full_tag, count=1)
-            stats["injected"] += 1
-            return new_tag
-        else:
-            stats["empty_slots"] += 1
-            return full_tag
+def inject_images_stream(src, dst, image_urls: dict, sinks=(), chunk_size: int = STREAM_CHUNK_SIZE,
+                         injector: SlotImageInjector = None) -> tuple:
+    """
+    流式注入：从文件对象 src 分块读取，注入后直接写入文件对象 dst，内存占用与文档大小无关。
+    sinks 中的可调用对象会依次收到每个输出块（供后续检查阶段复用）；
+    传入 injector 可在完成后读取其 slot_counters。
+    返回 (注入统计, 输出字符数)。
+    """
+    if injector is None:
+        injector = SlotImageInjector(image_urls)
+    size = 0
 
-    # 匹配所有带 data-slot 的 img 标签
-    result = re.sub(r"<img\b[^>]*data-slot=[^>]*>", replace_img, html)
+    def emit(piece):
+        nonlocal size
+        if piece:
+            dst.write(piece)
+            size += len(piece)
+            for sink in sinks:
+                sink(piece)
 
-    return result, stats
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        emit(injector.feed(chunk))
+    emit(injector.close())
+
+    return injector.stats, size
 
 
 # ============================================================
 # HTML 结构验证
 # ============================================================
 
-def validate_html_structure(html: str) -> list:
+# 结构扫描关注的标记 → 事实名。零宽前瞻保证相互重叠的标记（如 "<naviewport"）都能命中；
+# 大小写不敏感的标记只折叠 ASCII 字母，与 str.lower() 后再查找的结果一致
+_STRUCTURE_TOKEN_RE = re.compile(
+    r"(?=(<!DOCTYPE html>|<!doctype html>|<html|<head|<meta|<title|viewport|<nav|navbar|<footer|<img"
+    r"|(?ai:charset|hero|call-to-action|btn-primary|button-primary|get-started|cta)))"
+)
+_STRUCTURE_TOKEN_FACTS = {
+    "<!DOCTYPE html>": "has_doctype",
+    "<!doctype html>": "has_doctype",
+    "<html": "has_html",
+    "<head": "has_head",
+    "<meta": "has_meta",
+    "<title": "has_title",
+    "viewport": "has_viewport",
+    "<nav": "has_nav",
+    "navbar": "has_nav",
+    "<footer": "has_footer",
+    "charset": "has_charset",
+    "hero": "has_hero",
+    "call-to-action": "has_cta",
+    "btn-primary": "has_cta",
+    "button-primary": "has_cta",
+    "get-started": "has_cta",
+    "cta": "has_cta",
+}
+# 最长标记长度：块末尾保留 (长度-1) 个字符，防止标记被切断
+_STRUCTURE_TOKEN_MAX = max(len(t) for t in _STRUCTURE_TOKEN_FACTS)
+
+
+class StructureScanner:
     """
-    检查 HTML 基础结构，返回 warnings 列表。
-    不做严格的 HTML 语法校验，只检查 Landing Page 的关键要素。
+    单次线性扫描收集 HTML 结构事实，可与流式注入配合逐块 feed()。
+
+    close() 返回事实 dict：
+      has_doctype / has_html / has_head / has_meta / has_charset / has_title /
+      has_viewport / has_nav / has_hero / has_cta / has_footer（bool），
+      img_count / imgs_without_alt（int，对应 <img ...> 完整标签）
     """
+
+    def __init__(self):
+        self.facts = {fact: False for fact in _STRUCTURE_TOKEN_FACTS.values()}
+        self.facts["img_count"] = 0
+        self.facts["imgs_without_alt"] = 0
+        self._carry = ""
+        self._offset = 0           # _carry[0] 在整篇文档中的位置
+        self._img_end = 0          # 上一个已统计 <img> 标签的结束位置
+        self._pending_img = False  # 是否处于尚未遇到 ">" 的 <img 标签中
+        self._pending_from = 0     # 该标签内尚未检查的起始位置
+        self._pending_alt = False
+
+    def feed(self, chunk: str):
+        self._scan(self._carry + chunk, final=False)
+
+    def close(self) -> dict:
+        self._scan(self._carry, final=True)
+        return self.facts
+
+    def _count_img(self, has_alt: bool):
+        self.facts["img_count"] += 1
+        if not has_alt:
+            self.facts["imgs_without_alt"] += 1
+
+    def _scan(self, text: str, final: bool):
+        n = len(text)
+        offset = self._offset
+        keep = max(0, n - (_STRUCTURE_TOKEN_MAX - 1))
+
+        # 续接跨块的 <img 标签：只需知道其中是否出现过 alt=
+        if self._pending_img:
+            inside = max(0, self._pending_from - offset)
+            close = text.find(">", inside)
+            if close == -1:
+                self._pending_alt = self._pending_alt or "alt=" in text[inside:]
+                if final:
+                    self._pending_img = False
+            else:
+                self._count_img(self._pending_alt or "alt=" in text[inside:close])
+                self._pending_img = False
+                self._img_end = offset + close + 1
+
+        facts = self.facts
+        for m in _STRUCTURE_TOKEN_RE.finditer(text):
+            token = m.group(1)
+            if token != "<img":
+                facts[_STRUCTURE_TOKEN_FACTS.get(token) or _STRUCTURE_TOKEN_FACTS[token.lower()]] = True
+                continue
+
+            start = m.start()
+            if self._pending_img or offset + start < self._img_end:
+                continue  # 位于上一个 <img 标签内部
+            after = start + 4
+            if after == n:
+                if not final:
+                    keep = min(keep, start)  # 需要下一个字符判断单词边界
+                continue
+            nxt = text[after]
+            if nxt.isalnum() or nxt == "_":
+                continue
+            close = text.find(">", after)
+            if close == -1:
+                if not final:
+                    self._pending_img = True
+                    self._pending_from = offset + after
+                    self._pending_alt = "alt=" in text[after:]
+                continue
+            self._count_img("alt=" in text[after:close])
+            self._img_end = offset + close + 1
+
+        self._carry = text[keep:]
+        self._offset = offset + keep
+
+
+def scan_html_structure(html: str) -> dict:
+    """一次扫描整篇 HTML，返回结构事实 dict（见 StructureScanner）"""
+    scanner = StructureScanner()
+    scanner.feed(html)
+    return scanner.close()
+
+
+def structure_warnings(facts: dict) -> list:
+    """根据结构事实生成 warnings 列表"""
     warnings = []
 
     # 基础结构
-    if "<!DOCTYPE html>" not in html and "<!doctype html>" not in html:
+    if not facts["has_doctype"]:
         warnings.append("缺少 <!DOCTYPE html> 声明")
 
-    if "<html" not in html:
+    if not facts["has_html"]:
         warnings.append("缺少 <html> 标签")
 
-    if "<head" not in html:
+    if not facts["has_head"]:
         warnings.append("缺少 <head> 标签")
 
-    if "<meta" not in html and 'charset' not in html.lower():
+    if not facts["has_meta"] and not facts["has_charset"]:
         warnings.append("建议添加 <meta charset> 声明")
 
-    if "<title" not in html:
+    if not facts["has_title"]:
         warnings.append("缺少 <title> 标签")
 
     # 视口适配
-    if "viewport" not in html:
+    if not facts["has_viewport"]:
         warnings.append("缺少 viewport meta 标签（影响移动端适配）")
 
     # Landing Page 关键区域
-    if "<nav" not in html and "navbar" not in html:
+    if not facts["has_nav"]:
         warnings.append("未检测到导航栏（nav/navbar）")
 
     # Hero 区域（几乎所有 LP 必备）
-    if "hero" not in html.lower():
+    if not facts["has_hero"]:
         warnings.append("未检测到 Hero 区域")
 
     # CTA（Landing Page 核心）
-    cta_patterns = ["cta", "call-to-action", "btn-primary", "button-primary", "get-started"]
-    if not any(p in html.lower() for p in cta_patterns):
+    if not facts["has_cta"]:
         warnings.append("未检测到 CTA 按钮/区域")
 
     # Footer
-    if "<footer" not in html:
+    if not facts["has_footer"]:
         warnings.append("缺少 <footer> 标签")
 
     # 无障碍
-    img_tags = re.findall(r"<img\b[^>]*>", html)
-    imgs_without_alt = [tag for tag in img_tags if 'alt=' not in tag]
-    if imgs_without_alt:
-        warnings.append(f"{len(imgs_without_alt)} 个 <img> 标签缺少 alt 属性")
+    if facts["imgs_without_alt"]:
+        warnings.append(f"{facts['imgs_without_alt']} 个 <img> 标签缺少 alt 属性")
 
     return warnings
 
 
+def validate_html_structure(html: str) -> list:
+    """
+    检查 HTML 基础结构，返回 warnings 列表。
+    不做严格的 HTML 语法校验，只检查 Landing Page 的关键要素。
+    """
+    return structure_warnings(scan_html_structure(html))
+
+
+# ============================================================
+# 增量构建缓存
+# ============================================================
+
+# 缓存文件与输出文件同目录：output/.index.html.cache.json
+BUILD_CACHE_SUFFIX = ".cache.json"
+BUILD_CACHE_VERSION = 1
+
+# 不影响输出内容的 CLI 开关，不计入指纹
+CACHE_NEUTRAL_OPTIONS = {
+    "force", "batch", "jobs", "export", "json", "profile", "memory", "timings", "watch", "port",
+}
+
+_ASSET_REF_RE = re.compile(r"""assets/[^"'\s)<>,?#]+""")
+# 跨块扫描时保留的尾部长度（需大于最长的资源路径）
+_ASSET_REF_CARRY = 512
+
+_SCRIPT_FINGERPRINT = None
+
+
+def _build_cache_path(html_output_path: str) -> str:
+    output_dir, name = os.path.split(html_output_path)
+    return os.path.join(output_dir, f".{name}{BUILD_CACHE_SUFFIX}")
+
+
+def _script_fingerprint() -> str:
+    """scripts/ 下全部 .py 源码的哈希，脚本或阶段模块更新后缓存自动失效"""
+    global _SCRIPT_FINGERPRINT
+    if _SCRIPT_FINGERPRINT is None:
+        h = hashlib.sha256(f"v{BUILD_CACHE_VERSION}".encode())
+        scripts_dir = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(scripts_dir, "*.py"))):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        _SCRIPT_FINGERPRINT = h.hexdigest()
+    return _SCRIPT_FINGERPRINT
+
+
+def _file_digest(path: str) -> str:
+    """分块计算文件内容哈希，内存占用与文件大小无关"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _external_inputs_digest(stages: list, options: dict) -> str:
+    """阶段从 config / 草稿之外读取的文件（--analyze-budgets 的 JSON、本地字体缓存）的内容摘要"""
+    parts = []
+    if options.get("analyze") and isinstance(options.get("analyze-budgets"), str):
+        parts.append(_file_digest(options["analyze-budgets"]))
+    if "self-host-fonts" in stages:
+        font_subset = _import_script("font_subset")
+        parts.append(font_subset.font_cache_digest(options.get("font-cache") or font_subset.DEFAULT_FONT_CACHE))
+    return "|".join(parts)
+
+
+def _input_fingerprint(config_digest: str, html_digest: str, stages: list, options: dict) -> str:
+    relevant = {k: v for k, v in options.items() if k not in CACHE_NEUTRAL_OPTIONS}
+    h = hashlib.sha256()
+    for part in (_script_fingerprint(), config_digest, html_digest,
+                 json.dumps([stages, relevant], sort_keys=True, default=str),
+                 _external_inputs_digest(stages, options)):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class AssetRefCollector:
+    """从输出文本块中收集 assets/ 相对路径引用（跨块安全）"""
+
+    def __init__(self):
+        self.refs = set()
+        self._carry = ""
+
+    def feed(self, chunk: str):
+        text = self._carry + chunk
+        for m in _ASSET_REF_RE.finditer(text):
+            if m.end() < len(text):  # 位于末尾的匹配可能被截断，留到下一块
+                self.refs.add(m.group(0))
+        self._carry = text[-_ASSET_REF_CARRY:]
+
+    def close(self) -> set:
+        self.refs.update(_ASSET_REF_RE.findall(self._carry))
+        self._carry = ""
+        return self.refs
+
+
+def _asset_stats(output_dir: str, refs) -> dict:
+    """{资源路径: [大小, mtime_ns]}，文件不存在时为 None"""
+    stats = {}
+    for ref in sorted(refs):
+        try:
+            st = os.stat(os.path.join(output_dir, ref))
+            stats[ref] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            stats[ref] = None
+    return stats
+
+
+def _load_build_cache(cache_path: str) -> dict:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _cache_hit(cache: dict, fingerprint: str, html_output_path: str, output_dir: str) -> bool:
+    """输入指纹一致，且输出文件与引用的资源自上次构建后均未变化"""
+    if not fingerprint or cache.get("fingerprint") != fingerprint:
+        return False
+    try:
+        st = os.stat(html_output_path)
+    except OSError:
+        return False
+    if cache.get("output") != [st.st_size, st.st_mtime_ns]:
+        return False
+    assets = cache.get("assets", {})
+    return _asset_stats(output_dir, assets) == assets
+
+
+def _save_build_cache(cache_path: str, entry: dict):
+    try:
+        _write_text_atomic(cache_path, json.dumps(entry, ensure_ascii=False))
+    except OSError:
+        pass  # 缓存写入失败不影响构建结果
+
+
 # ============================================================
 # 主流程
 # ============================================================
 
-def post_process(config_path: str, html_input_path: str, html_output_path: str) -> dict:
+# 可选后处理阶段：CLI 开关 → (模块名, 阶段函数名, 说明)。
+# 阶段按表中顺序在图片注入之后执行，签名为 stage(html, ctx) -> html；模块按需导入，
+# 未启用的阶段不引入其依赖。
+OPTIONAL_STAGES = {
+    "localize-assets": ("localize_assets", "localize_assets_stage", "外部图片本地化"),
+    "responsive-images": ("responsive_images", "responsive_images_stage", "响应式图片变体（AVIF/WebP + srcset）"),
+    "optimize-lcp": ("lcp_optimizer", "optimize_lcp_stage", "图片固有尺寸与加载优先级（LCP）"),
+    "placeholders": ("placeholders", "placeholders_stage", "图片低质量占位（LQIP）"),
+    "self-host-fonts": ("font_subset", "self_host_fonts_stage", "字体本地化与子集化（WOFF2）"),
+    "perf-lint": ("perf_lint", "perf_lint_stage", "运行时性能检查（动画 / backdrop-filter / 滚动监听）"),
+    "prune-css": ("css_optimizer", "prune_css_stage", "删除未使用的内联 CSS 规则和 @keyframes"),
+    "critical-css": ("css_optimizer", "critical_css_stage", "首屏关键 CSS 内联，其余样式非阻塞加载"),
+    "minify": ("minify", "minify_stage", "压缩 HTML / 内联 CSS / 内联 JS"),
+}
+
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(b|kb|k|mb|m)?\s*$", re.I)
+_SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 * 1024, "mb": 1024 * 1024}
+
+
+def parse_size(value) -> int:
+    """解析体积预算："60KB"、"1.5MB"、"61440"（字节）"""
+    m = _SIZE_RE.match(str(value))
+    if not m:
+        raise ValueError(f"无效的体积: {value}")
+    return int(float(m.group(1)) * _SIZE_UNITS[(m.group(2) or "").lower()])
+
+
+def _import_script(module_name: str):
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    return importlib.import_module(module_name)
+
+
+def _load_stage(name: str):
+    module_name, func_name, _ = OPTIONAL_STAGES[name]
+    return getattr(_import_script(module_name), func_name)
+
+
+def _export_for_cdn(report: dict, html_output_path: str, options: dict):
+    """
+    options["export"] 启用时把输出目录导出为 CDN 发布目录（见 cdn_export.py）。
+    默认导出到输出目录同级的 dist/；导出自身是增量的，命中构建缓存时同样执行。
+    """
+    target = options.get("export")
+    if not target or not report.get("success"):
+        return
+    output_dir = os.path.dirname(os.path.abspath(html_output_path))
+    if target is True:
+        target = os.path.join(os.path.dirname(output_dir), "dist")
+    cdn_export = _import_script("cdn_export")
+    try:
+        stats = cdn_export.export_output(output_dir, target)
+    except (OSError, ValueError) as e:
+        report["export"] = {"summary": f"导出失败: {e}", "error": str(e)}
+        report["success"] = False
+        return
+    stats["summary"] = cdn_export.export_summary(stats)
+    report["export"] = stats
+
+
+def _analyze_output(report: dict, html_output_path: str, options: dict):
+    """静态分析最终页面并按模板预算检查（options["analyze-budgets"] 为 JSON 覆盖文件）"""
+    page_analyzer = _import_script("page_analyzer")
+    budgets_path = options.get("analyze-budgets")
+    try:
+        budgets = page_analyzer.load_budgets(budgets_path if isinstance(budgets_path, str) else None)
+        analysis = page_analyzer.analyze_page(html_output_path)
+    except (OSError, ValueError) as e:
+        report["analysis"] = {"summary": f"分析失败: {e}", "error": str(e), "violations": []}
+        report["success"] = False
+        return
+    analysis["violations"] = page_analyzer.check_budgets(analysis, report.get("template_id"), budgets)
+    analysis["summary"] = page_analyzer.analysis_summary(analysis)
+    report["analysis"] = analysis
+    if analysis["violations"]:
+        report["success"] = False
+
+
+def _write_text_atomic(path: str, text: str):
+    """先写临时文件再原子替换，避免中途失败留下半个文件"""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def post_process(config_path: str, html_input_path: str, html_output_path: str,
+                 stages=None, options: dict = None) -> dict:
     """
     后处理主流程：
     1. 加载并校验 config
     2. 加载 AI 生成的 HTML
-    3. 注入图片 URL
-    4. 验证 HTML 结构
-    5. 输出最终 HTML 和报告
+    3. 注入图片 URL（未启用可选阶段时流式写出最终 HTML）
+    4. 执行启用的可选阶段（见 OPTIONAL_STAGES）
+    5. 验证 HTML 结构
+    6. 统计输出体积；options["budget"]（如 "60KB"）超出时构建失败；
+       options["analyze"] 启用时分析页面体积与渲染成本，超出模板预算时构建失败
+    7. 输出报告并更新增量缓存
+    8. options["export"] 启用时导出 CDN 发布目录（预压缩 + 哈希资源名 + manifest.json）
+
+    输入均未变化时直接返回缓存的报告（report["cached"] 为 True）；options["force"] 强制重建。
+    各阶段的耗时 / CPU 时间（tracemalloc 启动时还有内存峰值）写入 report["timings"]。
     """
     report = {
         "config_errors": [],
         "config_warnings": [],
         "html_warnings": [],
         "image_stats": {},
+        "stages": {},
         "success": False,
     }
+    stages = [name for name in OPTIONAL_STAGES if name in (stages or ())]
+    options = options or {}
+    output_dir = os.path.dirname(html_output_path)
+    timer = StageTimer()
 
-    # 1. 加载并校验 config
-    config = load_config(config_path)
-    errors, warnings = validate_config(config)
-    report["config_errors"] = errors
-    report["config_warnings"] = warnings
+    def finish(result):
+        result["timings"] = timer.results()
+        return result
 
-    if errors:
+    # 1. 加载 config；config、草稿、脚本版本、阶段开关与引用资源均未变化时直接返回缓存报告
+    with timer.stage("load"):
+        config = load_config(config_path)
+        config_digest = _file_digest(config_path)
+        try:
+            fingerprint = _input_fingerprint(config_digest, _file_digest(html_input_path), stages, options)
+        except FileNotFoundError:
+            fingerprint = None
+        cache_path = _build_cache_path(html_output_path)
+        cache = {} if options.get("force") else _load_build_cache(cache_path)
+        hit = _cache_hit(cache, fingerprint, html_output_path, output_dir or ".")
+    if hit:
+        cached = cache["report"]
+        cached["cached"] = True
+        with timer.stage("export"):
+            _export_for_cdn(cached, html_output_path, options)
+        return finish(cached)
+
+    # 校验只依赖 config，config 未变化时复用上次结果
+    with timer.stage("validate"):
+        if cache.get("config_digest") == config_digest and cache.get("script") == _script_fingerprint():
+            issues = cache["config_issues"]
+        else:
+            issues = validate_config_issues(config)
+    report["config_issues"] = issues
+    report["config_errors"] = [i["message"] for i in issues if i["level"] == "error"]
+    report["config_warnings"] = [i["message"] for i in issues if i["level"] == "warning"]
+
+    budget = None
+    if options.get("budget"):
+        try:
+            budget = parse_size(options["budget"])
+        except ValueError as e:
+            report["config_errors"].append(f"体积预算参数错误: {e}")
+
+    if report["config_errors"]:
         report["success"] = False
-        return report
+        return finish(report)
 
-    # 2. 加载 HTML
+    # 2. 打开 HTML
     try:
-        with open(html_input_path, "r", encoding="utf-8") as f:
-            html = f.read()
+        html_in = open(html_input_path, "r", encoding="utf-8")
     except FileNotFoundError:
         report["config_errors"].append(f"HTML 文件不存在: {html_input_path}")
-        return report
+        return finish(report)
 
-    # 3. 注入图片
+    # 3. 注入图片：边读边写到临时文件，完成后原子替换
     image_urls = get_image_urls_from_config(config)
-    html, image_stats = inject_images(html, image_urls)
-    report["image_stats"] = image_stats
-
-    # 4. 验证 HTML 结构
-    html_warnings = validate_html_structure(html)
-    report["html_warnings"] = html_warnings
-
-    # 5. 输出最终 HTML
-    output_dir = os.path.dirname(html_output_path)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    with open(html_output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+    injector = SlotImageInjector(image_urls)
+    if not stages:
+        # 流式模式下读取、注入、结构扫描与写出在同一次遍历中完成，统一计入 inject
+        tmp_path = html_output_path + ".tmp"
+        scanner = StructureScanner()
+        refs = AssetRefCollector()
+        with timer.stage("inject"):
+            try:
+                with html_in, open(tmp_path, "w", encoding="utf-8") as html_out:
+                    image_stats, html_size = inject_images_stream(
+                        html_in, html_out, image_urls, sinks=(scanner.feed, refs.feed), injector=injector
+                    )
+                os.replace(tmp_path, html_output_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            html_facts = scanner.close()
+    else:
+        # 可选阶段需要完整文档
+        with timer.stage("inject"), html_in:
+            html = injector.feed(html_in.read()) + injector.close()
+        image_stats = injector.stats
+        # 结构扫描针对注入后的草稿，结果与启用了哪些优化阶段无关
+        with timer.stage("structure"):
+            html_facts = scan_html_structure(html)
+
+        # 4. 可选阶段
+        ctx = {
+            "config": config,
+            "image_urls": image_urls,
+            "output_dir": output_dir or ".",
+            "html_output_path": html_output_path,
+            "report": report,
+            "options": options or {},
+        }
+        for name in stages:
+            with timer.stage(name):
+                html = _load_stage(name)(html, ctx)
+
+        with timer.stage("write"):
+            refs = AssetRefCollector()
+            refs.feed(html)
+            _write_text_atomic(html_output_path, html)
+        html_size = len(html)
+
+    report["image_stats"] = image_stats
+    report["slot_usage"] = slot_usage(image_urls, injector.slot_counters)
+
+    # 5. 验证 HTML 结构
+    with timer.stage("structure"):
+        report["html_facts"] = html_facts
+        report["html_warnings"] = structure_warnings(html_facts) + report["html_warnings"]
 
     report["success"] = True
     report["template_id"] = config.get("template_id", "unknown")
     report["template_name"] = TEMPLATE_NAMES.get(config.get("template_id", ""), "未知")
-    report["html_size"] = len(html)
+    report["html_size"] = html_size
+
+    # 6. 体积报告与预算（按磁盘字节数计）
+    st = os.stat(html_output_path)
+    report["size"] = {
+        "before": os.path.getsize(html_input_path),
+        "after": st.st_size,
+        "budget": budget,
+    }
+    if budget is not None and st.st_size > budget:
+        report["success"] = False
+        report["size_error"] = (
+            f"输出 {st.st_size / 1024:.1f} KB 超出体积预算 {budget / 1024:.1f} KB"
+            f"（超出 {(st.st_size - budget) / 1024:.1f} KB）"
+        )
+
+    # 体积与渲染成本分析（见 page_analyzer.py）；超出模板预算时构建失败
+    if options.get("analyze"):
+        with timer.stage("analyze"):
+            _analyze_output(report, html_output_path, options)
+
+    # 7. 更新缓存
+    if fingerprint:
+        with timer.stage("cache"):
+            _save_build_cache(cache_path, {
+                "fingerprint": fingerprint,
+                "script": _script_fingerprint(),
+                "config_digest": config_digest,
+                "config_issues": issues,
+                "output": [st.st_size, st.st_mtime_ns],
+                "assets": _asset_stats(output_dir or ".", refs.close()),
+                "report": report,
+            })
+
+    # 8. CDN 导出（不计入缓存：每次都与发布目录的 manifest 对比）
+    if options.get("export"):
+        with timer.stage("export"):
+            _export_for_cdn(report, html_output_path, options)
+    return finish(report)
 
-    return report
+
+# ============================================================
+# 批量模式
+# ============================================================
+
+# 目录模式下识别的文件名（与 SKILL.md 中的工作目录约定一致）
+BATCH_CONFIG_NAME = "config.json"
+BATCH_DRAFT_NAME = "draft.html"
+BATCH_OUTPUT_PATH = os.path.join("output", "index.html")
 
 
-def print_report(report: dict):
-    """打印格式化的报告"""
+def load_batch_jobs(source: str) -> list:
+    """
+    解析批量任务来源，返回 [{"config", "input", "output"}, ...]。
+
+    - 目录：递归查找同时包含 config.json 与 draft.html 的子目录，
+      输出到该子目录下的 output/index.html
+    - 清单文件（JSONL）：每行一个 {"config", "input", "output"} 对象，
+      相对路径以清单文件所在目录为基准
+    """
+    jobs = []
+
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            if BATCH_CONFIG_NAME in files and BATCH_DRAFT_NAME in files:
+                jobs.append({
+                    "config": os.path.join(root, BATCH_CONFIG_NAME),
+                    "input": os.path.join(root, BATCH_DRAFT_NAME),
+                    "output": os.path.join(root, BATCH_OUTPUT_PATH),
+                })
+        return jobs
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    try:
+        with open(source, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"清单第 {line_no} 行 JSON 格式错误: {e}")
+                missing = [k for k in ("config", "input", "output") if not entry.get(k)]
+                if missing:
+                    raise ValueError(f"清单第 {line_no} 行缺少字段: {', '.join(missing)}")
+                jobs.append({
+                    key: os.path.join(base_dir, entry[key])
+                    for key in ("config", "input", "output")
+                })
+    except FileNotFoundError:
+        raise FileNotFoundError(f"批量清单不存在: {source}")
+
+    return jobs
+
+
+def _run_batch_job(job: dict, stages=None, options: dict = None) -> dict:
+    """进程池 worker：处理单个页面，任何异常都记录在结果中而不向外抛出"""
+    started = time.perf_counter()
+    record = dict(job)
+    try:
+        report = post_process(job["config"], job["input"], job["output"], stages, options)
+        record["report"] = report
+        record["success"] = report["success"]
+    except Exception as e:
+        record["report"] = None
+        record["success"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return record
+
+
+def run_batch(source: str, report_path: str, jobs_count: int = None,
+              stages=None, options: dict = None) -> dict:
+    """
+    批量后处理：以进程池（默认按 CPU 核数）并行执行
+    validate_config → inject_images → validate_html_structure，
+    每完成一个页面即向 report_path 追加一行 JSON 报告。
+
+    stages / options 与 post_process 相同。单个页面失败不会中断批次。返回汇总统计。
+    """
+    jobs = load_batch_jobs(source)
+    summary = {"total": len(jobs), "succeeded": 0, "failed": 0}
+
+    report_dir = os.path.dirname(report_path)
+    if report_dir and not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+
+    started = time.perf_counter()
+    with open(report_path, "w", encoding="utf-8") as out:
+        if jobs:
+            workers = max(1, min(jobs_count or os.cpu_count() or 1, len(jobs)))
+            # 任务按块分发，减少进程间通信次数；结果按完成顺序流式写出
+            chunksize = max(1, len(jobs) // (workers * 8))
+            worker = partial(_run_batch_job, stages=stages, options=options)
+            with Pool(processes=workers) as pool:
+                for record in pool.imap_unordered(worker, jobs, chunksize):
+                    if record["success"]:
+                        summary["succeeded"] += 1
+                    else:
+                        summary["failed"] += 1
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+    elapsed = time.perf_counter() - started
+
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["pages_per_sec"] = round(len(jobs) / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+def print_batch_summary(summary: dict, report_path: str):
+    """打印批量模式汇总"""
+    print("=" * 60)
+    print("  Landing Page 批量后处理报告")
+    print("=" * 60)
+    print(f"\n  页面总数: {summary['total']}")
+    print(f"  ✓ 成功: {summary['succeeded']}")
+    if summary["failed"]:
+        print(f"  ✗ 失败: {summary['failed']}")
+    print(f"\n  耗时: {summary['elapsed_s']:.2f} s")
+    print(f"  吞吐量: {summary['pages_per_sec']:.1f} 页/秒")
+    print(f"\n  ✓ 逐页报告已输出: {report_path}")
+    print("=" * 60)
+
+
+def print_report(report: dict, show_timings: bool = False):
+    """打印格式化的报告；show_timings 时附带各阶段耗时"""
     print("=" * 60)
     print("  Landing Page 后处理报告")
     print("=" * 60)
@@ -431,6 +1340,9 @@ def print_report(report: dict):
         name = report.get("template_name", "")
         print(f"\n  模板: {report['template_id']}（{name}）")
 
+    if report.get("cached"):
+        print("\n  ✓ 输入未变化，复用上次构建结果（--force 强制重建）")
+
     # Config 校验
     errors = report.get("config_errors", [])
     warnings = report.get("config_warnings", [])
@@ -453,6 +1365,14 @@ def print_report(report: dict):
     injected = stats.get("injected", 0)
     empty = stats.get("empty_slots", 0)
     print(f"\n  ✓ 图片注入: {injected} 张已注入, {empty} 个槽位待填充")
+    unused = {
+        slot: u["provided"] - u["consumed"]
+        for slot, u in report.get("slot_usage", {}).items()
+        if u["provided"] > u["consumed"]
+    }
+    if unused:
+        detail = ", ".join(f"{slot}×{n}" for slot, n in unused.items())
+        print(f"    ⚠ {sum(unused.values())} 张图片没有对应槽位: {detail}")
 
     # HTML 结构
     html_warnings = report.get("html_warnings", [])
@@ -463,40 +1383,118 @@ def print_report(report: dict):
     else:
         print(f"\n  ✓ HTML 结构检查通过")
 
+    # 可选阶段
+    for name, stage_report in report.get("stages", {}).items():
+        label = OPTIONAL_STAGES[name][2] if name in OPTIONAL_STAGES else name
+        print(f"\n  ✓ {label}: {stage_report.get('summary', '完成')}")
+
+    # 体积
+    size = report.get("size")
+    if size:
+        line = f"\n  体积: {size['before'] / 1024:.1f} KB → {size['after'] / 1024:.1f} KB"
+        if size.get("budget") is not None:
+            line += f"（预算 {size['budget'] / 1024:.1f} KB）"
+        print(line)
+    if report.get("size_error"):
+        print(f"\n  ✗ {report['size_error']}")
+
+    # 页面分析
+    analysis = report.get("analysis")
+    if analysis:
+        mark = "✗" if analysis.get("error") or analysis["violations"] else "✓"
+        print(f"\n  {mark} 页面分析: {analysis['summary']}")
+        for v in analysis["violations"]:
+            print(f"    ✗ {v['message']}")
+
+    # CDN 导出
+    export = report.get("export")
+    if export:
+        mark = "✗" if export.get("error") else "✓"
+        print(f"\n  {mark} CDN 导出: {export['summary']}")
+
+    # 阶段耗时
+    if show_timings and report.get("timings"):
+        print("\n  阶段耗时:")
+        for line in format_timings(report["timings"]):
+            print(line)
+
     # 总结
     if report.get("success"):
-        size_kb = report.get("html_size", 0) / 1024
+        size_kb = (size["after"] if size else report.get("html_size", 0)) / 1024
         print(f"\n  ✓ 生成成功（{size_kb:.1f} KB）")
     print("=" * 60)
 
 
+def _parse_cli_args(argv: list) -> tuple:
+    """拆分位置参数与 --flag / --key=value 开关"""
+    args = []
+    flags = {}
+    for arg in argv:
+        if arg.startswith("--"):
+            key, sep, value = arg[2:].partition("=")
+            flags[key] = value if sep else True
+        else:
+            args.append(arg)
+    return args, flags
+
+
+def _print_usage():
+    print("Landing Page 后处理工具")
+    print()
+    print("用法:")
+    print("  python generate_landing_page.py <config.json> <input.html> <output.html> [可选阶段...]")
+    print()
+    print("示例:")
+    print("  python generate_landing_page.py config.json draft.html landing.html")
+    print()
+    print("功能:")
+    print("  1. 校验 config.json（基于 config-guide.md 规范）")
+    print("  2. 将 config 中的图片 URL 注入到 HTML")
+    print("  3. 验证 HTML 基础结构")
+    print("  4. 输出最终 landing.html + 校验报告")
+    print()
+    print("可选阶段:")
+    for name, (_, _, label) in OPTIONAL_STAGES.items():
+        print(f"  --{name:<20} {label}")
+    print()
+    print("加 --budget=60KB 设定输出体积预算，超出时构建失败（退出码 1）。")
+    print("加 --analyze 分析页面体积与渲染成本，超出模板预算时构建失败（--analyze-budgets=budgets.json 覆盖阈值）。")
+    print("加 --export[=dist] 导出 CDN 发布目录：资源哈希命名、.br/.gz 预压缩、manifest.json。")
+    print("加 --timings 打印各阶段耗时，--memory 同时统计各阶段内存峰值（tracemalloc，较慢）。")
+    print("加 --profile[=PATH] 用 cProfile 运行并写出统计文件（默认 <output>.prof）；--json 以 JSON 输出完整报告。")
+    print("输入未变化时复用上次结果，加 --force 强制重建。")
+    print("加 --watch [--port=8000] 进入监听模式：文件变化自动重建，并在预览页面中实时刷新。")
+    print()
+    print("也可仅校验 config（不处理 HTML）:")
+    print("  python generate_landing_page.py config.json --validate-only")
+    print()
+    print("批量模式（清单为 JSONL 或包含 config.json + draft.html 的目录）:")
+    print("  python generate_landing_page.py --batch <manifest.jsonl|目录> <report.jsonl> [--jobs=N]")
+
+
 def main():
     """命令行入口"""
-    if len(sys.argv) < 4:
-        print("Landing Page 后处理工具")
-        print()
-        print("用法:")
-        print("  python generate_landing_page.py <config.json> <input.html> <output.html>")
-        print()
-        print("示例:")
-        print("  python generate_landing_page.py config.json draft.html landing.html")
-        print()
-        print("功能:")
-        print("  1. 校验 config.json（基于 config-guide.md 规范）")
-        print("  2. 将 config 中的图片 URL 注入到 HTML")
-        print("  3. 验证 HTML 基础结构")
-        print("  4. 输出最终 landing.html + 校验报告")
-        print()
-        print("也可仅校验 config（不处理 HTML）:")
-        print("  python generate_landing_page.py config.json --validate-only")
-        sys.exit(1)
+    args, flags = _parse_cli_args(sys.argv[1:])
+    stages = [name for name in OPTIONAL_STAGES if flags.get(name)]
 
-    config_path = sys.argv[1]
+    # 批量模式
+    if flags.get("batch"):
+        if len(args) < 2:
+            _print_usage()
+            sys.exit(1)
+        try:
+            jobs_count = int(flags["jobs"]) if flags.get("jobs") else None
+            summary = run_batch(args[0], args[1], jobs_count, stages, flags)
+            print_batch_summary(summary, args[1])
+            sys.exit(1 if summary["failed"] else 0)
+        except Exception as e:
+            print(f"✗ 批量处理失败: {e}", file=sys.stderr)
+            sys.exit(1)
 
     # 仅校验模式
-    if len(sys.argv) == 3 and sys.argv[2] == "--validate-only":
+    if flags.get("validate-only") and len(args) == 1:
         try:
-            config = load_config(config_path)
+            config = load_config(args[0])
             errors, warnings = validate_config(config)
             print("=" * 60)
             print("  Config 校验报告")
@@ -511,18 +1509,54 @@ def main():
                 print(f"\n  ⚠ {len(warnings)} 条建议:")
                 for w in warnings:
                     print(f"    - {w}")
+            template_id = config.get("template_id")
+            if template_id in VALID_TEMPLATE_IDS:
+                usage = slot_usage(get_image_urls_from_config(config), template_slot_counts(template_id))
+                if usage:
+                    print(f"\n  图片槽位（预估，{template_id}）:")
+                    for slot, u in usage.items():
+                        print(f"    {slot}: 槽位 {u['slots']} / 提供 {u['provided']} / 注入 {u['consumed']}")
             print("=" * 60)
             sys.exit(1 if errors else 0)
         except Exception as e:
             print(f"✗ 校验失败: {e}", file=sys.stderr)
             sys.exit(1)
 
-    html_input = sys.argv[2]
-    html_output = sys.argv[3]
+    if len(args) < 3:
+        _print_usage()
+        sys.exit(1)
+
+    config_path, html_input, html_output = args[:3]
 
+    # 监听模式
+    if flags.get("watch"):
+        scripts_dir = os.path.dirname(os.path.abspath(__file__))
+        if scripts_dir not in sys.path:
+            sys.path.insert(0, scripts_dir)
+        from preview_server import DEFAULT_PORT, watch
+        try:
+            port = int(flags["port"]) if flags.get("port") else DEFAULT_PORT
+            watch(config_path, html_input, html_output, post_process, print_report, stages, flags, port)
+            sys.exit(0)
+        except Exception as e:
+            print(f"✗ 监听模式失败: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    if flags.get("memory"):
+        tracemalloc.start()
     try:
-        report = post_process(config_path, html_input, html_output)
-        print_report(report)
+        if flags.get("profile"):
+            profile_path = flags["profile"] if isinstance(flags["profile"], str) else html_output + ".prof"
+            report = profile_call(profile_path, post_process, config_path, html_input, html_output, stages, flags)
+            report["profile"] = profile_path
+        else:
+            report = post_process(config_path, html_input, html_output, stages, flags)
+        if flags.get("json"):
+            print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+        else:
+            print_report(report, show_timings=bool(flags.get("timings") or flags.get("memory")))
+            if report.get("profile"):
+                print(f"  cProfile 统计已写入: {report['profile']}（python -m pstats 查看）")
         sys.exit(0 if report["success"] else 1)
     except Exception as e:
         print(f"✗ 处理失败: {e}", file=sys.stderr)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+阶段计时与内存统计（Instrumentation）
+
+post_process() 与 parse_html_to_config() 用 StageTimer 记录每个阶段的：
+
+  - wall_ms：墙钟耗时
+  - cpu_ms：本进程 CPU 时间
+  - peak_kb：阶段内 Python 分配峰值（相对阶段开始时）；仅在 tracemalloc 已启动时记录，
+    tracemalloc 会明显拖慢执行，因此默认不启动（命令行加 --memory）
+
+结果写入报告的 "timings"：{"stages": {名称: {...}}, "total": {...}}；tracemalloc 已启动时
+total 中另有 peak_kb（整个运行期间的峰值）。
+
+各阶段的峰值需要 tracemalloc.reset_peak()，它会清掉进程级峰值。外层测量（如 benchmark.py）
+应改用 reset_traced_peak() / traced_peak()：每次重置前的峰值都会记录下来，不会丢失。
+
+profile_call() 用 cProfile 运行一次调用并写出 pstats 文件（命令行 --profile[=PATH]），
+可用 python -m pstats PATH 或 snakeviz 查看。
+"""
+
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# 各次 reset_peak() 之前观察到的最高峰值（字节）
+_PEAK_SEEN = 0
+
+
+def _note_peak() -> int:
+    global _PEAK_SEEN
+    _PEAK_SEEN = max(_PEAK_SEEN, tracemalloc.get_traced_memory()[1])
+    return _PEAK_SEEN
+
+
+def reset_traced_peak():
+    """开始一次外层峰值测量（替代直接调用 tracemalloc.reset_peak()）"""
+    global _PEAK_SEEN
+    _PEAK_SEEN = 0
+    tracemalloc.reset_peak()
+
+
+def traced_peak() -> int:
+    """自 reset_traced_peak()（或 tracemalloc 启动后首次调用它）以来的真实峰值（字节）"""
+    return _note_peak()
+
+
+class StageTimer:
+    """按顺序记录各阶段耗时；同名阶段重复进入时累加"""
+
+    def __init__(self):
+        self.stages = {}
+        self._started = (time.perf_counter(), time.process_time())
+        self._base = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self._peak = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            self._peak = max(self._peak, _note_peak())
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0})
+            entry["wall_ms"] = round(entry["wall_ms"] + (time.perf_counter() - wall) * 1000, 3)
+            entry["cpu_ms"] = round(entry["cpu_ms"] + (time.process_time() - cpu) * 1000, 3)
+            if tracing:
+                stage_peak = tracemalloc.get_traced_memory()[1]
+                self._peak = max(self._peak, stage_peak)
+                peak = max(0, stage_peak - base) / 1024
+                entry["peak_kb"] = round(max(entry.get("peak_kb", 0.0), peak), 1)
+
+    def results(self) -> dict:
+        wall, cpu = self._started
+        total = {
+            "wall_ms": round((time.perf_counter() - wall) * 1000, 3),
+            "cpu_ms": round((time.process_time() - cpu) * 1000, 3),
+        }
+        if self._base is not None and tracemalloc.is_tracing():
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            total["peak_kb"] = round(max(0, peak - self._base) / 1024, 1)
+        return {"stages": self.stages, "total": total}
+
+
+def profile_call(path: str, fn, *args, **kwargs):
+    """在 cProfile 下执行 fn(*args, **kwargs)，统计写入 path，返回 fn 的返回值"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+
+
+def format_timings(timings: dict, indent: str = "    ") -> list:
+    """把 timings 格式化为对齐的文本行（供 print_report 等使用）"""
+    rows = list(timings["stages"].items()) + [("合计", timings["total"])]
+    width = max(len(name) for name, _ in rows)
+    lines = []
+    for name, t in rows:
+        line = f"{indent}{name:<{width}}  {t['wall_ms']:>9.1f} ms  CPU {t['cpu_ms']:>9.1f} ms"
+        if "peak_kb" in t:
+            line += f"  峰值 {t['peak_kb']:>8.0f} KB"
+        lines.append(line)
+    return lines
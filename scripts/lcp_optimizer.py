@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+LCP 优化：图片加载优先级与固有尺寸（LCP Optimizer）
+
+角色定位：inject_images() 只设置 src，不写 width/height、loading、decoding、fetchpriority，
+页面因此产生布局偏移，Hero 图还要与画廊图片争抢带宽。本模块在图片注入后：
+
+  1. 读取每个本地 data-slot 图片的真实像素尺寸，写入 width / height（已有时不覆盖），
+     并插入 :where(img[width][height]) { height: auto } —— 零优先级，模板中设置了高度的
+     规则照常生效，其余图片按固有宽高比占位
+  2. 第一个 hero 槽位：fetchpriority="high"，并在 <head> 中添加 <link rel="preload" as="image">
+     （已被响应式阶段改写为 <picture> 时，preload 首选格式的 srcset）
+  3. 首屏以下的槽位（gallery / editorial / step / section 等）：loading="lazy" decoding="async"
+
+作为 generate_landing_page.py 的可选阶段使用：--optimize-lcp
+
+读取尺寸只解析文件头（PNG / GIF / JPEG / WebP / AVIF），无需第三方依赖；
+其他格式在安装了 Pillow 时由 Pillow 读取。
+"""
+
+import os
+import re
+import struct
+import sys
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 为可选依赖
+    Image = None
+
+
+# 首屏以下的槽位：延迟加载 + 异步解码
+LAZY_SLOTS = {"gallery", "editorial", "step", "section", "content", "story", "video-thumbnail"}
+# 获得最高优先级并预加载的 LCP 候选槽位
+LCP_SLOT = "hero"
+
+ASPECT_RATIO_CSS = "<style>:where(img[width][height]){height:auto}</style>"
+
+_IMG_TAG_RE = re.compile(r"<img\b[^>]*>", re.I)
+_PICTURE_RE = re.compile(r"<picture\b.*?</picture>", re.I | re.S)
+_SOURCE_TAG_RE = re.compile(r"<source\b[^>]*>", re.I)
+_HEAD_OPEN_RE = re.compile(r"<head\b[^>]*>", re.I)
+_HEAD_RESOURCE_RE = re.compile(r"<(?:link|style|script)\b", re.I)
+_QUOTED_RE = re.compile(r"\"[^\"]*\"|'[^']*'")
+
+
+def _attr(tag: str, name: str):
+    m = re.search(r"""\s%s\s*=\s*(["'])(.*?)\1""" % re.escape(name), tag, re.I | re.S)
+    return m.group(2) if m else None
+
+
+def _has_attr(tag: str, name: str) -> bool:
+    names = _QUOTED_RE.sub('""', tag)  # 忽略属性值中的文字
+    return re.search(r"\s%s(?:\s*=|[\s/>])" % re.escape(name), names, re.I) is not None
+
+
+def _add_attrs(tag: str, attrs: str) -> str:
+    end = -2 if tag.endswith("/>") else -1
+    return tag[:end].rstrip() + attrs + (" />" if end == -2 else ">")
+
+
+# ============================================================
+# 图片尺寸
+# ============================================================
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:  # 填充字节
+            marker = marker[1:] + f.read(1)
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length = struct.unpack(">H", f.read(2))[0]
+        # SOF0–SOF15（不含 DHT C4、JPG C8、DAC CC）
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, 1)
+
+
+def _avif_size(data: bytes):
+    idx = data.find(b"ispe")
+    if idx == -1 or idx + 16 > len(data):
+        return None
+    return struct.unpack(">II", data[idx + 8:idx + 16])
+
+
+def image_size(path: str):
+    """返回 (宽, 高)，无法识别时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return struct.unpack("<HH", head[6:10])
+            if head.startswith(b"\xff\xd8"):
+                return _jpeg_size(f)
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                chunk = head[12:16]
+                if chunk == b"VP8 ":
+                    w, h = struct.unpack("<HH", head[26:30])
+                    return w & 0x3FFF, h & 0x3FFF
+                if chunk == b"VP8L":
+                    bits = int.from_bytes(head[21:25], "little")
+                    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                if chunk == b"VP8X":
+                    return (int.from_bytes(head[24:27], "little") + 1,
+                            int.from_bytes(head[27:30], "little") + 1)
+            if head[4:12] in (b"ftypavif", b"ftypavis"):
+                f.seek(0)
+                return _avif_size(f.read(64 * 1024))
+    except (OSError, struct.error):
+        return None
+    if Image is not None:
+        try:
+            with Image.open(path) as img:
+                return img.size
+        except Exception:
+            return None
+    return None
+
+
+# ============================================================
+# 页面改写
+# ============================================================
+
+def _preload_link(img_tag: str, picture: str = None) -> str:
+    """为 LCP 图片生成 preload：<picture> 中优先使用第一个 <source>（首选格式）"""
+    source = _SOURCE_TAG_RE.search(picture) if picture else None
+    tag = source.group(0) if source else img_tag
+    attrs = ' as="image"'
+    srcset = _attr(tag, "srcset")
+    if srcset:
+        attrs += f' imagesrcset="{srcset}"'
+        sizes = _attr(tag, "sizes")
+        if sizes:
+            attrs += f' imagesizes="{sizes}"'
+    if not source or not srcset:
+        attrs = f' href="{_attr(img_tag, "src")}"' + attrs
+    if source and _attr(tag, "type"):
+        attrs += f' type="{_attr(tag, "type")}"'
+    return f'<link rel="preload"{attrs} fetchpriority="high">'
+
+
+def optimize_lcp(html: str, output_dir: str) -> tuple:
+    """
+    为 data-slot 图片写入固有尺寸与加载优先级。返回 (新 HTML, 统计)。
+    """
+    stats = {"sized": 0, "lazy": 0, "preload": None, "unsized": []}
+    pictures = [(m.start(), m.end(), m.group(0)) for m in _PICTURE_RE.finditer(html)]
+    sizes_cache = {}
+    lcp_done = False
+    head_links = []
+
+    out = []
+    pos = 0
+    for match in _IMG_TAG_RE.finditer(html):
+        tag = match.group(0)
+        slot = _attr(tag, "data-slot")
+        src = _attr(tag, "src")
+        if not slot or not src:
+            continue
+        new_tag = tag
+
+        # 1. 固有尺寸（只处理本地文件，外部 URL 无法在构建时读取）
+        if not (_has_attr(tag, "width") and _has_attr(tag, "height")):
+            path = os.path.join(output_dir, src)
+            if src not in sizes_cache:
+                is_local = not re.match(r"^(?:[a-z]+:)?//", src, re.I) and not src.startswith("data:")
+                sizes_cache[src] = image_size(path) if is_local and os.path.isfile(path) else None
+            size = sizes_cache[src]
+            if size:
+                new_tag = _add_attrs(new_tag, f' width="{size[0]}" height="{size[1]}"')
+                stats["sized"] += 1
+            else:
+                stats["unsized"].append(src)
+
+        # 2. 加载优先级
+        if slot == LCP_SLOT and not lcp_done:
+            lcp_done = True
+            if not _has_attr(new_tag, "fetchpriority"):
+                new_tag = _add_attrs(new_tag, ' fetchpriority="high"')
+            picture = next((p for start, end, p in pictures if start <= match.start() < end), None)
+            head_links.append(_preload_link(new_tag, picture))
+            stats["preload"] = src
+        elif slot in LAZY_SLOTS:
+            attrs = ""
+            if not _has_attr(new_tag, "loading"):
+                attrs += ' loading="lazy"'
+            if not _has_attr(new_tag, "decoding"):
+                attrs += ' decoding="async"'
+            if attrs:
+                new_tag = _add_attrs(new_tag, attrs)
+                stats["lazy"] += 1
+
+        out.append(html[pos:match.start()])
+        out.append(new_tag)
+        pos = match.end()
+    out.append(html[pos:])
+    html = "".join(out)
+
+    if stats["sized"]:
+        head_links.append(ASPECT_RATIO_CSS)
+    if head_links:
+        head_open = _HEAD_OPEN_RE.search(html)
+        insert_at = head_open.end() if head_open else 0
+        # 放在 <head> 中第一个外部资源之前，让预加载尽早开始
+        first = _HEAD_RESOURCE_RE.search(html, insert_at)
+        if first:
+            insert_at = first.start()
+            line_start = html.rfind("\n", 0, insert_at) + 1
+            if not html[line_start:insert_at].strip():
+                insert_at = line_start
+        block = "".join(f"    {line}\n" for line in head_links)
+        if insert_at and html[insert_at - 1] != "\n":
+            block = "\n" + block
+        html = html[:insert_at] + block + html[insert_at:]
+    return html, stats
+
+
+def optimize_lcp_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    html, stats = optimize_lcp(html, ctx["output_dir"])
+    summary = f"{stats['sized']} 张图片写入固有尺寸, {stats['lazy']} 张延迟加载"
+    summary += f", 预加载 {stats['preload']}" if stats["preload"] else ", 未找到 hero 图片"
+    stats["summary"] = summary
+    if stats["unsized"]:
+        ctx["report"]["html_warnings"].append(
+            f"{len(stats['unsized'])} 张图片无法读取尺寸（外部 URL 或格式不支持），"
+            f"可先运行 --localize-assets: {', '.join(sorted(set(stats['unsized']))[:5])}")
+    ctx["report"]["stages"]["optimize-lcp"] = stats
+    return html
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) < 2:
+        print("LCP 优化：图片固有尺寸与加载优先级")
+        print()
+        print("用法:")
+        print("  python lcp_optimizer.py <input.html> <output.html>")
+        print()
+        print("图片路径相对于 <output.html> 所在目录解析。")
+        sys.exit(1)
+
+    try:
+        with open(args[0], "r", encoding="utf-8") as f:
+            html = f.read()
+        html, stats = optimize_lcp(html, os.path.dirname(os.path.abspath(args[1])))
+        with open(args[1], "w", encoding="utf-8") as f:
+            f.write(html)
+    except Exception as e:
+        print(f"✗ 处理失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✓ {stats['sized']} 张图片写入固有尺寸, {stats['lazy']} 张延迟加载")
+    if stats["preload"]:
+        print(f"✓ 预加载 hero 图片: {stats['preload']}")
+    for src in sorted(set(stats["unsized"])):
+        print(f"  ⚠ 无法读取尺寸: {src}")
+
+
+if __name__ == "__main__":
+    main()
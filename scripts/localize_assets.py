@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+外部图片本地化（Asset Localizer）
+
+角色定位：config-guide.md 要求最终交付的 output/ 目录完全自包含。本模块把 HTML 中
+引用的外部 http(s):// 图片并发下载到 output/assets/，按 {slot}-{n}.{ext} 命名，
+并把引用改写为相对路径 assets/xxx。
+
+用法：
+  python localize_assets.py <input.html> <output.html> [--workers=N] [--timeout=S] [--retries=N]
+  python localize_assets.py --self-check
+
+--self-check 在 127.0.0.1 上启动替身 HTTP 服务器（重定向、5xx 后恢复、404、非图片、无效 URL），
+检查下载、命名、重试、失败记录、引用改写和二次运行复用。
+
+也可作为 generate_landing_page.py 的可选阶段：--localize-assets
+
+功能：
+  1. 收集 <img src> 和 CSS url() 中的外部图片 URL（config 中的图片在注入后同样位于 <img src>）
+  2. 线程池并发下载：每线程复用 HTTP 连接、并发数有上限、超时 + 指数退避重试
+  3. 按槽位命名落盘，已下载过的 URL 通过 assets/.localized.json 复用，不重复下载
+  4. 改写 HTML 引用，返回统计
+"""
+
+import http.client
+import json
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlsplit
+
+
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_RETRIES = 3
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+MAX_REDIRECTS = 5
+
+# 下载记录：URL → assets/ 相对路径，用于跨次运行复用
+LOCALIZED_MANIFEST = ".localized.json"
+
+# 不按图片处理的 url() 资源（字体由字体阶段处理）
+_FONT_EXTENSIONS = (".woff", ".woff2", ".ttf", ".otf", ".eot")
+
+_IMG_TAG_RE = re.compile(r"<img\b[^>]*>", re.I)
+_SRC_ATTR_RE = re.compile(r"""(\ssrc\s*=\s*)(["'])(https?://[^"']+)\2""", re.I)
+_SLOT_ATTR_RE = re.compile(r"""data-slot\s*=\s*(["'])([^"']*)\1""", re.I)
+_CSS_URL_RE = re.compile(r"""url\(\s*(["']?)(https?://[^)"'\s]+)\1\s*\)""", re.I)
+
+
+# ============================================================
+# URL 收集
+# ============================================================
+
+def _url_path(url: str) -> str:
+    """URL 的路径部分；格式错误（如不完整的 IPv6 主机）时为空串"""
+    try:
+        return urlsplit(url).path
+    except ValueError:
+        return ""
+
+
+def collect_external_images(html: str) -> list:
+    """
+    收集 HTML 中的外部图片，返回 [(url, 命名前缀), ...]，按首次出现顺序去重。
+    data-slot 图片命名为 {slot}-{该 slot 的第 n 个槽位}，其余 <img> 为 image-{n}，
+    CSS 背景图为 background-{n}。
+    """
+    found = {}
+    slot_counters = {}
+    plain_count = 0
+
+    for tag in _IMG_TAG_RE.finditer(html):
+        tag_text = tag.group(0)
+        slot_match = _SLOT_ATTR_RE.search(tag_text)
+        if slot_match:
+            slot = slot_match.group(2)
+            slot_counters[slot] = slot_counters.get(slot, 0) + 1
+            stem = f"{slot}-{slot_counters[slot]}"
+        else:
+            plain_count += 1
+            stem = f"image-{plain_count}"
+        src_match = _SRC_ATTR_RE.search(tag_text)
+        if src_match:
+            found.setdefault(src_match.group(3), stem)
+
+    background_count = 0
+    for match in _CSS_URL_RE.finditer(html):
+        url = match.group(2)
+        if _url_path(url).lower().endswith(_FONT_EXTENSIONS) or url in found:
+            continue
+        background_count += 1
+        found[url] = f"background-{background_count}"
+
+    return list(found.items())
+
+
+# ============================================================
+# 下载（连接复用 + 超时 + 重试）
+# ============================================================
+
+class DownloadError(Exception):
+    """单个资源下载失败"""
+
+
+class HTTPFetcher:
+    """
+    轻量 HTTP 客户端：每个线程按 (scheme, host, port) 复用 keep-alive 连接，
+    对网络错误、429 和 5xx 做指数退避重试。
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 max_bytes: int = MAX_IMAGE_BYTES):
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connection(self, scheme: str, netloc: str):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = (scheme, netloc)
+        conn = conns.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[key] = cls(netloc, timeout=self.timeout)
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str):
+        conn = self._local.conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def _get_once(self, url: str) -> tuple:
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers={
+                    "User-Agent": "landing-page-generator/asset-localizer",
+                    "Accept": "image/*",
+                })
+                resp = conn.getresponse()
+                body = resp.read(self.max_bytes + 1)
+            except (OSError, ValueError, http.client.HTTPException):
+                self._drop_connection(parts.scheme, parts.netloc)
+                raise
+            if resp.will_close:
+                self._drop_connection(parts.scheme, parts.netloc)
+
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                url = urljoin(url, resp.getheader("Location"))
+                continue
+            return resp.status, resp.getheader("Content-Type", ""), body
+        raise DownloadError(f"重定向次数过多: {url}")
+
+    def fetch(self, url: str) -> tuple:
+        """下载 URL，返回 (Content-Type, bytes)；失败抛出 DownloadError"""
+        last_error = None
+        for attempt in range(self.retries):
+            if attempt:
+                time.sleep(0.25 * 2 ** (attempt - 1))
+            try:
+                status, content_type, body = self._get_once(url)
+            except (ValueError, http.client.InvalidURL) as e:
+                # URL 本身有误（含主机名 IDNA 编码失败的 UnicodeError），重试无意义
+                raise DownloadError(f"URL 无效: {e}")
+            except (OSError, http.client.HTTPException) as e:
+                last_error = f"{type(e).__name__}: {e}"
+                continue
+            if status == 429 or status >= 500:
+                last_error = f"HTTP {status}"
+                continue
+            if status != 200:
+                raise DownloadError(f"HTTP {status}")
+            if len(body) > self.max_bytes:
+                raise DownloadError(f"文件超过 {self.max_bytes // (1024 * 1024)} MB 上限")
+            if not content_type.lower().startswith("image/"):
+                raise DownloadError(f"不是图片（Content-Type: {content_type or '未知'}）")
+            return content_type, body
+        raise DownloadError(f"重试 {self.retries} 次后仍失败: {last_error}")
+
+
+def _guess_extension(url: str, content_type: str) -> str:
+    mime = content_type.split(";")[0].strip().lower()
+    ext = mimetypes.guess_extension(mime) if mime else None
+    if ext in (".jpe", ".jpeg"):
+        ext = ".jpg"
+    if not ext:
+        ext = os.path.splitext(_url_path(url))[1].lower() or ".img"
+    return ext
+
+
+# ============================================================
+# 本地化主流程
+# ============================================================
+
+def _load_manifest(assets_dir: str) -> dict:
+    try:
+        with open(os.path.join(assets_dir, LOCALIZED_MANIFEST), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_manifest(assets_dir: str, manifest: dict):
+    # 先写临时文件再原子替换；临时文件名带进程号，批量模式下共享 assets/ 的进程互不覆盖
+    path = os.path.join(assets_dir, LOCALIZED_MANIFEST)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def localize_assets(html: str, output_dir: str, workers: int = DEFAULT_WORKERS,
+                    timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                    fetcher: HTTPFetcher = None) -> tuple:
+    """
+    下载 HTML 中的外部图片到 output_dir/assets/ 并改写引用。
+    返回 (改写后的 HTML, 统计)。下载失败的 URL 保持原样并记录在 stats["failed"] 中。
+    """
+    assets_dir = os.path.join(output_dir, "assets")
+    stats = {"found": 0, "downloaded": 0, "reused": 0, "bytes": 0, "failed": {}, "mapping": {}}
+
+    images = collect_external_images(html)
+    stats["found"] = len(images)
+    if not images:
+        return html, stats
+
+    os.makedirs(assets_dir, exist_ok=True)
+    manifest = _load_manifest(assets_dir)
+
+    pending = []
+    for url, stem in images:
+        local = manifest.get(url)
+        if local and os.path.exists(os.path.join(output_dir, local)):
+            stats["mapping"][url] = local
+            stats["reused"] += 1
+        else:
+            pending.append((url, stem))
+
+    if pending:
+        fetcher = fetcher or HTTPFetcher(timeout=timeout, retries=retries)
+
+        def download(item):
+            url, stem = item
+            try:
+                return url, stem, fetcher.fetch(url), None
+            except (DownloadError, ValueError) as e:
+                return url, stem, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+            results = list(pool.map(download, pending))
+
+        # 按出现顺序命名落盘，保证文件名稳定；已存在的同名文件不覆盖
+        taken = set(manifest.values())
+        for url, stem, fetched, error in results:
+            if error:
+                stats["failed"][url] = error
+                continue
+            content_type, body = fetched
+            ext = _guess_extension(url, content_type)
+            name = f"{stem}{ext}"
+            slot, _, index = stem.rpartition("-")
+            n = int(index)
+            while f"assets/{name}" in taken or os.path.exists(os.path.join(assets_dir, name)):
+                n += 1
+                name = f"{slot}-{n}{ext}"
+            with open(os.path.join(assets_dir, name), "wb") as f:
+                f.write(body)
+            local = f"assets/{name}"
+            taken.add(local)
+            manifest[url] = local
+            stats["mapping"][url] = local
+            stats["downloaded"] += 1
+            stats["bytes"] += len(body)
+
+        _save_manifest(assets_dir, manifest)
+
+    mapping = stats["mapping"]
+    if mapping:
+        def rewrite_img(match):
+            return _SRC_ATTR_RE.sub(
+                lambda m: f"{m.group(1)}{m.group(2)}{mapping.get(m.group(3), m.group(3))}{m.group(2)}",
+                match.group(0),
+            )
+
+        def rewrite_css(match):
+            url = match.group(2)
+            if url not in mapping:
+                return match.group(0)
+            return f"url({match.group(1)}{mapping[url]}{match.group(1)})"
+
+        html = _IMG_TAG_RE.sub(rewrite_img, html)
+        html = _CSS_URL_RE.sub(rewrite_css, html)
+
+    return html, stats
+
+
+def localize_assets_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    options = ctx["options"]
+    html, stats = localize_assets(
+        html,
+        ctx["output_dir"],
+        workers=int(options.get("asset-workers", DEFAULT_WORKERS)),
+        timeout=float(options.get("asset-timeout", DEFAULT_TIMEOUT)),
+        retries=int(options.get("asset-retries", DEFAULT_RETRIES)),
+    )
+    summary = f"{stats['downloaded']} 张已下载, {stats['reused']} 张复用"
+    if stats["failed"]:
+        summary += f", {len(stats['failed'])} 张失败"
+    stats["summary"] = summary
+    ctx["report"]["stages"]["localize-assets"] = stats
+    for url, error in stats["failed"].items():
+        ctx["report"]["html_warnings"].append(f"外部图片下载失败，仍为外部引用: {url}（{error}）")
+    return html
+
+
+# ============================================================
+# 自检（本地替身服务器）
+# ============================================================
+
+# 1×1 透明 PNG
+_TEST_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """模拟图片 CDN：正常图片、重定向、先 503 后成功、404、非图片响应"""
+
+    protocol_version = "HTTP/1.1"
+    flaky_hits = {}
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/redirect.png":
+            return self._reply(302, b"", "text/plain", {"Location": "/img/hero.png"})
+        if path == "/flaky.png":
+            hits = self.flaky_hits[path] = self.flaky_hits.get(path, 0) + 1
+            if hits == 1:
+                return self._reply(503, b"busy", "text/plain")
+        if path == "/page.html":
+            return self._reply(200, b"<html></html>", "text/html")
+        if path.startswith("/img/") or path == "/flaky.png":
+            return self._reply(200, _TEST_PNG, "image/png")
+        return self._reply(404, b"not found", "text/plain")
+
+    def _reply(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_self_check() -> list:
+    """
+    在 127.0.0.1 上启动替身服务器，对一份包含各类 URL 的页面执行两次本地化。
+    返回 [(检查项, 是否通过, 说明), ...]
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    _StandInHandler.flaky_hits = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    html = (
+        f'<img data-slot="hero" src="{base}/img/hero.png">\n'
+        f'<img data-slot="gallery" src="{base}/redirect.png">\n'
+        f'<img data-slot="gallery" src="{base}/flaky.png">\n'
+        f'<img src="{base}/missing.png">\n'
+        f'<img src="{base}/page.html">\n'
+        f'<img src="http://[::1/broken.png">\n'
+        f'<img src="http://127.0.0.1:port/bad-port.png">\n'
+        f'<div style="background: url({base}/img/bg.png)"></div>\n'
+    )
+    checks = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="lp-localize-") as out:
+            first, stats = localize_assets(html, out, workers=4, timeout=5, retries=2)
+            mapping = stats["mapping"]
+            checks.append(("下载并按槽位命名", mapping.get(f"{base}/img/hero.png") == "assets/hero-1.png",
+                           mapping.get(f"{base}/img/hero.png")))
+            checks.append(("跟随重定向", mapping.get(f"{base}/redirect.png") == "assets/gallery-1.png",
+                           mapping.get(f"{base}/redirect.png")))
+            checks.append(("5xx 后重试成功", mapping.get(f"{base}/flaky.png") == "assets/gallery-2.png",
+                           mapping.get(f"{base}/flaky.png")))
+            checks.append(("CSS 背景图", mapping.get(f"{base}/img/bg.png") == "assets/background-1.png",
+                           mapping.get(f"{base}/img/bg.png")))
+            expected_failures = {f"{base}/missing.png", f"{base}/page.html",
+                                 "http://[::1/broken.png", "http://127.0.0.1:port/bad-port.png"}
+            checks.append(("404 / 非图片 / 无效 URL 记为失败", set(stats["failed"]) == expected_failures,
+                           ", ".join(sorted(stats["failed"]))))
+            checks.append(("引用已改写", "assets/hero-1.png" in first and f"{base}/img/" not in first, ""))
+            _, again = localize_assets(html, out, workers=4, timeout=5, retries=1)
+            checks.append(("再次运行复用已下载文件", again["reused"] == 4 and again["downloaded"] == 0,
+                           f"复用 {again['reused']}, 下载 {again['downloaded']}"))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return checks
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if "--self-check" in sys.argv[1:]:
+        checks = run_self_check()
+        for name, ok, detail in checks:
+            print(f"  {'✓' if ok else '✗'} {name}" + (f"（{detail}）" if detail else ""))
+        sys.exit(0 if all(ok for _, ok, _ in checks) else 1)
+    if len(args) < 2:
+        print("外部图片本地化")
+        print()
+        print("用法:")
+        print("  python localize_assets.py <input.html> <output.html> [--workers=N] [--timeout=S] [--retries=N]")
+        print("  python localize_assets.py --self-check    # 对本地替身 HTTP 服务器运行一遍完整流程")
+        print()
+        print("图片保存到 <output.html> 所在目录的 assets/ 下，引用改写为相对路径。")
+        sys.exit(1)
+
+    html_input, html_output = args[0], args[1]
+    try:
+        with open(html_input, "r", encoding="utf-8") as f:
+            html = f.read()
+        output_dir = os.path.dirname(html_output) or "."
+        html, stats = localize_assets(
+            html,
+            output_dir,
+            workers=int(flags.get("workers", DEFAULT_WORKERS)),
+            timeout=float(flags.get("timeout", DEFAULT_TIMEOUT)),
+            retries=int(flags.get("retries", DEFAULT_RETRIES)),
+        )
+        with open(html_output, "w", encoding="utf-8") as f:
+            f.write(html)
+    except Exception as e:
+        print(f"✗ 本地化失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print("=" * 60)
+    print("  外部图片本地化报告")
+    print("=" * 60)
+    print(f"\n  外部图片: {stats['found']} 张")
+    print(f"  ✓ 已下载: {stats['downloaded']} 张（{stats['bytes'] / 1024:.1f} KB）")
+    print(f"  ✓ 复用: {stats['reused']} 张")
+    if stats["failed"]:
+        print(f"\n  ✗ 下载失败（{len(stats['failed'])} 张，保留原 URL）:")
+        for url, error in stats["failed"].items():
+            print(f"    ✗ {url}: {error}")
+    print("=" * 60)
+    sys.exit(1 if stats["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+HTML / CSS / JS 压缩（Minify）
+
+角色定位：post_process() 默认按 AI 草稿原样输出，保留了缩进、注释和冗长的内联 <script>。
+本模块在不改变渲染结果的前提下压缩最终 HTML：
+
+  1. HTML：删除注释（保留 <!--[if ...]> 条件注释），标签内空白折叠为单个空格；
+     文本中的连续空白折叠为单个空格，仅在不参与行内排版的结构性标签旁整段删除；
+     <pre> / <textarea> / <code> 原样保留
+  2. CSS：删除注释，删除 { } ; : , > 等符号两侧的空白和块末分号（字符串原样保留）
+  3. JS：删除注释，折叠空白；换行只在确定不影响自动分号插入时删除（字符串、模板字符串、
+     正则字面量原样保留）；application/ld+json 压缩为紧凑 JSON；其他 type 的脚本不处理
+  4. 属性值原样保留（data-slot / data-size 不受影响）
+
+用法：
+  python minify.py <input.html> <output.html>
+
+也可作为 generate_landing_page.py 的可选阶段：--minify（可配合 --budget=60KB 设定体积预算）
+"""
+
+import json
+import re
+import sys
+
+
+# 两侧空白不参与渲染的结构性标签（不含 div / li / span 等可能为 inline-block 的元素）
+STRUCTURAL_TAGS = {
+    "html", "head", "body", "meta", "link", "title", "base", "script", "style", "noscript",
+    "template", "section", "nav", "header", "footer", "main", "article", "aside",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "dl", "br", "hr",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th", "caption", "colgroup", "col",
+    "form", "fieldset", "figure", "figcaption", "source", "defs",
+}
+# 无结束标签的元素（不进入保留空白的嵌套计数）
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "source", "track", "wbr",
+}
+JS_TYPES = {"", "text/javascript", "application/javascript", "module"}
+
+_TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(pre|textarea|code|script|style)\b[^>]*>.*?</\1\s*>"
+    r"|<[!/]?[A-Za-z][^>]*>"
+    r"|[^<]+"
+    r"|<",
+    re.I | re.S,
+)
+_TAG_NAME_RE = re.compile(r"</?([A-Za-z][\w-]*)")
+_TAG_SPACE_RE = re.compile(r"(\"[^\"]*\"|'[^']*')|\s+")
+_RAW_RE = re.compile(r"(<(\w+)\b[^>]*>)(.*)(</\2\s*>)", re.I | re.S)
+_TYPE_ATTR_RE = re.compile(r"""\stype\s*=\s*(["']?)([^"'\s>]*)\1""", re.I)
+_SPACE_RE = re.compile(r"\s+")
+# 声明了 white-space: pre / pre-wrap / pre-line 的 CSS 规则：(选择器, 声明块)
+_PRE_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_PRE_DECL_RE = re.compile(r"white-space\s*:\s*(?:pre|break-spaces)", re.I)
+_STYLE_BLOCK_RE = re.compile(r"<style\b[^>]*>(.*?)</style\s*>", re.I | re.S)
+_CLASS_ATTR_RE = re.compile(r"""\sclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I)
+_STYLE_ATTR_RE = re.compile(r"""\sstyle\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.I)
+
+
+# ============================================================
+# CSS
+# ============================================================
+
+_CSS_TIGHT = set("{};:,>~")
+
+
+def minify_css(css: str) -> str:
+    """压缩 CSS 文本（保守：不改写属性值，只删注释和多余空白）"""
+    out = []
+    i = 0
+    n = len(css)
+    while i < n:
+        c = css[i]
+        if c == "/" and css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            if out and out[-1] != " ":
+                out.append(" ")
+            continue
+        if c in "\"'":
+            j = i + 1
+            while j < n and css[j] != c:
+                j += 2 if css[j] == "\\" else 1
+            out.append(css[i:j + 1])
+            i = j + 1
+            continue
+        if c.isspace():
+            while i < n and css[i].isspace():
+                i += 1
+            # 空白前的冒号保留（".a :hover" 与 ".a:hover" 含义不同）
+            if out and out[-1] not in _CSS_TIGHT and out[-1] != " " and i < n \
+                    and (css[i] not in _CSS_TIGHT or css[i] == ":") and css[i] != "!":
+                out.append(" ")
+            continue
+        if c in _CSS_TIGHT and c != ":" and out and out[-1] == " ":
+            out.pop()
+        if c == "}" and out and out[-1] == ";":
+            out.pop()
+        out.append(c)
+        i += 1
+    return "".join(out).strip()
+
+
+# ============================================================
+# JS
+# ============================================================
+
+# 其后的 "/" 为正则字面量而非除号
+_REGEX_PREFIX_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_PREFIX_WORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete",
+                       "void", "throw", "instanceof", "yield", "await"}
+# 换行前后为这些字符时删除换行不会改变自动分号插入的结果
+_NEWLINE_DROP_AFTER = set("{;,([=:&|?!<>")
+_NEWLINE_DROP_BEFORE = set(")]},;")
+# 输出末尾是不含小数点 / 指数的十进制整数字面量：其后紧跟 "." 会被解析为小数点（1 .toString()）
+_TRAILING_INT_RE = re.compile(r"(?<![\w$.])\d[\d_]*$")
+
+
+def _is_ident_char(c: str) -> bool:
+    return c.isalnum() or c in "_$\\" or ord(c) > 127
+
+
+def _skip_js_string(js: str, i: int) -> int:
+    quote = js[i]
+    i += 1
+    while i < len(js):
+        if js[i] == "\\":
+            i += 2
+            continue
+        if js[i] == quote or js[i] == "\n":
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_template(js: str, i: int) -> int:
+    """i 指向反引号，返回模板字符串结束后的位置（处理 ${...} 中的嵌套）"""
+    i += 1
+    n = len(js)
+    while i < n:
+        c = js[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "`":
+            return i + 1
+        if c == "$" and js.startswith("${", i):
+            i += 2
+            depth = 1
+            while i < n and depth:
+                c = js[i]
+                if c in "\"'":
+                    i = _skip_js_string(js, i)
+                    continue
+                if c == "`":
+                    i = _skip_template(js, i)
+                    continue
+                depth += {"{": 1, "}": -1}.get(c, 0)
+                i += 1
+            continue
+        i += 1
+    return n
+
+
+def _skip_regex(js: str, i: int) -> int:
+    i += 1
+    n = len(js)
+    in_class = False
+    while i < n:
+        c = js[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "\n":
+            return i
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            while i < n and _is_ident_char(js[i]):
+                i += 1
+            return i
+        i += 1
+    return n
+
+
+def _regex_allowed(out: list) -> bool:
+    text = "".join(out[-32:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in _REGEX_PREFIX_CHARS:
+        return True
+    if _is_ident_char(text[-1]):
+        word = re.search(r"[\w$]+$", text)
+        return bool(word) and word.group(0) in _REGEX_PREFIX_WORDS
+    return False
+
+
+def minify_js(js: str) -> str:
+    """压缩 JS 文本：删除注释与多余空白，不做变量重命名等改写"""
+    out = []
+    i = 0
+    n = len(js)
+    pending = None  # 待输出的空白：" " 或 "\n"
+    while i < n:
+        c = js[i]
+        if c.isspace():
+            start = i
+            while i < n and js[i].isspace():
+                i += 1
+            ws = "\n" if "\n" in js[start:i] else " "
+            pending = "\n" if pending == "\n" else ws
+            continue
+        if c == "/" and js.startswith("//", i):
+            end = js.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if c == "/" and js.startswith("/*", i):
+            end = js.find("*/", i + 2)
+            comment_end = n if end == -1 else end + 2
+            ws = "\n" if "\n" in js[i:comment_end] else " "
+            pending = "\n" if pending == "\n" else ws
+            i = comment_end
+            continue
+
+        if pending and out:
+            prev = out[-1][-1]
+            if pending == "\n":
+                if prev not in _NEWLINE_DROP_AFTER and c not in _NEWLINE_DROP_BEFORE:
+                    out.append("\n")
+            elif (_is_ident_char(prev) and _is_ident_char(c)) \
+                    or (prev in "+-" and c == prev) or (prev == "/" and c == "/") \
+                    or (c == "." and prev.isdigit() and _TRAILING_INT_RE.search("".join(out[-32:]))):
+                out.append(" ")
+        pending = None
+
+        if c in "\"'":
+            end = _skip_js_string(js, i)
+        elif c == "`":
+            end = _skip_template(js, i)
+        elif c == "/" and _regex_allowed(out):
+            end = _skip_regex(js, i)
+        else:
+            end = i + 1
+        out.append(js[i:end])
+        i = end
+    return "".join(out)
+
+
+# ============================================================
+# HTML
+# ============================================================
+
+def _tag_name(token: str) -> str:
+    m = _TAG_NAME_RE.match(token)
+    return m.group(1).lower() if m else ""
+
+
+def _minify_tag(token: str) -> str:
+    tag = _TAG_SPACE_RE.sub(lambda m: m.group(1) or " ", token)
+    # 无引号属性值末尾的 "/" 属于属性值，只在引号或标签名后删除 "/>" 前的空白
+    tag = re.sub(r"\s+>$", ">", tag)
+    return re.sub(r"(?<=[\"'])\s+/>$", "/>", tag)
+
+
+def _minify_raw(token: str, stats: dict) -> str:
+    m = _RAW_RE.match(token)
+    if not m:
+        return token
+    open_tag, name, body, close_tag = m.group(1), m.group(2).lower(), m.group(3), m.group(4)
+    if name == "style":
+        stats["styles"] += 1
+        return _minify_tag(open_tag) + minify_css(body) + close_tag
+    if name == "script":
+        type_match = _TYPE_ATTR_RE.search(open_tag)
+        script_type = type_match.group(2).lower() if type_match else ""
+        if script_type == "application/ld+json":
+            try:
+                body = json.dumps(json.loads(body), ensure_ascii=False, separators=(",", ":"))
+            except ValueError:
+                return token
+        elif script_type in JS_TYPES and body.strip():
+            body = minify_js(body).strip()
+            stats["scripts"] += 1
+        else:
+            return token
+        return _minify_tag(open_tag) + body + close_tag
+    return token  # pre / textarea / code 原样保留
+
+
+def _pre_selectors(html: str) -> tuple:
+    """
+    从 <style> 块中找出声明 white-space: pre* 的选择器，返回 (类名集合, 标签名集合)。
+    只看每个选择器最右侧的复合选择器：有类名取类名，否则取标签名（宁可多保留空白）。
+    """
+    classes, tags = set(), set()
+    for block in _STYLE_BLOCK_RE.findall(html):
+        for selectors, body in _PRE_RULE_RE.findall(block):
+            if not _PRE_DECL_RE.search(body):
+                continue
+            for selector in selectors.split(","):
+                compound = selector.split()[-1] if selector.split() else ""
+                names = re.findall(r"\.([\w-]+)", compound)
+                if names:
+                    classes.update(names)
+                elif re.match(r"[A-Za-z][\w-]*", compound):
+                    tags.add(re.match(r"[A-Za-z][\w-]*", compound).group(0).lower())
+    return classes, tags
+
+
+def _keeps_whitespace(token: str, name: str, pre_classes: set, pre_tags: set) -> bool:
+    """开始标签是否使元素内空白按原样渲染（white-space: pre*）"""
+    if name in pre_tags:
+        return True
+    m = _STYLE_ATTR_RE.search(token)
+    if m and _PRE_DECL_RE.search(m.group(1) or m.group(2) or ""):
+        return True
+    m = _CLASS_ATTR_RE.search(token)
+    return bool(m and pre_classes.intersection((m.group(1) or m.group(2) or m.group(3) or "").split()))
+
+
+def minify_html(html: str) -> tuple:
+    """压缩整个 HTML 文档，返回 (新 HTML, 统计)"""
+    stats = {"bytes_before": len(html.encode("utf-8")), "comments": 0, "scripts": 0, "styles": 0}
+    tokens = [m.group(0) for m in _TOKEN_RE.finditer(html)]
+    pre_classes, pre_tags = _pre_selectors(html)
+
+    # 每个位置之后第一个非注释 token 的标签名（反向扫描一次）
+    next_tags = [""] * len(tokens)
+    following = ""
+    for idx in range(len(tokens) - 1, -1, -1):
+        next_tags[idx] = following
+        if not tokens[idx].startswith("<!--"):
+            following = _tag_name(tokens[idx]) if tokens[idx].startswith("<") else ""
+
+    out = []
+    preserve = []  # white-space: pre* 元素内尚未闭合的标签名；非空时文本原样保留
+    for idx, token in enumerate(tokens):
+        if token.startswith("<!--"):
+            if token.startswith("<!--[if"):
+                out.append(token)
+            else:
+                stats["comments"] += 1
+            continue
+        if token.startswith("<") and len(token) > 1:
+            name = _tag_name(token)
+            if _RAW_RE.match(token) and name in ("pre", "textarea", "code", "script", "style"):
+                out.append(_minify_raw(token, stats))
+                continue
+            if token.startswith("</"):
+                if name in preserve:
+                    del preserve[len(preserve) - 1 - preserve[::-1].index(name):]
+            elif name and name not in VOID_TAGS and not token.endswith("/>") \
+                    and (preserve or _keeps_whitespace(token, name, pre_classes, pre_tags)):
+                preserve.append(name)
+            out.append(_minify_tag(token))
+            continue
+        if preserve:
+            out.append(token)
+            continue
+
+        text = _SPACE_RE.sub(" ", token)
+        if text.startswith(" ") or text.endswith(" "):
+            prev_tag = _tag_name(out[-1]) if out and out[-1].startswith("<") else ""
+            if text.startswith(" ") and (prev_tag in STRUCTURAL_TAGS or not out):
+                text = text[1:]
+            if text.endswith(" ") and next_tags[idx] in STRUCTURAL_TAGS:
+                text = text[:-1]
+        out.append(text)
+
+    html = "".join(out).strip()
+    stats["bytes_after"] = len(html.encode("utf-8"))
+    stats["bytes_saved"] = stats["bytes_before"] - stats["bytes_after"]
+    return html, stats
+
+
+def minify_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    html, stats = minify_html(html)
+    ratio = stats["bytes_saved"] / stats["bytes_before"] * 100 if stats["bytes_before"] else 0
+    stats["summary"] = (
+        f"{stats['bytes_before'] / 1024:.1f} KB → {stats['bytes_after'] / 1024:.1f} KB"
+        f"（-{ratio:.0f}%，{stats['styles']} 个样式块、{stats['scripts']} 个脚本、"
+        f"删除 {stats['comments']} 条注释）"
+    )
+    ctx["report"]["stages"]["minify"] = stats
+    return html
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) < 2:
+        print("HTML/CSS/JS 压缩")
+        print()
+        print("用法:")
+        print("  python minify.py <input.html> <output.html>")
+        sys.exit(1)
+
+    try:
+        with open(args[0], "r", encoding="utf-8") as f:
+            html = f.read()
+        html, stats = minify_html(html)
+        with open(args[1], "w", encoding="utf-8") as f:
+            f.write(html)
+    except Exception as e:
+        print(f"✗ 压缩失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✓ {stats['bytes_before'] / 1024:.1f} KB → {stats['bytes_after'] / 1024:.1f} KB"
+          f"（节省 {stats['bytes_saved'] / 1024:.1f} KB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+页面体积与渲染成本分析（Page Budget Analyzer）
+
+角色定位：validate_html_structure() 只检查标签是否存在，不回答"页面快不快"。
+本模块对最终输出做静态分析，并按模板预算判定是否通过，让慢页面在交付前就被拦下：
+
+  1. 按类型统计字节数：HTML（其中内联 CSS / JS 单列）、外部 CSS、JS、图片、字体
+  2. 估算压缩后的传输体积（文本资源 gzip -6；图片、字体按原大小）
+  3. 阻塞渲染的资源：<head> 中的同步样式表、无 async/defer 的外部脚本、CSS @import
+  4. DOM 元素数与最大嵌套深度
+  5. CSS 规则数 / 选择器数 / @keyframes 数（内联 + 本地外部样式表）
+
+预算：PAGE_BUDGETS["default"] 为通用阈值，模板可在同表中覆盖个别项；
+也可用 JSON 文件覆盖（{"default": {...}, "template-05": {...}}）。
+
+用法：
+  python page_analyzer.py <output/index.html> [--template=template-05] [--budgets=budgets.json] [--json]
+
+也可在后处理时启用：--analyze [--analyze-budgets=budgets.json]，超出预算时构建失败。
+"""
+
+import gzip
+import json
+import os
+import re
+import sys
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from css_optimizer import parse_stylesheet, stylesheet_stats
+
+
+KB = 1024
+
+# 预算项：key → (说明, 单位)
+BUDGET_METRICS = {
+    "transfer_bytes": ("估算传输体积", "bytes"),
+    "html_bytes": ("HTML 体积", "bytes"),
+    "css_bytes": ("CSS 总体积", "bytes"),
+    "js_bytes": ("JS 总体积", "bytes"),
+    "image_bytes": ("图片总体积", "bytes"),
+    "font_bytes": ("字体总体积", "bytes"),
+    "render_blocking": ("阻塞渲染资源数", "count"),
+    "dom_nodes": ("DOM 元素数", "count"),
+    "dom_depth": ("DOM 最大深度", "count"),
+    "css_rules": ("CSS 规则数", "count"),
+}
+
+# 通用阈值以 15 套模板的原始体量为基准留出余量；图片预算按桌面端最大候选计算
+PAGE_BUDGETS = {
+    "default": {
+        "transfer_bytes": 1200 * KB,
+        "html_bytes": 100 * KB,
+        "css_bytes": 60 * KB,
+        "js_bytes": 30 * KB,
+        "image_bytes": 1024 * KB,
+        "font_bytes": 200 * KB,
+        "render_blocking": 1,
+        "dom_nodes": 900,
+        "dom_depth": 20,
+        "css_rules": 400,
+    },
+    # 图片密集型模板：画廊 / 沉浸式大图
+    "template-08": {"image_bytes": 1600 * KB, "transfer_bytes": 1800 * KB},
+    "template-12": {"image_bytes": 1600 * KB, "transfer_bytes": 1800 * KB},
+    "template-15": {"image_bytes": 1600 * KB, "transfer_bytes": 1800 * KB},
+}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif", ".svg", ".ico"}
+FONT_EXTENSIONS = {".woff2", ".woff", ".ttf", ".otf", ".eot"}
+TEXT_KINDS = {"html", "css", "js"}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+              "source", "track", "wbr"}
+_URL_RE = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""", re.I)
+_IMPORT_RE = re.compile(r"""@import\s+(?:url\()?\s*["']?([^"')\s;]+)""", re.I)
+
+
+class _PageInventory(HTMLParser):
+    """一次遍历收集 DOM 规模、资源引用和内联代码"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.nodes = 0
+        self.max_depth = 0
+        self.stack = []
+        self.in_head = False
+        self.head_done = False
+        self.inline_css = []
+        self.inline_js = []
+        self.stylesheets = []   # (href, 是否阻塞渲染)
+        self.scripts = []       # (src, 是否阻塞渲染)
+        self.images = []        # 每个 <img>/<picture> 的候选 URL 列表（取最大者计重）
+        self.preloads = []
+        self._raw = None
+        self._picture = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: (v or "") for k, v in attrs}
+        self.nodes += 1
+        depth = len(self.stack) + 1
+        self.max_depth = max(self.max_depth, depth)
+        if tag not in _VOID_TAGS:
+            self.stack.append(tag)
+
+        if tag == "head":
+            self.in_head = True
+        elif tag == "body":
+            self.in_head = False
+            self.head_done = True
+        elif tag == "link":
+            rel = attrs.get("rel", "").lower().split()
+            if "stylesheet" in rel and attrs.get("href"):
+                media = attrs.get("media", "all").lower()
+                blocking = self.in_head and media in ("", "all", "screen") and "disabled" not in attrs
+                self.stylesheets.append((attrs["href"], blocking))
+            elif "preload" in rel and attrs.get("href"):
+                self.preloads.append(attrs["href"])
+        elif tag == "script":
+            src = attrs.get("src")
+            script_type = attrs.get("type", "").lower()
+            if src:
+                deferred = "async" in attrs or "defer" in attrs or script_type == "module"
+                self.scripts.append((src, not deferred and not self.head_done))
+            elif script_type in ("", "text/javascript", "application/javascript", "module"):
+                self._raw = "js"
+        elif tag == "style":
+            self._raw = "css"
+        elif tag == "picture":
+            self._picture = []
+            self.images.append(self._picture)
+        elif tag == "source" and self._picture is not None:
+            if attrs.get("srcset") and not self._picture:
+                self._picture.extend(_srcset_urls(attrs["srcset"]))
+        elif tag == "img":
+            candidates = _srcset_urls(attrs.get("srcset", "")) or [attrs.get("src", "")]
+            if self._picture is not None:
+                if not self._picture:
+                    self._picture.extend(candidates)
+            else:
+                self.images.append(candidates)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS and self.stack and self.stack[-1] == tag:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        if tag in ("style", "script"):
+            self._raw = None
+        elif tag == "picture":
+            self._picture = None
+        elif tag == "head":
+            self.in_head = False
+        if tag in self.stack:
+            while self.stack and self.stack.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        if self._raw == "css":
+            self.inline_css.append(data)
+        elif self._raw == "js":
+            self.inline_js.append(data)
+
+
+def _srcset_urls(srcset: str) -> list:
+    return [part.strip().split()[0] for part in srcset.split(",") if part.strip()]
+
+
+def _is_local(url: str) -> bool:
+    return bool(url) and not urlsplit(url).scheme and not url.startswith(("//", "#"))
+
+
+def _local_path(base_dir: str, url: str) -> str:
+    return os.path.normpath(os.path.join(base_dir, urlsplit(url).path))
+
+
+def _gzip_size(data: bytes) -> int:
+    return len(gzip.compress(data, compresslevel=6, mtime=0))
+
+
+# ============================================================
+# 分析
+# ============================================================
+
+def analyze_page(html_path: str) -> dict:
+    """对最终 HTML 及其引用的本地资源做静态分析，返回指标字典"""
+    base_dir = os.path.dirname(os.path.abspath(html_path))
+    with open(html_path, "rb") as f:
+        raw = f.read()
+    html = raw.decode("utf-8", errors="replace")
+
+    page = _PageInventory()
+    page.feed(html)
+    page.close()
+
+    bytes_by_type = {"html": len(raw), "css": 0, "js": 0, "image": 0, "font": 0}
+    transfer = {"html": _gzip_size(raw), "css": 0, "js": 0, "image": 0, "font": 0}
+    inline_css = "".join(page.inline_css)
+    inline_js = "".join(page.inline_js)
+    counted = set()
+    missing = []
+    external = []
+
+    def add(url, kind, base=base_dir):
+        if not _is_local(url):
+            if url and not url.startswith("data:"):
+                external.append(url)
+            return None
+        path = _local_path(base, url)
+        if path in counted:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            missing.append(url)
+            return None
+        counted.add(path)
+        bytes_by_type[kind] += len(data)
+        transfer[kind] += _gzip_size(data) if kind in TEXT_KINDS or path.endswith(".svg") else len(data)
+        return data
+
+    # 样式表（含其中引用的字体和背景图）
+    css_texts = [(inline_css, base_dir)]
+    for href, _ in page.stylesheets:
+        data = add(href, "css")
+        if data is not None:
+            css_texts.append((data.decode("utf-8", errors="replace"), os.path.dirname(_local_path(base_dir, href))))
+    for src, _ in page.scripts:
+        add(src, "js")
+
+    imports = []
+    css_stats = {"rules": 0, "selectors": 0, "at_rules": 0, "keyframes": 0}
+    for css, css_base in css_texts:
+        for key, value in stylesheet_stats(css).items():
+            css_stats[key] += value
+        imports.extend(_IMPORT_RE.findall(css))
+        for node in parse_stylesheet(css):
+            if node["type"] == "at" and node["name"] == "font-face" and node["body"]:
+                for m in _URL_RE.finditer(css[node["body"][0]:node["body"][1]]):
+                    add(m.group(2), "font", css_base)
+        for m in _URL_RE.finditer(css):
+            url = m.group(2)
+            ext = os.path.splitext(urlsplit(url).path)[1].lower()
+            if ext in IMAGE_EXTENSIONS:
+                add(url, "image", css_base)
+
+    # 图片：每个 <img>/<picture> 取最大的本地候选（桌面端最坏情况）
+    for candidates in page.images:
+        best = None
+        for url in candidates:
+            if _is_local(url):
+                path = _local_path(base_dir, url)
+                if os.path.isfile(path) and (best is None or os.path.getsize(path) > os.path.getsize(best[1])):
+                    best = (url, path)
+            elif url and not url.startswith("data:"):
+                external.append(url)
+        if best:
+            add(best[0], "image")
+    for href in page.preloads:
+        ext = os.path.splitext(urlsplit(href).path)[1].lower()
+        if ext in FONT_EXTENSIONS:
+            add(href, "font")
+
+    render_blocking = [href for href, blocking in page.stylesheets if blocking]
+    render_blocking += [src for src, blocking in page.scripts if blocking]
+    render_blocking += [f"@import {url}" for url in imports]
+
+    return {
+        "bytes": {
+            **bytes_by_type,
+            "inline_css": len(inline_css.encode("utf-8")),
+            "inline_js": len(inline_js.encode("utf-8")),
+            "total": sum(bytes_by_type.values()),
+        },
+        "transfer": {**transfer, "total": sum(transfer.values())},
+        "render_blocking": render_blocking,
+        "dom": {"nodes": page.nodes, "depth": page.max_depth},
+        "css": css_stats,
+        "external": sorted(set(external)),
+        "missing": sorted(set(missing)),
+    }
+
+
+# ============================================================
+# 预算
+# ============================================================
+
+def load_budgets(path: str = None) -> dict:
+    """返回合并后的预算表；path 为 JSON 覆盖文件"""
+    budgets = {key: dict(value) for key, value in PAGE_BUDGETS.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for key, overrides in json.load(f).items():
+                budgets.setdefault(key, {}).update(overrides)
+    return budgets
+
+
+def budget_for(template_id: str, budgets: dict = None) -> dict:
+    budgets = budgets or PAGE_BUDGETS
+    return {**budgets["default"], **budgets.get(template_id or "", {})}
+
+
+def metric_values(analysis: dict) -> dict:
+    """把分析结果映射到预算项"""
+    b = analysis["bytes"]
+    return {
+        "transfer_bytes": analysis["transfer"]["total"],
+        "html_bytes": b["html"],
+        "css_bytes": b["css"] + b["inline_css"],
+        "js_bytes": b["js"] + b["inline_js"],
+        "image_bytes": b["image"],
+        "font_bytes": b["font"],
+        "render_blocking": len(analysis["render_blocking"]),
+        "dom_nodes": analysis["dom"]["nodes"],
+        "dom_depth": analysis["dom"]["depth"],
+        "css_rules": analysis["css"]["rules"],
+    }
+
+
+def check_budgets(analysis: dict, template_id: str = None, budgets: dict = None) -> list:
+    """返回超出预算的项：[{"metric", "label", "value", "budget", "message"}, ...]"""
+    limits = budget_for(template_id, budgets)
+    values = metric_values(analysis)
+    violations = []
+    for metric, limit in limits.items():
+        if metric not in values or limit is None or values[metric] <= limit:
+            continue
+        label, unit = BUDGET_METRICS[metric]
+        value = values[metric]
+        if unit == "bytes":
+            message = f"{label} {value / KB:.1f} KB 超出预算 {limit / KB:.1f} KB"
+        else:
+            message = f"{label} {value} 超出预算 {limit}"
+        violations.append({"metric": metric, "label": label, "value": value, "budget": limit, "message": message})
+    return violations
+
+
+def analysis_summary(analysis: dict) -> str:
+    b = analysis["bytes"]
+    return (
+        f"传输约 {analysis['transfer']['total'] / KB:.1f} KB（原始 {b['total'] / KB:.1f} KB）, "
+        f"DOM {analysis['dom']['nodes']} 节点 / 深度 {analysis['dom']['depth']}, "
+        f"CSS {analysis['css']['rules']} 条规则, 阻塞渲染 {len(analysis['render_blocking'])} 个"
+    )
+
+
+def print_analysis(analysis: dict, violations: list, template_id: str = None):
+    b = analysis["bytes"]
+    t = analysis["transfer"]
+    print("=" * 60)
+    print("  页面体积与渲染成本分析" + (f"（{template_id}）" if template_id else ""))
+    print("=" * 60)
+    print(f"\n  {'类型':<8}{'原始':>12}{'传输(估算)':>14}")
+    for kind, label in (("html", "HTML"), ("css", "CSS"), ("js", "JS"), ("image", "图片"), ("font", "字体")):
+        print(f"  {label:<8}{b[kind] / KB:>10.1f} KB{t[kind] / KB:>12.1f} KB")
+    print(f"  {'合计':<8}{b['total'] / KB:>10.1f} KB{t['total'] / KB:>12.1f} KB")
+    print(f"\n  内联 CSS {b['inline_css'] / KB:.1f} KB, 内联 JS {b['inline_js'] / KB:.1f} KB")
+    print(f"  DOM: {analysis['dom']['nodes']} 个元素, 最大深度 {analysis['dom']['depth']}")
+    css = analysis["css"]
+    print(f"  CSS: {css['rules']} 条规则, {css['selectors']} 个选择器, {css['keyframes']} 个 @keyframes")
+    if analysis["render_blocking"]:
+        print(f"\n  ⚠ 阻塞渲染的资源（{len(analysis['render_blocking'])} 个）:")
+        for url in analysis["render_blocking"]:
+            print(f"      - {url}")
+    if analysis["external"]:
+        print(f"\n  ⚠ 外部资源 {len(analysis['external'])} 个（未计入体积）")
+    if analysis["missing"]:
+        print(f"\n  ⚠ 引用的本地文件不存在: {', '.join(analysis['missing'])}")
+    if violations:
+        print(f"\n  ✗ 超出预算（{len(violations)} 项）:")
+        for v in violations:
+            print(f"      - {v['message']}")
+    else:
+        print("\n  ✓ 所有指标均在预算内")
+    print("=" * 60)
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    if not args:
+        print("页面体积与渲染成本分析")
+        print()
+        print("用法:")
+        print("  python page_analyzer.py <output/index.html> [--template=template-05] [--budgets=budgets.json] [--json]")
+        sys.exit(1)
+
+    try:
+        analysis = analyze_page(args[0])
+        budgets = load_budgets(flags.get("budgets") or None)
+    except (OSError, ValueError) as e:
+        print(f"✗ 分析失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    template_id = flags.get("template") or None
+    violations = check_budgets(analysis, template_id, budgets)
+
+    if "json" in flags:
+        print(json.dumps({"analysis": analysis, "violations": violations}, ensure_ascii=False, indent=2))
+    else:
+        print_analysis(analysis, violations, template_id)
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,181 @@ Landing Page 解析器（HTML → Config）
 用于 Skill 的"模式B：从已有 HTML 优化"工作流。
 
 用法：
-  python parse_landing_page.py <input.html> <output_config.json>
+  python parse_landing_page.py <input.html> <output_config.json> [--parser=auto|lxml|html.parser]
+                                [--timings] [--memory] [--profile[=PATH]] [--json]
+  python parse_landing_page.py --corpus <目录|列表文件> <output.jsonl> [--jobs=N] [--restart]
+                                [--parser=...] [--json]
 
 功能：
-  1. 识别模板风格（全 15 种）
+  1. 识别模板风格（全 15 种）：与 template/ 指纹索引做余弦相似度排序，给出校准置信度（需 NumPy，
+     否则按 TEMPLATE_SIGNATURES 关键词打分）
   2. 提取产品信息、功能、评价、主题色等
   3. 识别图片槽位和现有图片 URL
   4. 输出符合 config-guide.md 规范的 config.json
+  5. 语料模式：进程池批量解析整个目录树或列表文件中的页面，每页一行 {"path", "config", "meta"}
+     流式写入 JSONL；输出文件即检查点，中断后重新运行同一命令从断点继续，结束时按模板汇总识别数量
 """
 
+import bisect
+import importlib.util
 import json
+import os
 import re
+import signal
 import sys
-from bs4 import BeautifulSoup
+import time
+import tracemalloc
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool
+from bs4 import BeautifulSoup, Tag
+
+from instrumentation import StageTimer, format_timings, profile_call
+from template_index import load_index
+
+
+# ============================================================
+# 解析后端
+# ============================================================
+
+# --parser 可选值 → BeautifulSoup 树构建器。extract_* 只使用 BeautifulSoup API，
+# 任一后端构建的树都能直接使用；auto 按顺序选择第一个已安装的后端
+PARSER_BACKENDS = {
+    "lxml": "lxml",                # C 实现（pip install lxml），建树速度约为 html.parser 的 1.3–5 倍
+    "html.parser": "html.parser",  # 标准库，始终可用
+}
+DEFAULT_PARSER = "auto"
+
+
+def available_parsers() -> list:
+    """已安装的后端（按优先级排列）"""
+    return [name for name in PARSER_BACKENDS
+            if name == "html.parser" or importlib.util.find_spec(name) is not None]
+
+
+def resolve_parser(name: str = DEFAULT_PARSER) -> str:
+    """auto → 最快的已安装后端；指定的后端未安装时抛出 ValueError"""
+    available = available_parsers()
+    if name in (None, "", True, "auto"):
+        return available[0]
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"未知的解析后端: {name}（可选 auto, {', '.join(PARSER_BACKENDS)}）")
+    if name not in available:
+        raise ValueError(f"解析后端 {name} 未安装（pip install {name}）")
+    return name
+
+
+def make_soup(html_text: str, parser: str = DEFAULT_PARSER) -> tuple:
+    """用指定后端建树，返回 (soup, 实际使用的后端名)"""
+    backend = resolve_parser(parser)
+    return BeautifulSoup(html_text, PARSER_BACKENDS[backend]), backend
+
+
+# ============================================================
+# 文档索引
+# ============================================================
+
+# 正则源码中出现这些片段时才可能跨空格匹配，需要额外检查完整的 class 属性串
+_CROSS_TOKEN_HINTS = (" ", "\\s", "\\S", ".", "[^", "\\W", "\\D")
+
+
+class DocumentIndex:
+    """
+    一次遍历建立的文档索引，供 identify_template 和全部 extract_* 查询：
+    class 名 → 元素、标签名 → 元素、data-slot → 图片，元素文本按需缓存。
+
+    查询语义与 BeautifulSoup 的 find / find_all 一致（文档顺序、within 只搜后代），
+    class_ 正则匹配任一 class 名或完整的 class 属性串。
+    """
+
+    def __init__(self, soup):
+        self.soup = soup
+        self.elements = []   # 文档顺序
+        self.by_tag = {}
+        self.by_class = {}
+        self.slots = {}      # data-slot → [img, ...]
+        self._position = {}  # id(元素) → 文档序号
+        self._end = []       # 元素最后一个后代的文档序号
+        self._text = {}
+        self._queries = {}
+        self.memo = {}       # 提取结果缓存（如 extract_images）
+
+        parents = []
+        for el in soup.descendants:
+            if not isinstance(el, Tag):
+                continue
+            position = len(self.elements)
+            self._position[id(el)] = position
+            self.elements.append(el)
+            parents.append(self._position.get(id(el.parent)))
+            self.by_tag.setdefault(el.name, []).append(el)
+            for cls in el.get("class") or ():
+                self.by_class.setdefault(cls, []).append(el)
+            if el.name == "img" and el.get("data-slot"):
+                self.slots.setdefault(el["data-slot"], []).append(el)
+
+        # 逆序传播：子元素先于父元素处理，得到每个元素后代区间的末尾
+        self._end = list(range(len(self.elements)))
+        for position in range(len(self.elements) - 1, -1, -1):
+            parent = parents[position]
+            if parent is not None and self._end[position] > self._end[parent]:
+                self._end[parent] = self._end[position]
+
+    @classmethod
+    def of(cls, doc):
+        """已是索引时原样返回，否则为 BeautifulSoup 对象建立索引"""
+        return doc if isinstance(doc, cls) else cls(doc)
+
+    @property
+    def class_names(self) -> set:
+        return set(self.by_class)
+
+    def text(self, el) -> str:
+        """等价于 el.get_text(strip=True)，每个元素只计算一次"""
+        key = id(el)
+        if key not in self._text:
+            self._text[key] = el.get_text(strip=True)
+        return self._text[key]
+
+    def _candidates(self, name, class_) -> tuple:
+        """返回 (按文档顺序的元素列表, 对应的文档序号列表)，按查询条件缓存"""
+        names = None if name is None else (name,) if isinstance(name, str) else tuple(sorted(set(name)))
+        rx = None if class_ is None else class_ if hasattr(class_, "search") else re.compile(class_)
+        key = (names, None if rx is None else (rx.pattern, rx.flags))
+        if key in self._queries:
+            return self._queries[key]
+
+        if rx is not None:
+            found = {id(el): el for cls, els in self.by_class.items() if rx.search(cls) for el in els}
+            if any(hint in rx.pattern for hint in _CROSS_TOKEN_HINTS):
+                for el in self.elements:
+                    classes = el.get("class") or ()
+                    if len(classes) > 1 and id(el) not in found and rx.search(" ".join(classes)):
+                        found[id(el)] = el
+            elements = [el for el in found.values() if names is None or el.name in names]
+        elif names is not None:
+            elements = [el for n in names for el in self.by_tag.get(n, ())]
+        else:
+            elements = self.elements
+        positions = sorted(self._position[id(el)] for el in elements)
+        result = ([self.elements[i] for i in positions], positions)
+        self._queries[key] = result
+        return result
+
+    def find_all(self, name=None, class_=None, within=None, recursive: bool = True) -> list:
+        """按标签名（字符串或列表）和 / 或 class 正则查询；within 限定为其后代（recursive=False 时只含子元素）"""
+        elements, positions = self._candidates(name, class_)
+        if within is None:
+            return list(elements)
+        start = self._position[id(within)]
+        found = elements[bisect.bisect_right(positions, start):bisect.bisect_right(positions, self._end[start])]
+        if not recursive:
+            found = [el for el in found if el.parent is within]
+        return found
+
+    def find(self, name=None, class_=None, within=None):
+        found = self.find_all(name, class_, within)
+        return found[0] if found else None
 
 
 # ============================================================
@@ -90,102 +252,172 @@ TEMPLATE_SIGNATURES = {
 }
 
 
-def identify_template(soup, html_text: str) -> tuple:
+class SignatureMatcher:
     """
-    识别模板类型。返回 (template_id, confidence_score, style_name)。
-    通过 CSS class 名称和 HTML 结构特征进行加权匹配。
+    TEMPLATE_SIGNATURES 全部关键词编译成的 Aho-Corasick 自动机。
+
+    class 集合：每个 class 名走一遍自动机。
+    HTML 文本：先用一次正则把文本切成"关键词字母表"字符的极大连续段（每个关键词出现位置必然
+    落在某一段内），再只对去重后的段跑自动机——页面再大，不同的段也只有几百个。
+    两者都与模板数、关键词数无关；结果与逐个关键词做子串检查完全一致。
     """
-    # 获取所有 class 名称
-    all_classes = set()
-    for tag in soup.find_all(True, class_=True):
-        for cls in tag.get("class", []):
-            all_classes.add(cls.lower())
-
-    # 也检查 HTML 文本中的关键词（覆盖 CSS 变量名、注释等）
-    html_lower = html_text.lower()
-
-    scores = {}
-    for tid, signatures in TEMPLATE_SIGNATURES.items():
-        score = 0
-        for keyword, weight in signatures:
-            keyword_lower = keyword.lower()
-            # 检查 class 名称（部分匹配）
-            for cls in all_classes:
-                if keyword_lower in cls:
+
+    def __init__(self, signatures: dict):
+        self.signatures = {tid: [(kw.lower(), weight) for kw, weight in sigs]
+                           for tid, sigs in signatures.items()}
+        keywords = sorted({kw for sigs in self.signatures.values() for kw, _ in sigs})
+        # goto[state] = {字符: 下一状态}；out[state] = 在该状态结束的关键词
+        self._goto = [{}]
+        self._out = [set()]
+        for kw in keywords:
+            state = 0
+            for ch in kw:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(set())
+                state = nxt
+            self._out[state].add(kw)
+        # 广度优先建立失败指针，并把失败链上的输出合并进来
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target
+                self._out[nxt] |= self._out[self._fail[nxt]]
+                queue.append(nxt)
+        alphabet = "".join(sorted({ch for kw in keywords for ch in kw}))
+        initials = "".join(sorted({kw[0] for kw in keywords}))
+        self._segment_re = re.compile(f"[{re.escape(initials)}][{re.escape(alphabet)}]*")
+
+    def scan(self, text: str, found: set) -> set:
+        """把 text 中出现的关键词加入 found 并返回"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+    def score(self, class_names, html_text: str) -> dict:
+        """返回 {template_id: 得分}：class 命中计全权重，仅文本命中计一半"""
+        in_classes = set()
+        for cls in class_names:
+            self.scan(cls.lower(), in_classes)
+        in_text = set()
+        for segment in set(self._segment_re.findall(html_text.lower())):
+            self.scan(segment, in_text)
+        scores = {}
+        for tid, signatures in self.signatures.items():
+            score = 0
+            for keyword, weight in signatures:
+                if keyword in in_classes:
                     score += weight
-                    break
-            else:
-                # 检查 HTML 文本
-                if keyword_lower in html_lower:
+                elif keyword in in_text:
                     score += weight * 0.5  # 文本匹配权重减半
-        scores[tid] = score
-
-    # 选择得分最高的
-    best = max(scores, key=scores.get)
-    best_score = scores[best]
-
-    # 置信度：最高分与第二高分的差距
-    sorted_scores = sorted(scores.values(), reverse=True)
-    confidence = best_score - sorted_scores[1] if len(sorted_scores) > 1 else best_score
-
-    style_names = {
-        "template-01": "经典Hero+Features",
-        "template-02": "产品展示+CTA",
-        "template-03": "故事讲述型",
-        "template-04": "双列布局+视频",
-        "template-05": "深色赛博风",
-        "template-06": "极简插画风",
-        "template-07": "多彩层级版",
-        "template-08": "深色沉浸式",
-        "template-09": "趣味连接型",
-        "template-10": "动态商务风",
-        "template-11": "便当盒式",
-        "template-12": "电影感/硬件流",
-        "template-13": "代码原生型",
-        "template-14": "浅色虹彩液态玻璃",
-        "template-15": "数字工坊/静谧艺廊",
-    }
+            scores[tid] = score
+        return scores
+
+
+SIGNATURE_MATCHER = SignatureMatcher(TEMPLATE_SIGNATURES)
+
+
+STYLE_NAMES = {
+    "template-01": "经典Hero+Features",
+    "template-02": "产品展示+CTA",
+    "template-03": "故事讲述型",
+    "template-04": "双列布局+视频",
+    "template-05": "深色赛博风",
+    "template-06": "极简插画风",
+    "template-07": "多彩层级版",
+    "template-08": "深色沉浸式",
+    "template-09": "趣味连接型",
+    "template-10": "动态商务风",
+    "template-11": "便当盒式",
+    "template-12": "电影感/硬件流",
+    "template-13": "代码原生型",
+    "template-14": "浅色虹彩液态玻璃",
+    "template-15": "数字工坊/静谧艺廊",
+}
+
 
-    return best, best_score, style_names.get(best, "未知")
+def rank_templates(doc, html_text: str, top: int = 3) -> list:
+    """
+    模板候选排序（最可能的在前）。
+    NumPy 可用时按 template/ 指纹索引的余弦相似度排序（见 template_index.py），条目为
+    {"template_id", "style_name", "similarity", "confidence"}，confidence 为校准后的概率；
+    否则退回 TEMPLATE_SIGNATURES 关键词打分，条目为 {"template_id", "style_name", "score"}。
+    """
+    index = load_index()
+    if index is not None:
+        matches = index.rank(html_text, top)
+    else:
+        # class 名称（部分匹配）与 HTML 文本（覆盖 CSS 变量名、注释等）各扫描一遍
+        scores = SIGNATURE_MATCHER.score(DocumentIndex.of(doc).class_names, html_text)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top]
+        matches = [{"template_id": tid, "score": scores[tid]} for tid in ranked]
+    for match in matches:
+        match["style_name"] = STYLE_NAMES.get(match["template_id"], "未知")
+    return matches
+
+
+def identify_template(doc, html_text: str) -> tuple:
+    """
+    识别模板类型。返回 (template_id, confidence_score, style_name)。
+    confidence_score 为指纹索引的校准置信度（0–1），无 NumPy 时为关键词得分。
+    doc 为 DocumentIndex（传入 soup 时自动建立）。
+    """
+    best = rank_templates(doc, html_text, top=1)[0]
+    return best["template_id"], best.get("confidence", best.get("score")), best["style_name"]
 
 
 # ============================================================
 # 内容提取
 # ============================================================
 
-def extract_product(soup) -> dict:
+def extract_product(doc) -> dict:
     """提取产品基本信息"""
+    doc = DocumentIndex.of(doc)
     product = {}
 
     # 产品名称：优先取 h1，其次取 brand/logo 文字
-    h1 = soup.find("h1")
+    h1 = doc.find("h1")
     if h1:
-        product["name"] = h1.get_text(strip=True)
+        product["name"] = doc.text(h1)
     else:
-        brand = soup.find(class_=re.compile(r"brand|logo|site-name", re.I))
+        brand = doc.find(class_=re.compile(r"brand|logo|site-name", re.I))
         if brand:
-            product["name"] = brand.get_text(strip=True)
+            product["name"] = doc.text(brand)
 
     # 标语：hero 区域的副标题或第一个 p
-    hero = soup.find(class_=re.compile(r"hero"))
+    hero = doc.find(class_=re.compile(r"hero"))
     if hero:
         # 优先找 subtitle/tagline class
-        subtitle = hero.find(class_=re.compile(r"subtitle|tagline|hero-desc", re.I))
+        subtitle = doc.find(class_=re.compile(r"subtitle|tagline|hero-desc", re.I), within=hero)
         if subtitle:
-            product["tagline"] = subtitle.get_text(strip=True)
+            product["tagline"] = doc.text(subtitle)
         else:
-            p = hero.find("p")
+            p = doc.find("p", within=hero)
             if p:
-                text = p.get_text(strip=True)
+                text = doc.text(p)
                 if 10 <= len(text) <= 100:
                     product["tagline"] = text
 
     # 描述：hero 或第一个 section 中较长的段落
-    for section in [hero, soup.find("section")]:
+    for section in [hero, doc.find("section")]:
         if not section:
             continue
-        for p in section.find_all("p"):
-            text = p.get_text(strip=True)
+        for p in doc.find_all("p", within=section):
+            text = doc.text(p)
             if 50 <= len(text) <= 500 and text != product.get("tagline"):
                 product["description"] = text
                 break
@@ -193,15 +425,15 @@ def extract_product(soup) -> dict:
             break
 
     # 图片 URL
-    images = extract_images(soup)
+    images = extract_images(doc)
     hero_images = [img for img in images if img.get("slot") == "hero"]
     if hero_images and hero_images[0].get("url"):
         product["image"] = hero_images[0]["url"]
 
     # 价格
-    price_el = soup.find(class_=re.compile(r"price", re.I))
+    price_el = doc.find(class_=re.compile(r"price", re.I))
     if price_el:
-        price_text = price_el.get_text(strip=True)
+        price_text = doc.text(price_el)
         if re.search(r"[¥$€£\d]", price_text):
             product["price"] = price_text
 
@@ -212,75 +444,66 @@ def extract_product(soup) -> dict:
     return product
 
 
-def extract_features(soup) -> list:
+def _feature_from(doc, el, title_tags) -> dict:
+    """从卡片元素提取 {title, description}；没有标题时返回 None"""
+    title_el = doc.find(title_tags, within=el)
+    if not title_el:
+        return None
+    desc_el = doc.find("p", within=el)
+    return {"title": doc.text(title_el), "description": doc.text(desc_el) if desc_el else ""}
+
+
+def extract_features(doc) -> list:
     """提取功能列表"""
+    doc = DocumentIndex.of(doc)
     features = []
 
     # 策略1：从 feature-card / feature-item 类中提取
-    cards = soup.find_all(class_=re.compile(r"feature[-_]?(card|item|box)", re.I))
-    for card in cards:
-        title_el = card.find(["h3", "h4", "h2"])
-        desc_el = card.find("p")
-        if title_el:
-            feat = {"title": title_el.get_text(strip=True)}
-            if desc_el:
-                feat["description"] = desc_el.get_text(strip=True)
-            else:
-                feat["description"] = ""
+    for card in doc.find_all(class_=re.compile(r"feature[-_]?(card|item|box)", re.I)):
+        feat = _feature_from(doc, card, ["h3", "h4", "h2"])
+        if feat:
             features.append(feat)
 
     # 策略2：从 grid 容器中的子元素提取
     if not features:
-        grid = soup.find(class_=re.compile(r"features?[-_]?(grid|list|container)", re.I))
+        grid = doc.find(class_=re.compile(r"features?[-_]?(grid|list|container)", re.I))
         if grid:
-            for child in grid.find_all(["div", "article", "li"], recursive=False):
-                title_el = child.find(["h3", "h4", "h2"])
-                desc_el = child.find("p")
-                if title_el:
-                    feat = {"title": title_el.get_text(strip=True)}
-                    if desc_el:
-                        feat["description"] = desc_el.get_text(strip=True)
-                    else:
-                        feat["description"] = ""
+            for child in doc.find_all(["div", "article", "li"], within=grid, recursive=False):
+                feat = _feature_from(doc, child, ["h3", "h4", "h2"])
+                if feat:
                     features.append(feat)
 
     # 策略3：bento grid 中的 cell
     if not features:
-        cells = soup.find_all(class_=re.compile(r"cell|bento[-_]?item", re.I))
-        for cell in cells:
-            title_el = cell.find(["h3", "h4"])
-            desc_el = cell.find("p")
-            if title_el:
-                feat = {"title": title_el.get_text(strip=True)}
-                if desc_el:
-                    feat["description"] = desc_el.get_text(strip=True)
-                else:
-                    feat["description"] = ""
+        for cell in doc.find_all(class_=re.compile(r"cell|bento[-_]?item", re.I)):
+            feat = _feature_from(doc, cell, ["h3", "h4"])
+            if feat:
                 features.append(feat)
 
     return features
 
 
-def extract_testimonials(soup) -> list:
+def extract_testimonials(doc) -> list:
     """提取用户评价"""
+    doc = DocumentIndex.of(doc)
     testimonials = []
 
-    cards = soup.find_all(class_=re.compile(r"testimonial[-_]?(card|item|quote)", re.I))
+    cards = doc.find_all(class_=re.compile(r"testimonial[-_]?(card|item|quote)", re.I))
     for card in cards:
-        quote_el = card.find(class_=re.compile(r"quote|text|content", re.I))
-        author_el = card.find(class_=re.compile(r"author|name|attribution", re.I))
+        quote_el = doc.find(class_=re.compile(r"quote|text|content", re.I), within=card)
+        author_el = doc.find(class_=re.compile(r"author|name|attribution", re.I), within=card)
 
         if not quote_el:
-            quote_el = card.find("p")
+            quote_el = doc.find("p", within=card)
         if not author_el:
             # 尝试找 cite 或最后一个小文本
-            author_el = card.find("cite")
+            author_el = doc.find("cite", within=card)
 
         testimonial = {}
         if quote_el:
-            testimonial["quote"] = quote_el.get_text(strip=True)
+            testimonial["quote"] = doc.text(quote_el)
         if author_el:
-            testimonial["author"] = author_el.get_text(strip=True)
+            testimonial["author"] = doc.text(author_el)
 
         if testimonial.get("quote"):
             testimonials.append(testimonial)
@@ -288,28 +511,29 @@ def extract_testimonials(soup) -> list:
     return testimonials
 
 
-def extract_stats(soup) -> list:
+def extract_stats(doc) -> list:
     """提取数据统计"""
+    doc = DocumentIndex.of(doc)
     stats = []
 
-    stat_items = soup.find_all(class_=re.compile(r"stat[-_]?(item|card|value|number)", re.I))
+    stat_items = doc.find_all(class_=re.compile(r"stat[-_]?(item|card|value|number)", re.I))
     for item in stat_items:
-        value_el = item.find(class_=re.compile(r"value|number|count", re.I))
-        label_el = item.find(class_=re.compile(r"label|desc|text", re.I))
+        value_el = doc.find(class_=re.compile(r"value|number|count", re.I), within=item)
+        label_el = doc.find(class_=re.compile(r"label|desc|text", re.I), within=item)
 
         if not value_el:
             # 尝试找大字体数字
-            for el in item.find_all(["h2", "h3", "span", "div"]):
-                text = el.get_text(strip=True)
+            for el in doc.find_all(["h2", "h3", "span", "div"], within=item):
+                text = doc.text(el)
                 if re.match(r"[\d,\.]+[+%KMkm]*", text):
                     value_el = el
                     break
 
         stat = {}
         if value_el:
-            stat["value"] = value_el.get_text(strip=True)
+            stat["value"] = doc.text(value_el)
         if label_el:
-            stat["label"] = label_el.get_text(strip=True)
+            stat["label"] = doc.text(label_el)
 
         if stat.get("value"):
             stats.append(stat)
@@ -317,11 +541,14 @@ def extract_stats(soup) -> list:
     return stats
 
 
-def extract_images(soup) -> list:
-    """提取所有图片信息（URL + 槽位 + 尺寸）"""
+def extract_images(doc) -> list:
+    """提取所有图片信息（URL + 槽位 + 尺寸）；结果缓存在索引上，重复调用不再遍历"""
+    doc = DocumentIndex.of(doc)
+    if "images" in doc.memo:
+        return doc.memo["images"]
     images = []
 
-    for img in soup.find_all("img"):
+    for img in doc.find_all("img"):
         info = {
             "url": img.get("src", ""),
             "alt": img.get("alt", ""),
@@ -355,11 +582,13 @@ def extract_images(soup) -> list:
 
         images.append(info)
 
+    doc.memo["images"] = images
     return images
 
 
-def extract_theme(soup, html_text: str) -> dict:
+def extract_theme(doc, html_text: str) -> dict:
     """提取主题配色"""
+    doc = DocumentIndex.of(doc)
     theme = {}
 
     # 从 CSS 变量中提取
@@ -375,7 +604,7 @@ def extract_theme(soup, html_text: str) -> dict:
 
     # 从 style 标签中提取颜色
     if not theme:
-        style_tags = soup.find_all("style")
+        style_tags = doc.find_all("style")
         all_colors = []
         for style in style_tags:
             colors = re.findall(r"#[0-9a-fA-F]{6}", style.string or "")
@@ -396,7 +625,7 @@ def extract_theme(soup, html_text: str) -> dict:
             theme["secondary_color"] = unique_colors[1]
 
     # 检测背景色（深色/浅色）
-    body = soup.find("body")
+    body = doc.find("body")
     if body:
         style = body.get("style", "")
         bg_match = re.search(r"background[-_]?color\s*:\s*(#[0-9a-fA-F]{3,8})", style)
@@ -406,25 +635,26 @@ def extract_theme(soup, html_text: str) -> dict:
     return theme
 
 
-def extract_faq(soup) -> list:
+def extract_faq(doc) -> list:
     """提取 FAQ"""
+    doc = DocumentIndex.of(doc)
     faq = []
 
-    faq_items = soup.find_all(class_=re.compile(r"faq[-_]?(item|question|entry)", re.I))
+    faq_items = doc.find_all(class_=re.compile(r"faq[-_]?(item|question|entry)", re.I))
     for item in faq_items:
-        q_el = item.find(class_=re.compile(r"question|title|header", re.I))
-        a_el = item.find(class_=re.compile(r"answer|content|body|text", re.I))
+        q_el = doc.find(class_=re.compile(r"question|title|header", re.I), within=item)
+        a_el = doc.find(class_=re.compile(r"answer|content|body|text", re.I), within=item)
 
         if not q_el:
-            q_el = item.find(["h3", "h4", "button"])
+            q_el = doc.find(["h3", "h4", "button"], within=item)
         if not a_el:
-            a_el = item.find("p")
+            a_el = doc.find("p", within=item)
 
         entry = {}
         if q_el:
-            entry["question"] = q_el.get_text(strip=True)
+            entry["question"] = doc.text(q_el)
         if a_el:
-            entry["answer"] = a_el.get_text(strip=True)
+            entry["answer"] = doc.text(a_el)
 
         if entry.get("question"):
             faq.append(entry)
@@ -432,26 +662,27 @@ def extract_faq(soup) -> list:
     return faq
 
 
-def extract_cta(soup) -> dict:
+def extract_cta(doc) -> dict:
     """提取 CTA 信息"""
+    doc = DocumentIndex.of(doc)
     cta = {}
 
-    cta_section = soup.find(class_=re.compile(r"cta[-_]?(section|area|block)", re.I))
+    cta_section = doc.find(class_=re.compile(r"cta[-_]?(section|area|block)", re.I))
     if cta_section:
-        title_el = cta_section.find(["h2", "h3"])
+        title_el = doc.find(["h2", "h3"], within=cta_section)
         if title_el:
-            cta["title"] = title_el.get_text(strip=True)
+            cta["title"] = doc.text(title_el)
 
-        subtitle_el = cta_section.find("p")
+        subtitle_el = doc.find("p", within=cta_section)
         if subtitle_el:
-            cta["subtitle"] = subtitle_el.get_text(strip=True)
+            cta["subtitle"] = doc.text(subtitle_el)
 
     # CTA 按钮文字
-    btn = soup.find(class_=re.compile(r"cta[-_]?(btn|button)", re.I))
+    btn = doc.find(class_=re.compile(r"cta[-_]?(btn|button)", re.I))
     if not btn:
-        btn = soup.find("a", class_=re.compile(r"btn[-_]?primary|button[-_]?primary|get[-_]?started", re.I))
+        btn = doc.find("a", class_=re.compile(r"btn[-_]?primary|button[-_]?primary|get[-_]?started", re.I))
     if btn:
-        cta["button_text"] = btn.get_text(strip=True)
+        cta["button_text"] = doc.text(btn)
 
     return cta
 
@@ -460,30 +691,67 @@ def extract_cta(soup) -> dict:
 # 主流程
 # ============================================================
 
-def parse_html_to_config(html_path: str, output_path: str) -> dict:
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+
+
+def read_html(path: str) -> str:
+    """
+    读取页面文本：先按 UTF-8 解码，失败时用 <meta charset> 声明的编码（抓取的竞品页面常为 GBK 等），
+    仍失败则按 UTF-8 解码并替换无法识别的字节
     """
-    解析 HTML → config.json
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        pass
+    declared = _META_CHARSET_RE.search(data[:4096])
+    if declared:
+        try:
+            return data.decode(declared.group(1).decode("ascii"))
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return data.decode("utf-8", errors="replace")
+
+
+def parse_html_to_config(html_path: str, output_path: str, parser: str = DEFAULT_PARSER) -> dict:
+    """
+    解析 HTML → config.json（output_path 为 None 时不写文件）
 
-    返回解析结果 dict，包含 config 和解析元数据。
+    返回解析结果 dict，包含 config 和解析元数据；
+    meta["timings"] 为各步骤（含每个 extract_* 函数）的耗时 / CPU 时间，meta["parser"] 为实际使用的后端。
+    parser 见 PARSER_BACKENDS；auto 时优先使用 lxml。
     """
-    with open(html_path, "r", encoding="utf-8") as f:
-        html_text = f.read()
+    timer = StageTimer()
+
+    def timed(fn, *args):
+        with timer.stage(fn.__name__):
+            return fn(*args)
 
-    soup = BeautifulSoup(html_text, "html.parser")
+    with timer.stage("read"):
+        html_text = read_html(html_path)
+
+    with timer.stage("soup"):
+        soup, backend = make_soup(html_text, parser)
+
+    # 单次遍历建立索引，之后的识别与提取都只查询索引
+    with timer.stage("index"):
+        doc = DocumentIndex(soup)
 
     # 1. 识别模板
-    template_id, score, style_name = identify_template(soup, html_text)
+    matches = timed(rank_templates, doc, html_text)
+    template_id, style_name = matches[0]["template_id"], matches[0]["style_name"]
 
     # 2. 提取所有内容
     config = {
         "template_id": template_id,
-        "product": extract_product(soup),
-        "features": extract_features(soup),
+        "product": timed(extract_product, doc),
+        "features": timed(extract_features, doc),
     }
 
     # 3. 提取可选内容
-    testimonials = extract_testimonials(soup)
-    stats = extract_stats(soup)
+    testimonials = timed(extract_testimonials, doc)
+    stats = timed(extract_stats, doc)
     if testimonials or stats:
         config["mock_data"] = {}
         if testimonials:
@@ -491,26 +759,28 @@ def parse_html_to_config(html_path: str, output_path: str) -> dict:
         if stats:
             config["mock_data"]["stats"] = stats
 
-    theme = extract_theme(soup, html_text)
+    theme = timed(extract_theme, doc, html_text)
     if theme:
         config["theme"] = theme
 
-    faq = extract_faq(soup)
+    faq = timed(extract_faq, doc)
     if faq:
         config["faq"] = faq
 
-    cta = extract_cta(soup)
+    cta = timed(extract_cta, doc)
     if cta:
         config["cta"] = cta
 
     # 4. 提取图片信息（供 AI 参考）
-    images = extract_images(soup)
+    images = timed(extract_images, doc)
     if images:
         config["_parsed_images"] = images  # 带下划线前缀，表示元数据
 
-    # 5. 输出
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    # 5. 输出（output_path 为 None 时只返回结果，供语料模式使用）
+    if output_path:
+        with timer.stage("write"):
+            with open(output_path, "w", encoding="utf-8") as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
 
     # 返回结果（含元数据）
     return {
@@ -518,23 +788,201 @@ def parse_html_to_config(html_path: str, output_path: str) -> dict:
         "meta": {
             "template_id": template_id,
             "style_name": style_name,
-            "confidence_score": score,
+            "confidence_score": matches[0].get("confidence", matches[0].get("score")),
+            "classifier": "fingerprint" if "confidence" in matches[0] else "signatures",
+            "template_matches": matches,
             "features_count": len(config.get("features", [])),
             "testimonials_count": len(testimonials),
             "images_count": len(images),
             "has_faq": bool(faq),
             "has_cta": bool(cta),
+            "parser": backend,
+            "timings": timer.results(),
         },
     }
 
 
+# ============================================================
+# 语料模式
+# ============================================================
+
+CORPUS_EXTENSIONS = (".html", ".htm")
+CORPUS_PROGRESS_EVERY = 1000   # 每完成多少页向 stderr 打印一次进度
+
+
+def iter_corpus(source: str):
+    """
+    逐个产出待解析页面路径。
+
+    - 目录：递归查找 .html / .htm 文件（按名称排序，多次运行顺序一致）
+    - 列表文件：每行一个路径，空行和 # 开头的行忽略，相对路径以列表文件所在目录为基准
+
+    路径统一为绝对路径，检查点与以不同写法（相对 / 绝对）指定的同一语料都能对上。
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(CORPUS_EXTENSIONS):
+                    yield os.path.abspath(os.path.join(root, name))
+        return
+    base_dir = os.path.dirname(os.path.abspath(source))
+    try:
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield os.path.abspath(os.path.join(base_dir, line))
+    except FileNotFoundError:
+        raise FileNotFoundError(f"语料目录或列表文件不存在: {source}")
+
+
+def load_corpus_checkpoint(output_path: str) -> tuple:
+    """
+    读取已有输出，返回 (已完成路径集合, 模板计数 Counter, 失败数)。
+    中断时可能留下不完整的最后一行，读取时截掉，续写从最后一个完整记录之后开始。
+    """
+    done, templates, failed = set(), Counter(), 0
+    if not os.path.exists(output_path):
+        return done, templates, failed
+    valid_end = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            valid_end += len(line)
+            done.add(os.path.abspath(record["path"]))
+            if "error" in record:
+                failed += 1
+            else:
+                templates[record["meta"]["template_id"]] += 1
+    if valid_end < os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_end)
+    return done, templates, failed
+
+
+def _ignore_sigint():
+    """worker 忽略 Ctrl+C，由主进程统一中断并终止进程池"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _parse_corpus_page(path: str, parser: str = DEFAULT_PARSER) -> dict:
+    """进程池 worker：解析单个页面，任何异常都记录在结果中而不向外抛出"""
+    try:
+        result = parse_html_to_config(path, None, parser)
+        return {"path": path, "config": result["config"], "meta": result["meta"]}
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_corpus(source: str, output_path: str, jobs_count: int = None,
+               parser: str = DEFAULT_PARSER, restart: bool = False, progress: bool = True) -> dict:
+    """
+    语料模式：以进程池（默认按 CPU 核数）并行解析 source 中的全部页面，
+    每完成一页即向 output_path 追加一行 {"path", "config", "meta"}（失败为 {"path", "error"}）。
+
+    结果按完成顺序流式写出，内存只与进程池中在途的页面有关。output_path 已存在时跳过
+    其中已完成的页面（restart=True 时清空重来）。返回汇总统计，"templates" 为包含
+    此前运行结果在内的按模板识别数量。
+    """
+    if restart and os.path.exists(output_path):
+        os.remove(output_path)
+    done, templates, failed = load_corpus_checkpoint(output_path)
+    pending = [path for path in iter_corpus(source) if path not in done]
+    summary = {"total": len(done) + len(pending), "resumed": len(done), "parsed": 0,
+               "failed": failed, "templates": templates}
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    started = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out:
+        if pending:
+            workers = max(1, min(jobs_count or os.cpu_count() or 1, len(pending)))
+            # 任务按块分发；块不宜过大，否则中断时在途的页面较多
+            chunksize = max(1, min(64, len(pending) // (workers * 8)))
+            worker = partial(_parse_corpus_page, parser=parser)
+            with Pool(processes=workers, initializer=_ignore_sigint) as pool:
+                for record in pool.imap_unordered(worker, pending, chunksize):
+                    if "error" in record:
+                        summary["failed"] += 1
+                    else:
+                        summary["parsed"] += 1
+                        templates[record["meta"]["template_id"]] += 1
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    finished = summary["parsed"] + summary["failed"] - failed
+                    if progress and finished % CORPUS_PROGRESS_EVERY == 0:
+                        print(f"  … {finished}/{len(pending)}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    summary["templates"] = dict(sorted(templates.items()))
+    summary["elapsed_s"] = round(elapsed, 3)
+    processed = summary["parsed"] + summary["failed"] - failed
+    summary["pages_per_sec"] = round(processed / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+def print_corpus_summary(summary: dict, output_path: str):
+    """打印语料模式汇总"""
+    print("=" * 60)
+    print("  Landing Page 语料解析报告")
+    print("=" * 60)
+    print(f"\n  页面总数: {summary['total']}")
+    if summary["resumed"]:
+        print(f"  ↻ 断点续跑：跳过已完成 {summary['resumed']} 页")
+    print(f"  ✓ 本次解析: {summary['parsed']}")
+    if summary["failed"]:
+        print(f"  ✗ 失败: {summary['failed']}")
+    print(f"\n  耗时: {summary['elapsed_s']:.2f} s")
+    print(f"  吞吐量: {summary['pages_per_sec']:.1f} 页/秒")
+    if summary["templates"]:
+        print("\n  模板识别数量:")
+        for tid, count in summary["templates"].items():
+            print(f"    {tid}  {count:>7}  {STYLE_NAMES.get(tid, '未知')}")
+    print(f"\n  ✓ 逐页结果已输出: {output_path}")
+    print("=" * 60)
+
+
+def _corpus_main(args: list, flags: dict):
+    """语料模式命令行"""
+    try:
+        parser = resolve_parser(flags.get("parser", DEFAULT_PARSER))
+        jobs_count = int(flags["jobs"]) if flags.get("jobs") else None
+        summary = run_corpus(args[0], args[1], jobs_count, parser,
+                             restart=bool(flags.get("restart")), progress=not flags.get("json"))
+    except KeyboardInterrupt:
+        print(f"\n⚠ 已中断；重新运行同一命令即从断点继续（{args[1]}）", file=sys.stderr)
+        sys.exit(130)
+    except (ValueError, OSError) as e:
+        print(f"✗ 语料解析失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    if flags.get("json"):
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_corpus_summary(summary, args[1])
+    sys.exit(1 if summary["failed"] else 0)
+
+
 def main():
     """命令行入口"""
-    if len(sys.argv) < 3:
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = {k: (v if sep else True) for k, sep, v in
+             (a[2:].partition("=") for a in sys.argv[1:] if a.startswith("--"))}
+    if flags.get("corpus") and len(args) >= 2:
+        return _corpus_main(args, flags)
+    if len(args) < 2:
         print("Landing Page 解析器（HTML → Config）")
         print()
         print("用法:")
-        print("  python parse_landing_page.py <input.html> <output_config.json>")
+        print("  python parse_landing_page.py <input.html> <output_config.json> [--parser=auto|lxml|html.parser] [--timings] [--memory] [--profile[=PATH]] [--json]")
+        print("  python parse_landing_page.py --corpus <目录|列表文件> <output.jsonl> [--jobs=N] [--restart] [--parser=...] [--json]")
         print()
         print("示例:")
         print("  python parse_landing_page.py landing.html config.json")
@@ -543,20 +991,40 @@ def main():
         print("  1. 识别模板风格（全 15 种）")
         print("  2. 提取产品信息、功能、评价等")
         print("  3. 输出符合 config-guide.md 规范的 config.json")
+        print("  4. 语料模式：并行解析整个目录或列表文件，逐页写入 JSONL，中断后重新运行即从断点继续")
         sys.exit(1)
 
-    html_path = sys.argv[1]
-    output_path = sys.argv[2]
+    html_path, output_path = args[:2]
+    try:
+        parser = resolve_parser(flags.get("parser", DEFAULT_PARSER))
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
 
+    if flags.get("memory"):
+        tracemalloc.start()
     try:
-        result = parse_html_to_config(html_path, output_path)
+        if flags.get("profile"):
+            profile_path = flags["profile"] if isinstance(flags["profile"], str) else output_path + ".prof"
+            result = profile_call(profile_path, parse_html_to_config, html_path, output_path, parser)
+            result["meta"]["profile"] = profile_path
+        else:
+            result = parse_html_to_config(html_path, output_path, parser)
         meta = result["meta"]
+        if flags.get("json"):
+            print(json.dumps({"meta": meta, "output": output_path}, ensure_ascii=False, indent=2))
+            return 0
 
         print("=" * 60)
         print("  Landing Page 解析报告")
         print("=" * 60)
         print(f"\n  ✓ 识别风格: {meta['style_name']}（{meta['template_id']}）")
-        print(f"    置信度: {meta['confidence_score']:.1f}")
+        if meta["classifier"] == "fingerprint":
+            others = ", ".join(f"{m['template_id']} {m['similarity']:.2f}" for m in meta["template_matches"][1:])
+            print(f"    置信度: {meta['confidence_score']:.0%}（相似度 {meta['template_matches'][0]['similarity']:.2f}；"
+                  f"其次: {others}；解析后端: {meta['parser']}）")
+        else:
+            print(f"    置信度: {meta['confidence_score']:.1f}（关键词得分；解析后端: {meta['parser']}）")
         print(f"\n  提取内容:")
         print(f"    产品名称: {result['config']['product'].get('name', '未知')}")
         print(f"    产品标语: {result['config']['product'].get('tagline', '未知')}")
@@ -565,6 +1033,12 @@ def main():
         print(f"    图片数量: {meta['images_count']}")
         print(f"    FAQ: {'有' if meta['has_faq'] else '无'}")
         print(f"    CTA: {'有' if meta['has_cta'] else '无'}")
+        if flags.get("timings") or flags.get("memory"):
+            print("\n  步骤耗时:")
+            for line in format_timings(meta["timings"]):
+                print(line)
+        if meta.get("profile"):
+            print(f"\n  cProfile 统计已写入: {meta['profile']}（python -m pstats 查看）")
         print(f"\n  ✓ 配置已输出: {output_path}")
         print("=" * 60)
 
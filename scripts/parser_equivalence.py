@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+解析后端一致性检查（Parser Equivalence）
+
+角色定位：parse_landing_page.py 的 extract_* 与 identify_template 可运行在不同的解析后端上
+（见 PARSER_BACKENDS）。本脚本用每个已安装的后端解析同一批页面，逐项对比模板识别结果和
+每个提取函数的输出，任何差异都会列出并以退出码 1 结束。修改提取逻辑或新增后端后应运行一次。
+
+用法：
+  python parser_equivalence.py [page.html ...] [--parsers=lxml,html.parser]
+
+不指定页面时检查 template/ 下全部 15 个参考模板。
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+
+import parse_landing_page as parser_module
+from parse_landing_page import DocumentIndex, available_parsers, make_soup, resolve_parser
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template")
+
+# 对比项：名称 → 以 (文档索引, html_text) 为参数的调用
+CHECKS = {
+    "identify_template": lambda doc, html: parser_module.identify_template(doc, html),
+    "extract_product": lambda doc, html: parser_module.extract_product(doc),
+    "extract_features": lambda doc, html: parser_module.extract_features(doc),
+    "extract_testimonials": lambda doc, html: parser_module.extract_testimonials(doc),
+    "extract_stats": lambda doc, html: parser_module.extract_stats(doc),
+    "extract_images": lambda doc, html: parser_module.extract_images(doc),
+    "extract_theme": lambda doc, html: parser_module.extract_theme(doc, html),
+    "extract_faq": lambda doc, html: parser_module.extract_faq(doc),
+    "extract_cta": lambda doc, html: parser_module.extract_cta(doc),
+}
+
+
+def run_checks(html_text: str, backend: str) -> tuple:
+    """返回 ({检查项: 结果}, 建树耗时 ms)"""
+    started = time.perf_counter()
+    soup, _ = make_soup(html_text, backend)
+    elapsed = (time.perf_counter() - started) * 1000
+    doc = DocumentIndex(soup)
+    return {name: check(doc, html_text) for name, check in CHECKS.items()}, elapsed
+
+
+def compare_page(path: str, backends: list) -> dict:
+    """
+    用各后端解析 path 并与第一个后端对比。返回
+    {"path", "times": {后端: ms}, "diffs": [{"check", "backend", "expected", "actual"}, ...]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        html_text = f.read()
+    reference = None
+    times = {}
+    diffs = []
+    for backend in backends:
+        results, times[backend] = run_checks(html_text, backend)
+        if reference is None:
+            reference = results
+            continue
+        for name, value in results.items():
+            if value != reference[name]:
+                diffs.append({"check": name, "backend": backend,
+                              "expected": reference[name], "actual": value})
+    return {"path": path, "times": times, "diffs": diffs}
+
+
+def _short(value) -> str:
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= 160 else text[:157] + "..."
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    try:
+        if flags.get("parsers"):
+            backends = [resolve_parser(name.strip()) for name in flags["parsers"].split(",") if name.strip()]
+        else:
+            # 以标准库 html.parser 为基准
+            backends = sorted(available_parsers(), key=lambda name: name != "html.parser")
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+    if len(backends) < 2:
+        print(f"⚠ 只有一个可用的解析后端（{', '.join(backends)}），无需对比；安装 lxml 后重试")
+        sys.exit(0)
+
+    paths = args or sorted(glob.glob(os.path.join(TEMPLATE_DIR, "landing-page-*.html")))
+    print("=" * 60)
+    print(f"  解析后端一致性检查: {' / '.join(backends)}")
+    print("=" * 60)
+    failed = 0
+    totals = dict.fromkeys(backends, 0.0)
+    for path in paths:
+        result = compare_page(path, backends)
+        for backend, ms in result["times"].items():
+            totals[backend] += ms
+        timing = ", ".join(f"{b} {ms:.1f} ms" for b, ms in result["times"].items())
+        if not result["diffs"]:
+            print(f"  ✓ {os.path.basename(path)}（{timing}）")
+            continue
+        failed += 1
+        print(f"  ✗ {os.path.basename(path)}（{timing}）")
+        for diff in result["diffs"]:
+            print(f"      {diff['check']} [{diff['backend']}]")
+            print(f"        期望: {_short(diff['expected'])}")
+            print(f"        实际: {_short(diff['actual'])}")
+
+    print(f"\n  建树总耗时: " + ", ".join(f"{b} {ms:.1f} ms" for b, ms in totals.items()))
+    if failed:
+        print(f"  ✗ {failed}/{len(paths)} 个页面结果不一致")
+    else:
+        print(f"  ✓ {len(paths)} 个页面在所有后端上结果一致")
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+运行时性能检查（Runtime Performance Lint）
+
+角色定位：模板普遍组合使用 backdrop-filter、多个 @keyframes 动画和 scroll 监听，
+在中端手机上容易掉帧。本模块静态检查最终 HTML 中的内联 CSS / JS：
+
+  1. 动画：@keyframes 中动画了合成层以外的属性（width / top / box-shadow / background-position 等，
+     每帧触发布局或重绘），无限循环时为 warning
+  2. backdrop-filter：同一页面使用过多，或带 backdrop-filter 的元素相互嵌套（逐层重新模糊）
+  3. 滚动监听：scroll / wheel / touch 监听未声明 { passive: true }；处理函数未用
+     requestAnimationFrame 节流；处理函数（及其直接调用的同脚本函数）中读取布局属性
+     （getBoundingClientRect / offsetHeight 等），与样式写入交错时会强制同步布局
+
+可安全自动修复的项（默认全部启用，--perf-lint-fix=none 只报告，或逗号分隔选择其中几项）：
+  passive         为 scroll 监听，以及内联处理函数中未调用 preventDefault 的 wheel / touch 监听加 { passive: true }
+  will-change     为无限循环、只动画 transform / opacity 的规则加 will-change 提示（最多 MAX_WILL_CHANGE 条）
+  reduced-motion  页面有动画 / 过渡且未处理 prefers-reduced-motion 时，追加减少动态效果的媒体查询
+
+用法：
+  python perf_lint.py <input.html> [<output.html>] [--fix=passive,will-change,reduced-motion]
+
+不指定 output 时只报告；也可作为 generate_landing_page.py 的可选阶段：--perf-lint
+"""
+
+import re
+import sys
+from html.parser import HTMLParser
+
+from css_optimizer import (
+    KEYFRAMES_AT_RULES, _STYLE_BLOCK_RE, _VOID_TAGS, _animation_names, _keyframes_name, _walk_rules,
+    parse_stylesheet, selector_requirements, split_selector_list,
+)
+from minify import _skip_js_string, _skip_template
+
+
+# 只在合成线程完成的动画属性
+COMPOSITED_PROPERTIES = {"transform", "opacity", "translate", "rotate", "scale"}
+# 动画时每帧触发布局的属性（其余非合成属性触发重绘）
+LAYOUT_PROPERTIES = {
+    "width", "height", "min-width", "min-height", "max-width", "max-height",
+    "top", "right", "bottom", "left", "inset", "margin", "margin-top", "margin-right",
+    "margin-bottom", "margin-left", "padding", "padding-top", "padding-right", "padding-bottom",
+    "padding-left", "border-width", "font-size", "line-height", "letter-spacing", "gap",
+    "flex-basis", "grid-template-columns", "grid-template-rows",
+}
+# 超过该数量的 backdrop-filter 规则视为过多
+MAX_BACKDROP_FILTERS = 4
+MAX_WILL_CHANGE = 6
+SCROLL_EVENTS = {"scroll", "wheel", "mousewheel", "touchstart", "touchmove"}
+FIXES = ("passive", "will-change", "reduced-motion")
+
+REDUCED_MOTION_CSS = (
+    "@media (prefers-reduced-motion: reduce){*,*::before,*::after{"
+    "animation-duration:.01ms!important;animation-iteration-count:1!important;"
+    "transition-duration:.01ms!important;scroll-behavior:auto!important}}"
+)
+
+_LISTENER_RE = re.compile(r"""\.addEventListener\s*\(\s*(["'])([\w-]+)\1\s*,""")
+_THROTTLE_RE = re.compile(r"\b(?:requestAnimationFrame|throttle|debounce)\b")
+_LAYOUT_READ_RE = re.compile(
+    r"\.(offset(?:Top|Left|Width|Height|Parent)|client(?:Top|Left|Width|Height)|"
+    r"scroll(?:Top|Left|Width|Height)|getBoundingClientRect|getClientRects|innerText)\b"
+    r"|\b(getComputedStyle)\s*\("
+)
+_STYLE_WRITE_RE = re.compile(r"\.style\.[\w-]+\s*=(?!=)|\.style\.setProperty\s*\(|\.classList\.\w+\s*\(")
+_CALL_RE = re.compile(r"\b([A-Za-z_$][\w$]*)\s*\(")
+_FUNCTION_DEF_RE = r"(?:function\s+%s\s*\([^)]*\)\s*\{|(?:const|let|var)\s+%s\s*=\s*(?:function\s*\([^)]*\)|\([^)]*\)\s*=>|[\w$]+\s*=>)\s*\{)"
+_SCRIPT_BLOCK_RE = re.compile(r"(<script\b[^>]*>)(.*?)(</script\s*>)", re.I | re.S)
+_TYPE_ATTR_RE = re.compile(r"""\stype\s*=\s*(["']?)([^"'\s>]*)\1""", re.I)
+_DECL_RE = re.compile(r"(?:^|;)\s*([-\w]+)\s*:\s*([^;]*)")
+_REDUCED_MOTION_RE = re.compile(r"prefers-reduced-motion", re.I)
+JS_TYPES = {"", "text/javascript", "application/javascript", "module"}
+
+
+def _line_of(html: str, pos: int) -> int:
+    return html.count("\n", 0, pos) + 1
+
+
+def _declarations(body: str) -> list:
+    """[(属性名小写, 值), ...]"""
+    body = re.sub(r"/\*.*?\*/", "", body, flags=re.S)
+    return [(name.lower(), value.strip()) for name, value in _DECL_RE.findall(body)]
+
+
+def _finding(check: str, level: str, line: int, message: str, fixed: bool = False) -> dict:
+    return {"check": check, "level": level, "line": line, "message": message, "fixed": fixed}
+
+
+# ============================================================
+# CSS：动画与 backdrop-filter
+# ============================================================
+
+def _keyframe_properties(css: str, node: dict) -> set:
+    props = set()
+    for frame in parse_stylesheet(css, *node["body"]):
+        if frame["body"]:
+            props.update(name for name, _ in _declarations(css[frame["body"][0]:frame["body"][1]]))
+    return props
+
+
+def _append_declaration(css: str, node: dict, declaration: str) -> str:
+    """在规则体末尾追加一条声明，沿用最后一条声明的缩进"""
+    body_start, body_end = node["body"]
+    body = css[body_start:body_end]
+    stripped = body.rstrip()
+    sep = "" if not stripped.strip() or stripped.endswith(";") else ";"
+    last_line = stripped[stripped.rfind("\n") + 1:] if "\n" in stripped else ""
+    indent = last_line[:len(last_line) - len(last_line.lstrip())]
+    if "\n" in stripped:
+        insert = f"{sep}\n{indent}{declaration};"
+    else:
+        insert = f"{sep}{' ' if stripped.strip() else ''}{declaration};"
+    pos = body_start + len(stripped)
+    return css[:pos] + insert + css[pos:]
+
+
+class _NestingScanner(HTMLParser):
+    """找出命中 backdrop-filter 选择器、且祖先也命中的元素"""
+
+    def __init__(self, matchers: list):
+        super().__init__(convert_charrefs=True)
+        self.matchers = matchers  # [(选择器, 标签集合, 类名集合, id 集合), ...]
+        self.stack = []           # [(标签, 命中的选择器或 None)]
+        self.pairs = []
+
+    def _match(self, tag, attrs):
+        classes = set((attrs.get("class") or "").split())
+        for selector, tags, required_classes, ids in self.matchers:
+            if tags and tag not in tags:
+                continue
+            if required_classes <= classes and (not ids or attrs.get("id") in ids):
+                return selector
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        matched = self._match(tag, dict(attrs))
+        if matched:
+            outer = next((sel for _, sel in reversed(self.stack) if sel), None)
+            if outer and (outer, matched) not in self.pairs:
+                self.pairs.append((outer, matched))
+        if tag not in _VOID_TAGS:
+            self.stack.append((tag, matched))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+
+
+def _lint_css(html: str, fixes: set, findings: list, stats: dict) -> str:
+    blocks = list(_STYLE_BLOCK_RE.finditer(html))
+    keyframes = {}   # 名称 → 动画属性集合
+    animated = []    # (块序号, 节点, 动画名集合, 是否无限循环)
+    backdrops = []   # (行号, 选择器)
+    for index, block in enumerate(blocks):
+        css = block.group(2)
+        nodes = parse_stylesheet(css)
+        for node in nodes:
+            if node["type"] == "at" and node["name"] in KEYFRAMES_AT_RULES and node["body"]:
+                keyframes[_keyframes_name(node["prelude"])] = (
+                    _keyframe_properties(css, node), _line_of(html, block.start(2) + node["start"]))
+        for node in _walk_rules(nodes):
+            if node["type"] != "rule" or not node["body"]:
+                continue
+            decls = _declarations(css[node["body"][0]:node["body"][1]])
+            for name, value in decls:
+                if name in ("animation", "animation-name"):
+                    animated.append((index, node, _animation_names(f"{name}:{value}"),
+                                     any(n == "animation-iteration-count" and "infinite" in v for n, v in decls)
+                                     or "infinite" in value))
+                elif name in ("backdrop-filter", "-webkit-backdrop-filter") and value.lower() != "none":
+                    if name == "backdrop-filter" or not any(n == "backdrop-filter" for n, _ in decls):
+                        backdrops.append((_line_of(html, block.start(2) + node["start"]), node["prelude"]))
+
+    # 1. 非合成属性动画
+    infinite_names = {name for _, _, names, infinite in animated if infinite for name in names}
+    for name, (props, line) in sorted(keyframes.items(), key=lambda item: item[1][1]):
+        slow = props - COMPOSITED_PROPERTIES
+        if not slow:
+            continue
+        cost = "布局" if slow & LAYOUT_PROPERTIES else "重绘"
+        infinite = name in infinite_names
+        findings.append(_finding(
+            "animation", "warning" if infinite else "info", line,
+            f"@keyframes {name} 动画了 {', '.join(sorted(slow))}，每帧触发{cost}"
+            + ("（无限循环）" if infinite else "") + "，建议改用 transform / opacity"))
+
+    # 2. backdrop-filter 数量与嵌套
+    if len(backdrops) > MAX_BACKDROP_FILTERS:
+        findings.append(_finding(
+            "backdrop-filter", "warning", backdrops[0][0],
+            f"{len(backdrops)} 条规则使用 backdrop-filter（建议不超过 {MAX_BACKDROP_FILTERS}），"
+            f"每个元素都要对其下方内容单独模糊"))
+    matchers = []
+    for _, prelude in backdrops:
+        for selector in split_selector_list(prelude):
+            tags, classes, ids, _ = selector_requirements(selector)
+            # 只处理单个复合选择器（.glass、nav.navbar）；带组合符的选择器无法静态定位到元素
+            if re.search(r"[\s>+~]", re.sub(r"\([^)]*\)|\[[^\]]*\]", "", selector.strip())):
+                continue
+            if classes or ids:
+                matchers.append((selector.strip(), tags, classes, ids))
+    if matchers:
+        scanner = _NestingScanner(matchers)
+        scanner.feed(html)
+        scanner.close()
+        for outer, inner in scanner.pairs:
+            line = next((l for l, p in backdrops if inner in split_selector_list(p) or inner == p), 0)
+            findings.append(_finding(
+                "backdrop-filter", "warning", line,
+                f"backdrop-filter 元素嵌套：{inner} 位于 {outer} 内部，逐层重复模糊"))
+
+    # 修复：will-change、prefers-reduced-motion
+    edits = {}  # 块序号 → [(节点, 声明)]
+    if "will-change" in fixes:
+        for index, node, names, infinite in animated:
+            if stats["will_change"] >= MAX_WILL_CHANGE:
+                break
+            props = set()
+            for name in names:
+                props |= keyframes.get(name, (set(), 0))[0]
+            css = blocks[index].group(2)
+            body = css[node["body"][0]:node["body"][1]]
+            if (not infinite or not props or not props <= COMPOSITED_PROPERTIES
+                    or any(n == "will-change" for n, _ in _declarations(body))):
+                continue
+            value = ", ".join(sorted({"opacity" if p == "opacity" else "transform" for p in props}))
+            edits.setdefault(index, []).append((node, f"will-change: {value}"))
+            stats["will_change"] += 1
+
+    has_motion = bool(keyframes) or any(
+        n in ("transition", "animation") for b in blocks for n, _ in _declarations(b.group(2)))
+    needs_guard = has_motion and not _REDUCED_MOTION_RE.search(html)
+    if needs_guard and "reduced-motion" not in fixes:
+        findings.append(_finding("reduced-motion", "info", 0, "页面有动画 / 过渡但未处理 prefers-reduced-motion"))
+        needs_guard = False
+    if not edits and not needs_guard:
+        return html
+
+    out = []
+    pos = 0
+    for index, block in enumerate(blocks):
+        css = block.group(2)
+        # 从后往前插入，前面节点的位置不受影响
+        for node, declaration in sorted(edits.get(index, []), key=lambda e: -e[0]["start"]):
+            css = _append_declaration(css, node, declaration)
+        if needs_guard and index == len(blocks) - 1:
+            # 追加到最后一个样式块末尾，沿用最后一行的缩进
+            stripped = css.rstrip()
+            last_line = stripped[stripped.rfind("\n") + 1:]
+            indent = last_line[:len(last_line) - len(last_line.lstrip())]
+            css = f"{stripped}\n{indent}{REDUCED_MOTION_CSS}{css[len(stripped):]}"
+            stats["reduced_motion"] = True
+        out.append(html[pos:block.start(2)])
+        out.append(css)
+        pos = block.end(2)
+    out.append(html[pos:])
+    return "".join(out)
+
+
+# ============================================================
+# JS：滚动监听
+# ============================================================
+
+def _call_arguments(js: str, i: int) -> tuple:
+    """i 指向 "(" 之后，返回 ([(参数起, 参数止), ...], 右括号位置)"""
+    args = []
+    depth = 0
+    start = i
+    n = len(js)
+    while i < n:
+        c = js[i]
+        if c in "\"'":
+            i = _skip_js_string(js, i)
+            continue
+        if c == "`":
+            i = _skip_template(js, i)
+            continue
+        if c == "/" and js.startswith("//", i):
+            end = js.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if c == "/" and js.startswith("/*", i):
+            end = js.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            if depth == 0:
+                args.append((start, i))
+                return args, i
+            depth -= 1
+        elif c == "," and depth == 0:
+            args.append((start, i))
+            start = i + 1
+        i += 1
+    return args, n
+
+
+def _function_body(js: str, name: str) -> str:
+    """同一脚本中命名函数的函数体（找不到时为空串）"""
+    m = re.search(_FUNCTION_DEF_RE % (re.escape(name), re.escape(name)), js)
+    if not m:
+        return ""
+    _, end = _call_arguments(js, m.end())
+    return js[m.end():end]
+
+
+def _lint_script(js: str, offset: int, html: str, fixes: set, findings: list, stats: dict) -> str:
+    edits = []  # (位置, 插入文本)
+    for m in _LISTENER_RE.finditer(js):
+        event = m.group(2)
+        if event not in SCROLL_EVENTS:
+            continue
+        args, close = _call_arguments(js, m.end())
+        if not args:
+            continue
+        line = _line_of(html, offset + m.start())
+        handler = js[args[0][0]:args[0][1]]
+        options = js[args[1][0]:args[1][1]] if len(args) > 1 else ""
+        # 处理函数为命名引用时查找其定义；再展开处理函数直接调用的同脚本函数（一层）
+        body = handler.strip()
+        if re.fullmatch(r"[A-Za-z_$][\w$]*", body):
+            body = _function_body(js, body) or body
+        expanded = body
+        for name in set(_CALL_RE.findall(body)):
+            expanded += "\n" + _function_body(js, name)
+
+        # 1. passive
+        if "passive" not in options:
+            inline = not re.fullmatch(r"[A-Za-z_$][\w$]*", handler.strip())
+            safe = not options.strip() and (event == "scroll" or (inline and "preventDefault" not in expanded))
+            fixed = safe and "passive" in fixes
+            if fixed:
+                edits.append((args[0][1], ", { passive: true }"))
+                stats["passive"] += 1
+            findings.append(_finding(
+                "passive", "info" if event == "scroll" else "warning", line,
+                f"{event} 监听未声明 {{ passive: true }}", fixed=fixed))
+
+        # 2. 节流与布局读取
+        reads = sorted({a or b for a, b in _LAYOUT_READ_RE.findall(expanded)})
+        writes = bool(_STYLE_WRITE_RE.search(expanded))
+        throttled = bool(_THROTTLE_RE.search(body))
+        if not throttled:
+            costly = reads or re.search(r"\.style\.", expanded)
+            findings.append(_finding(
+                "throttle", "warning" if costly else "info", line,
+                f"{event} 处理函数未用 requestAnimationFrame 节流，每个事件都会同步执行"))
+        if reads:
+            message = f"{event} 处理函数中读取布局属性 {', '.join(reads)}"
+            if writes:
+                message += "，且与样式写入交错，会强制同步布局；建议先统一读取、再统一写入"
+            findings.append(_finding("layout-read", "warning" if writes else "info", line, message))
+
+    for pos, text in sorted(edits, reverse=True):
+        js = js[:pos] + text + js[pos:]
+    return js
+
+
+def _lint_js(html: str, fixes: set, findings: list, stats: dict) -> str:
+    out = []
+    pos = 0
+    for block in _SCRIPT_BLOCK_RE.finditer(html):
+        type_match = _TYPE_ATTR_RE.search(block.group(1))
+        if type_match and type_match.group(2).lower() not in JS_TYPES:
+            continue
+        js = _lint_script(block.group(2), block.start(2), html, fixes, findings, stats)
+        out.append(html[pos:block.start(2)])
+        out.append(js)
+        pos = block.end(2)
+    out.append(html[pos:])
+    return "".join(out)
+
+
+# ============================================================
+# 入口
+# ============================================================
+
+def lint_page(html: str, fixes=FIXES) -> tuple:
+    """
+    检查并（按 fixes）修复页面。返回 (新 HTML, 统计)；
+    统计：{"findings": [{"check", "level", "line", "message", "fixed"}], "passive", "will_change", "reduced_motion"}
+    """
+    fixes = set(fixes)
+    stats = {"findings": [], "passive": 0, "will_change": 0, "reduced_motion": False}
+    findings = []
+    # 行号按原始文档计算：先检查 JS，再处理 CSS（CSS 改动只在 <style> 内部）
+    html = _lint_js(html, fixes, findings, stats)
+    html = _lint_css(html, fixes, findings, stats)
+    stats["findings"] = sorted(findings, key=lambda f: f["line"])
+    return html, stats
+
+
+def parse_fixes(value) -> tuple:
+    """解析 --perf-lint-fix：True / "all" 为全部，"none" 为不修复，否则为逗号分隔的修复项"""
+    if value in (None, True, "", "all"):
+        return FIXES
+    if value == "none":
+        return ()
+    fixes = tuple(v.strip() for v in str(value).split(",") if v.strip())
+    unknown = [f for f in fixes if f not in FIXES]
+    if unknown:
+        raise ValueError(f"未知的修复项: {', '.join(unknown)}（可选 {', '.join(FIXES)}）")
+    return fixes
+
+
+def fixes_summary(stats: dict) -> str:
+    parts = []
+    if stats["passive"]:
+        parts.append(f"{stats['passive']} 个 passive 监听")
+    if stats["will_change"]:
+        parts.append(f"{stats['will_change']} 条 will-change")
+    if stats["reduced_motion"]:
+        parts.append("prefers-reduced-motion 降级")
+    return "、".join(parts) if parts else "无"
+
+
+def perf_lint_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    report = ctx["report"]
+    try:
+        fixes = parse_fixes(ctx["options"].get("perf-lint-fix"))
+    except ValueError as e:
+        report["html_warnings"].append(str(e))
+        fixes = ()
+    html, stats = lint_page(html, fixes)
+    open_findings = [f for f in stats["findings"] if not f["fixed"]]
+    warnings = [f for f in open_findings if f["level"] == "warning"]
+    stats["summary"] = (
+        f"{len(warnings)} 个警告, {len(open_findings) - len(warnings)} 条提示；"
+        f"已修复: {fixes_summary(stats)}"
+    )
+    for f in warnings:
+        report["html_warnings"].append(f"[性能] 第 {f['line']} 行: {f['message']}")
+    report["stages"]["perf-lint"] = stats
+    return html
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    if not args:
+        print("运行时性能检查")
+        print()
+        print("用法:")
+        print("  python perf_lint.py <input.html> [<output.html>] [--fix=passive,will-change,reduced-motion]")
+        print()
+        print("不指定 output 时只报告，不修改文件。")
+        sys.exit(1)
+
+    try:
+        fixes = parse_fixes(flags.get("fix") or None) if len(args) > 1 else ()
+        with open(args[0], "r", encoding="utf-8") as f:
+            html = f.read()
+        html, stats = lint_page(html, fixes)
+        if len(args) > 1:
+            with open(args[1], "w", encoding="utf-8") as f:
+                f.write(html)
+    except Exception as e:
+        print(f"✗ 处理失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    marks = {"warning": "⚠", "info": "·"}
+    for f in stats["findings"]:
+        mark = "✓" if f["fixed"] else marks[f["level"]]
+        print(f"  {mark} {args[0]}:{f['line']} [{f['check']}] {f['message']}" + ("（已修复）" if f["fixed"] else ""))
+    warnings = sum(1 for f in stats["findings"] if f["level"] == "warning" and not f["fixed"])
+    print(f"\n  {warnings} 个警告；已修复: {fixes_summary(stats)}")
+
+
+if __name__ == "__main__":
+    main()
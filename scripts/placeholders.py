@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+低质量图片占位（LQIP Placeholders）
+
+角色定位：template-08 / 12 / 15 依赖大尺寸沉浸式、编辑风图片，图片解码完成前用户只能看到空白框。
+本模块为每个已注入的本地图片计算一个极小的模糊预览（或主色），以内联 CSS 背景写到槽位 <img> 上，
+图片加载完成后自然覆盖。
+
+作为 generate_landing_page.py 的可选阶段使用：--placeholders
+  --placeholder-mode=blur     blur：主色 + 8 格宽的缩略图（浏览器放大时平滑插值，呈模糊效果）
+                              color：仅主色
+
+实现要点：
+  1. Pillow 先以 draft / reduce 快速降采样到几十像素，再用 NumPy 向量化计算：
+     分块均值得到缩略网格，4-bit 量化直方图（bincount）取主色
+  2. 按图片内容哈希缓存到 output/assets/.placeholders.json，进程内另有一层内存缓存，
+     图片未变化时不再解码——批量模式下每页只增加几毫秒
+  3. 带透明通道的图片跳过（背景会透过透明区域露出）
+
+依赖：Pillow + NumPy（pip install Pillow numpy）。未安装时阶段跳过并给出提示。
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import time
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # Pillow / NumPy 为可选依赖
+    np = None
+    Image = None
+
+
+GRID = 8          # 缩略网格长边格数
+BLOCK = 4         # 每格参与均值的像素边长
+PLACEHOLDER_MODES = ("blur", "color")
+DEFAULT_MODE = "blur"
+PLACEHOLDER_CACHE = ".placeholders.json"
+CACHE_VERSION = 1
+
+_IMG_TAG_RE = re.compile(r"<img\b[^>]*>", re.I)
+_SLOT_ATTR_RE = re.compile(r"""\sdata-slot\s*=\s*(["'])([^"']*)\1""", re.I)
+_SRC_ATTR_RE = re.compile(r"""\ssrc\s*=\s*(["'])([^"']*)\1""", re.I)
+_STYLE_ATTR_RE = re.compile(r"""(\sstyle\s*=\s*)(["'])(.*?)\2""", re.I | re.S)
+
+# 进程内缓存：{内容哈希键: 占位数据}，批量模式下同一 worker 处理的页面共享
+_MEMORY_CACHE = {}
+
+
+# ============================================================
+# 占位计算
+# ============================================================
+
+def _grid_shape(width: int, height: int) -> tuple:
+    if width >= height:
+        return GRID, max(1, round(GRID * height / width))
+    return max(1, round(GRID * width / height)), GRID
+
+
+def compute_placeholder(path: str) -> dict:
+    """
+    计算单张图片的占位数据：{"color": "#rrggbb", "blur": "data:image/png;base64,..."}；
+    带透明像素的图片返回 {"transparent": True}。
+    """
+    with Image.open(path) as img:
+        gw, gh = _grid_shape(*img.size)
+        target = (gw * BLOCK, gh * BLOCK)
+        img.draft("RGB", (target[0] * 2, target[1] * 2))  # JPEG 解码时直接按 1/2~1/8 缩小
+        if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+            rgba = img.convert("RGBA")
+            if rgba.getextrema()[3][0] < 255:
+                return {"transparent": True}
+            img = rgba
+        small = img.convert("RGB").resize(target, Image.BOX)
+
+    pixels = np.asarray(small, dtype=np.float32)  # (gh*BLOCK, gw*BLOCK, 3)
+
+    # 分块均值 → (gh, gw, 3) 缩略网格
+    grid = pixels.reshape(gh, BLOCK, gw, BLOCK, 3).mean(axis=(1, 3))
+
+    # 主色：4-bit 量化后出现最多的颜色桶内像素的均值
+    quantized = pixels.astype(np.uint8) >> 4
+    keys = (quantized[..., 0].astype(np.int32) << 8) | (quantized[..., 1].astype(np.int32) << 4) | quantized[..., 2]
+    top = np.bincount(keys.ravel(), minlength=4096).argmax()
+    color = pixels[keys == top].mean(axis=0)
+
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(grid + 0.5, 0, 255).astype(np.uint8), "RGB").save(buf, "PNG", optimize=True)
+    return {
+        "color": "#%02x%02x%02x" % tuple(int(c + 0.5) for c in color),
+        "blur": "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii"),
+    }
+
+
+def _placeholder_css(data: dict, mode: str) -> str:
+    if mode == "color":
+        return f"background-color:{data['color']}"
+    return f"background:{data['color']} url({data['blur']}) 50% 50%/cover no-repeat"
+
+
+def _load_cache(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache.get("entries", {}) if cache.get("version") == CACHE_VERSION else {}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_cache(path: str, entries: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "entries": entries}, f)
+    os.replace(tmp_path, path)
+
+
+# ============================================================
+# 页面改写
+# ============================================================
+
+def add_placeholders(html: str, output_dir: str, mode: str = DEFAULT_MODE) -> tuple:
+    """为本地 data-slot 图片内联占位背景。返回 (新 HTML, 统计)。"""
+    started = time.perf_counter()
+    stats = {"mode": mode, "images": 0, "generated": 0, "cached": 0, "transparent": 0,
+             "bytes_added": 0, "elapsed_ms": 0.0}
+    cache_path = os.path.join(output_dir, "assets", PLACEHOLDER_CACHE)
+    disk_cache = None
+    dirty = False
+    placeholders = {}  # src → 占位数据
+
+    def lookup(src):
+        nonlocal disk_cache, dirty
+        path = os.path.join(output_dir, src)
+        with open(path, "rb") as f:
+            key = f"{hashlib.sha256(f.read()).hexdigest()[:20]}-{GRID}x{BLOCK}"
+        if key in _MEMORY_CACHE:
+            stats["cached"] += 1
+            return _MEMORY_CACHE[key]
+        if disk_cache is None:
+            disk_cache = _load_cache(cache_path)
+        data = disk_cache.get(key)
+        if data is None:
+            data = compute_placeholder(path)
+            disk_cache[key] = data
+            dirty = True
+            stats["generated"] += 1
+        else:
+            stats["cached"] += 1
+        _MEMORY_CACHE[key] = data
+        return data
+
+    out = []
+    pos = 0
+    for match in _IMG_TAG_RE.finditer(html):
+        tag = match.group(0)
+        src_match = _SRC_ATTR_RE.search(tag)
+        if not _SLOT_ATTR_RE.search(tag) or not src_match:
+            continue
+        src = src_match.group(2)
+        if not src.startswith("assets/") or not os.path.isfile(os.path.join(output_dir, src)):
+            continue
+        if src not in placeholders:
+            try:
+                placeholders[src] = lookup(src)
+            except (OSError, ValueError):
+                placeholders[src] = None  # 无法解码的文件不加占位
+        data = placeholders[src]
+        if not data or data.get("transparent"):
+            stats["transparent"] += bool(data)
+            continue
+
+        css = _placeholder_css(data, mode)
+        style = _STYLE_ATTR_RE.search(tag)
+        if style:
+            existing = style.group(3).strip().rstrip(";")
+            # 占位放在前面，草稿中已有的 background 声明照常覆盖
+            value = f"{css};{existing}" if existing else css
+            new_tag = tag[:style.start()] + f'{style.group(1)}{style.group(2)}{value}{style.group(2)}' + tag[style.end():]
+        else:
+            end = -2 if tag.endswith("/>") else -1
+            new_tag = tag[:end].rstrip() + f' style="{css}"' + (" />" if end == -2 else ">")
+        stats["images"] += 1
+        stats["bytes_added"] += len(new_tag) - len(tag)
+        out.append(html[pos:match.start()])
+        out.append(new_tag)
+        pos = match.end()
+    out.append(html[pos:])
+
+    if dirty:
+        _save_cache(cache_path, disk_cache)
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return "".join(out), stats
+
+
+def placeholders_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    report = ctx["report"]
+    if np is None:
+        report["stages"]["placeholders"] = {"summary": "未安装 Pillow / NumPy，已跳过"}
+        report["html_warnings"].append("图片占位阶段需要 Pillow 和 NumPy：pip install Pillow numpy")
+        return html
+
+    mode = str(ctx["options"].get("placeholder-mode") or DEFAULT_MODE)
+    if mode not in PLACEHOLDER_MODES:
+        report["html_warnings"].append(f"未知的占位模式 {mode}，已使用 {DEFAULT_MODE}")
+        mode = DEFAULT_MODE
+    html, stats = add_placeholders(html, ctx["output_dir"], mode)
+    stats["summary"] = (
+        f"{stats['images']} 张图片（新计算 {stats['generated']}, 缓存 {stats['cached']}）, "
+        f"+{stats['bytes_added'] / 1024:.1f} KB, {stats['elapsed_ms']:.1f} ms"
+    )
+    report["stages"]["placeholders"] = stats
+    return html
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+监听模式 + 实时预览服务器（Watch & Live Reload）
+
+角色定位：替代"改草稿 → 手动运行后处理 → 手动刷新 output/index.html"的循环。
+监听 config、草稿和 output/assets/，变化后去抖并重新后处理（增量缓存保证只重跑受影响的
+阶段），再通过本地预览服务器推送浏览器刷新，并显示从保存到页面刷新的耗时。
+
+用法（通过 generate_landing_page.py）：
+  python generate_landing_page.py config.json draft.html output/index.html --watch [--port=8000]
+
+实现要点：
+  1. Linux 下通过 ctypes 调用 inotify 监听所在目录（兼容编辑器"写临时文件再改名"的保存方式），
+     其他平台退化为 stat 轮询
+  2. 预览服务器只在响应中插入刷新脚本，不修改 output/index.html
+  3. 页面刷新后回报构建编号，据此统计"保存 → 页面刷新"的端到端延迟（目标 <100 ms）
+"""
+
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+DEFAULT_PORT = 8000
+DEBOUNCE_SECONDS = 0.03
+POLL_INTERVAL = 0.05
+LATENCY_TARGET_MS = 100
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SNIPPET = (
+    "<script>(function(){var b=%d;"
+    "var es=new EventSource('" + LIVERELOAD_PATH + "');"
+    "es.onmessage=function(e){if(+e.data>b){es.close();location.reload();}};"
+    "fetch('" + LIVERELOAD_PATH + "/ack?build='+b).catch(function(){});"
+    "})();</script>"
+)
+
+
+# ============================================================
+# 文件监听
+# ============================================================
+
+# inotify 事件掩码（<sys/inotify.h>）
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+                  | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """
+    监听一组文件和目录的变化。wait(timeout) 返回发生变化的路径集合（超时返回空集合）。
+    优先使用 inotify，不可用时退化为 stat 轮询。
+    """
+
+    def __init__(self, files, dirs):
+        self.files = {os.path.abspath(p) for p in files}
+        self.dirs = {os.path.abspath(d) for d in dirs}
+        self._fd = None
+        self._wds = {}
+        try:
+            self._init_inotify()
+            self.backend = "inotify"
+        except (OSError, AttributeError):
+            self._fd = None
+            self._snapshot = self._take_snapshot()
+            self.backend = "polling"
+
+    # --- inotify ---
+
+    def _init_inotify(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 仅支持 Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._fd = fd
+        # 监听文件所在目录而非文件本身：编辑器常以"写临时文件再改名"的方式保存
+        for path in {os.path.dirname(p) for p in self.files} | self.dirs:
+            if not os.path.isdir(path):
+                continue
+            wd = libc.inotify_add_watch(fd, os.fsencode(path), _IN_WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"无法监听目录: {path}")
+            self._wds[wd] = path
+
+    def _wait_inotify(self, timeout: float) -> set:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            wd, _, _, name_len = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            directory = self._wds.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if self._relevant(path):
+                changed.add(path)
+        return changed
+
+    # --- 轮询 ---
+
+    def _take_snapshot(self) -> dict:
+        snapshot = {}
+        paths = list(self.files)
+        for directory in self.dirs:
+            try:
+                with os.scandir(directory) as entries:
+                    paths.extend(entry.path for entry in entries)
+            except OSError:
+                continue
+        for path in paths:
+            try:
+                st = os.stat(path)
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return snapshot
+
+    def _wait_polling(self, timeout: float) -> set:
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self._take_snapshot()
+            changed = {
+                path for path in set(snapshot) | set(self._snapshot)
+                if snapshot.get(path) != self._snapshot.get(path) and self._relevant(path)
+            }
+            self._snapshot = snapshot
+            if changed or time.monotonic() >= deadline:
+                return changed
+            time.sleep(POLL_INTERVAL)
+
+    # --- 公共接口 ---
+
+    def _relevant(self, path: str) -> bool:
+        name = os.path.basename(path)
+        if name.startswith(".") or name.endswith((".tmp", "~", ".swp")):
+            return False
+        return path in self.files or os.path.dirname(path) in self.dirs
+
+    def wait(self, timeout: float) -> set:
+        if self._fd is not None:
+            return self._wait_inotify(timeout)
+        return self._wait_polling(timeout)
+
+    def drain(self) -> set:
+        """取出当前已积压的事件（不等待）"""
+        return self.wait(0)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# ============================================================
+# 预览服务器
+# ============================================================
+
+class LiveReloadState:
+    """构建编号与刷新通知；记录每次构建的触发时间以计算端到端延迟"""
+
+    def __init__(self):
+        self.build = 0
+        self.cond = threading.Condition()
+        self.triggered_at = {}
+        self.on_ack = None
+
+    def publish(self, triggered_at: float):
+        with self.cond:
+            self.build += 1
+            self.triggered_at[self.build] = triggered_at
+            self.cond.notify_all()
+
+    def wait_for_build(self, known: int, timeout: float) -> int:
+        with self.cond:
+            self.cond.wait_for(lambda: self.build > known, timeout)
+            return self.build
+
+    def ack(self, build: int):
+        triggered_at = self.triggered_at.pop(build, None)
+        if triggered_at is not None and self.on_ack:
+            self.on_ack(build, (time.perf_counter() - triggered_at) * 1000)
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """静态文件服务 + HTML 响应中插入刷新脚本 + SSE 刷新通道"""
+
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == LIVERELOAD_PATH:
+            return self._serve_events()
+        if url.path == LIVERELOAD_PATH + "/ack":
+            build = parse_qs(url.query).get("build", ["0"])[0]
+            self.send_response(204)
+            self.end_headers()
+            if build.isdigit():
+                self.state.ack(int(build))
+            return None
+        path = self.translate_path(url.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            return self._serve_html(path)
+        return super().do_GET()
+
+    def _serve_html(self, path: str):
+        with open(path, "rb") as f:
+            body = f.read()
+        snippet = (LIVERELOAD_SNIPPET % self.state.build).encode()
+        idx = body.lower().rfind(b"</body>")
+        body = body[:idx] + snippet + body[idx:] if idx != -1 else body + snippet
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        known = self.state.build
+        try:
+            while True:
+                build = self.state.wait_for_build(known, 15)
+                if build > known:
+                    self.wfile.write(f"data: {build}\n\n".encode())
+                    known = build
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_preview_server(output_dir: str, port: int, state: LiveReloadState):
+    handler = functools.partial(PreviewHandler, directory=output_dir)
+    PreviewHandler.state = state
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# ============================================================
+# 监听主循环
+# ============================================================
+
+def watch(config_path: str, html_input: str, html_output: str, runner, printer,
+          stages=None, options: dict = None, port: int = DEFAULT_PORT):
+    """
+    监听输入变化并重新后处理，直到 Ctrl+C。
+    runner / printer 为 generate_landing_page.post_process / print_report。
+    """
+    options = dict(options or {})
+    options.pop("force", None)  # 依赖增量缓存只重跑受影响的阶段
+    output_dir = os.path.dirname(os.path.abspath(html_output))
+    assets_dir = os.path.join(output_dir, "assets")
+    os.makedirs(assets_dir, exist_ok=True)
+
+    def build():
+        started = time.perf_counter()
+        report = runner(config_path, html_input, html_output, stages, options)
+        return report, (time.perf_counter() - started) * 1000
+
+    report, _ = build()
+    printer(report)
+
+    state = LiveReloadState()
+
+    def on_ack(build_id, latency_ms):
+        mark = "✓" if latency_ms < LATENCY_TARGET_MS else "⚠"
+        print(f"    {mark} 浏览器已刷新：保存 → 页面刷新 {latency_ms:.1f} ms（目标 <{LATENCY_TARGET_MS} ms）")
+
+    state.on_ack = on_ack
+    server = start_preview_server(output_dir, port, state)
+    watcher = FileWatcher([config_path, html_input], [assets_dir])
+    own_writes = {os.path.abspath(html_output)}
+
+    print(f"\n  预览地址: http://127.0.0.1:{server.server_address[1]}/{os.path.basename(html_output)}")
+    print(f"  监听中（{watcher.backend}）: {config_path}, {html_input}, {assets_dir}/")
+    print("  按 Ctrl+C 退出")
+
+    changed = set()
+    try:
+        while True:
+            if not changed:
+                changed = watcher.wait(1.0) - own_writes
+                if not changed:
+                    continue
+            triggered_at = time.perf_counter()
+            # 去抖：等到一段静默期内不再有新事件
+            while True:
+                more = watcher.wait(DEBOUNCE_SECONDS) - own_writes
+                if not more:
+                    break
+                changed |= more
+
+            try:
+                report, build_ms = build()
+            except Exception as e:
+                print(f"\n  ✗ 重建失败: {e}")
+                changed = set()
+                continue
+
+            names = ", ".join(sorted(os.path.basename(p) for p in changed))
+            status = "复用缓存" if report.get("cached") else ("✓" if report["success"] else "✗")
+            print(f"\n  ↻ {time.strftime('%H:%M:%S')} {names} → 重建 {build_ms:.1f} ms（{status}）")
+            for e in report.get("config_errors", []):
+                print(f"    ✗ {e}")
+            if report.get("size_error"):
+                print(f"    ✗ {report['size_error']}")
+            for v in report.get("analysis", {}).get("violations", []):
+                print(f"    ✗ {v['message']}")
+            if report["success"]:
+                state.publish(triggered_at)
+
+            # 构建阶段自身写入 assets/ 的事件不再触发重建；构建期间 config/草稿的修改留到下一轮
+            changed = watcher.drain() & watcher.files
+    except KeyboardInterrupt:
+        print("\n  已退出监听模式")
+    finally:
+        watcher.close()
+        server.shutdown()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+响应式图片变体（Responsive Images）
+
+角色定位：模板中的 data-slot <img> 只有一个全尺寸 src，移动端也会下载桌面尺寸的大图。
+本模块为每个已注入的本地图片生成多宽度、AVIF/WebP 重新压缩的变体，并把标签改写为
+<picture> + srcset/sizes。
+
+作为 generate_landing_page.py 的可选阶段使用：--responsive-images
+  --responsive-widths=480,768,1200,1600   变体宽度（不超过原图宽度）
+  --responsive-formats=avif,webp          现代格式（按顺序作为 <source>，不支持的格式自动跳过）
+
+依赖：Pillow（pip install Pillow）。未安装时阶段跳过并给出提示。
+
+变体写入 output/assets/responsive/，文件名带源图内容哈希；源图未变化时直接复用已有变体，
+不会重复编码。编码在进程池中并行执行。
+"""
+
+import hashlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow 为可选依赖
+    Image = None
+    features = None
+
+
+DEFAULT_WIDTHS = (480, 768, 1200, 1600)
+DEFAULT_FORMATS = ("avif", "webp")
+
+# 编码参数；修改后哈希随之变化，旧变体自动失效
+ENCODE_OPTIONS = {
+    "avif": {"quality": 55},
+    "webp": {"quality": 75, "method": 6},
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+    "png": {"optimize": True},
+}
+FORMAT_EXTENSIONS = {"avif": ".avif", "webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+SOURCE_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
+
+# 各槽位的 sizes 属性（与模板中的版式对应）
+SLOT_SIZES = {
+    "hero": "(max-width: 768px) 100vw, 60vw",
+    "immersive": "100vw",
+    "editorial": "(max-width: 768px) 100vw, 80vw",
+    "gallery": "(max-width: 768px) 80vw, 30vw",
+    "section": "(max-width: 768px) 100vw, 45vw",
+    "content": "(max-width: 768px) 100vw, 50vw",
+    "step": "(max-width: 768px) 100vw, 33vw",
+    "story": "(max-width: 768px) 100vw, 50vw",
+    "video-thumbnail": "(max-width: 768px) 100vw, 50vw",
+}
+DEFAULT_SIZES = "100vw"
+
+RESPONSIVE_DIR = "responsive"
+
+_IMG_TAG_RE = re.compile(r"<img\b[^>]*>", re.I)
+_PICTURE_RE = re.compile(r"<picture\b.*?</picture>", re.I | re.S)
+_SLOT_ATTR_RE = re.compile(r"""data-slot\s*=\s*(["'])([^"']*)\1""", re.I)
+_SRC_ATTR_RE = re.compile(r"""\ssrc\s*=\s*(["'])([^"']*)\1""", re.I)
+
+
+def available_formats(requested) -> list:
+    """过滤出当前 Pillow 可编码的格式"""
+    if Image is None:
+        return []
+    return [fmt for fmt in requested if fmt in ("avif", "webp") and features.check(fmt)]
+
+
+def _variant_digest(data: bytes, widths, formats) -> str:
+    h = hashlib.sha256(data)
+    h.update(repr((sorted(widths), list(formats), ENCODE_OPTIONS)).encode())
+    return h.hexdigest()[:10]
+
+
+def _variant_path(out_dir: str, stem: str, width: int, digest: str, fmt: str) -> str:
+    return os.path.join(out_dir, f"{stem}-{width}w-{digest}{FORMAT_EXTENSIONS[fmt]}")
+
+
+def _cached_variants(task: tuple) -> list:
+    """全部变体都已存在时返回与 _encode_variants 相同格式的结果（均为复用），否则返回 None"""
+    _, out_dir, stem, digest, widths, formats = task
+    results = []
+    for width in widths:
+        for fmt in formats:
+            path = _variant_path(out_dir, stem, width, digest, fmt)
+            if not os.path.exists(path):
+                return None
+            results.append((fmt, width, path, os.path.getsize(path), False))
+    return results
+
+
+def _encode_variants(task: tuple) -> list:
+    """
+    进程池 worker：对一张源图编码所有宽度 × 格式的变体。
+    返回 [(格式, 宽度, 输出路径, 字节数, 是否新编码), ...]。
+    已存在的变体直接复用；只有缺失变体的宽度才解码并缩放源图。
+    """
+    src_path, out_dir, stem, digest, widths, formats = task
+    missing = {(width, fmt) for width in widths for fmt in formats
+               if not os.path.exists(_variant_path(out_dir, stem, width, digest, fmt))}
+    results = []
+    img = Image.open(src_path) if missing else None
+    try:
+        if img is not None:
+            img.load()
+        for width in widths:
+            resized = None
+            for fmt in formats:
+                path = _variant_path(out_dir, stem, width, digest, fmt)
+                if (width, fmt) not in missing:
+                    results.append((fmt, width, path, os.path.getsize(path), False))
+                    continue
+                if resized is None:
+                    if width < img.width:
+                        height = max(1, round(img.height * width / img.width))
+                        resized = img.resize((width, height), Image.LANCZOS)
+                    else:
+                        resized = img
+                frame = resized
+                if fmt == "jpeg" and frame.mode not in ("RGB", "L"):
+                    frame = frame.convert("RGB")
+                elif frame.mode == "P":
+                    frame = frame.convert("RGBA")
+                tmp_path = path + ".tmp"
+                frame.save(tmp_path, format=fmt.upper(), **ENCODE_OPTIONS[fmt])
+                os.replace(tmp_path, path)
+                results.append((fmt, width, path, os.path.getsize(path), True))
+    finally:
+        if img is not None:
+            img.close()
+    return results
+
+
+def _encode_or_skip(task: tuple):
+    """进程池 worker：源图损坏 / 无法解码时返回 None，不中断整批编码"""
+    try:
+        return _encode_variants(task)
+    except OSError:  # 含 PIL.UnidentifiedImageError
+        return None
+
+
+def _run_tasks(tasks: list, workers: int = None) -> list:
+    # 批量模式下已处于守护进程中，不能再创建子进程，改为串行
+    if len(tasks) <= 1 or multiprocessing.current_process().daemon:
+        return [_encode_or_skip(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers or min(len(tasks), os.cpu_count() or 1)) as pool:
+        return list(pool.map(_encode_or_skip, tasks))
+
+
+def _add_attrs(tag: str, attrs: str) -> str:
+    end = -2 if tag.endswith("/>") else -1
+    return tag[:end].rstrip() + attrs + (" />" if end == -2 else ">")
+
+
+def build_responsive_images(html: str, output_dir: str, widths=DEFAULT_WIDTHS,
+                            formats=DEFAULT_FORMATS, workers: int = None) -> tuple:
+    """
+    为 data-slot 本地图片生成变体并改写为 <picture>。返回 (改写后的 HTML, 统计)。
+    """
+    stats = {"images": 0, "variants": 0, "encoded": 0, "reused": 0,
+             "original_bytes": 0, "smallest_bytes": 0, "formats": [], "skipped": []}
+    formats = available_formats(formats)
+    stats["formats"] = formats
+    out_dir = os.path.join(output_dir, "assets", RESPONSIVE_DIR)
+
+    # 已在 <picture> 内的图片不再处理
+    protected = [(m.start(), m.end()) for m in _PICTURE_RE.finditer(html)]
+
+    # 1. 收集待处理的 <img>：{src: task}
+    targets = []
+    tasks = {}
+    for match in _IMG_TAG_RE.finditer(html):
+        tag = match.group(0)
+        slot_match = _SLOT_ATTR_RE.search(tag)
+        src_match = _SRC_ATTR_RE.search(tag)
+        if not slot_match or not src_match or "srcset" in tag.lower():
+            continue
+        if any(start <= match.start() < end for start, end in protected):
+            continue
+        src = src_match.group(2)
+        ext = os.path.splitext(src)[1].lower()
+        src_path = os.path.join(output_dir, src)
+        if not src.startswith("assets/") or ext not in SOURCE_FORMATS or not os.path.isfile(src_path):
+            if src:
+                stats["skipped"].append(src)
+            continue
+        if src in tasks:
+            targets.append((match, slot_match.group(2), src))
+            continue
+        if src in stats["skipped"]:
+            continue
+        with open(src_path, "rb") as f:
+            data = f.read()
+        try:
+            with Image.open(src_path) as img:
+                width = img.width
+        except OSError:  # 含 PIL.UnidentifiedImageError：损坏的图片保持原标签
+            stats["skipped"].append(src)
+            continue
+        targets.append((match, slot_match.group(2), src))
+        sizes = sorted({w for w in widths if w < width} | {width})
+        source_format = SOURCE_FORMATS[ext]
+        variant_formats = [fmt for fmt in formats if fmt != source_format] + [source_format]
+        stem = os.path.splitext(os.path.basename(src))[0]
+        digest = _variant_digest(data, sizes, variant_formats)
+        tasks[src] = (src_path, out_dir, stem, digest, sizes, variant_formats)
+
+    if not tasks:
+        return html, stats
+
+    os.makedirs(out_dir, exist_ok=True)
+    # 变体已全部存在的图片不进入进程池；都已缓存时不创建进程池
+    encoded = {}
+    for src, task in tasks.items():
+        cached = _cached_variants(task)
+        if cached is not None:
+            encoded[src] = cached
+    pending = [src for src in tasks if src not in encoded]
+    if pending:
+        encoded.update(zip(pending, _run_tasks([tasks[src] for src in pending], workers)))
+    encoded = {src: encoded[src] for src in tasks}
+    for src, results in encoded.items():
+        if results is None:
+            stats["skipped"].append(src)
+    encoded = {src: results for src, results in encoded.items() if results is not None}
+    targets = [target for target in targets if target[2] in encoded]
+
+    # 2. 汇总变体：{src: {fmt: [(width, 相对路径)]}}
+    variants = {}
+    for src, results in encoded.items():
+        stats["original_bytes"] += os.path.getsize(tasks[src][0])
+        by_format = variants.setdefault(src, {})
+        full_width = max(width for _, width, _, _, _ in results)
+        best = None
+        for fmt, width, path, size, fresh in results:
+            rel = os.path.relpath(path, output_dir).replace(os.sep, "/")
+            by_format.setdefault(fmt, []).append((width, rel))
+            stats["variants"] += 1
+            stats["encoded" if fresh else "reused"] += 1
+            if width == full_width:
+                best = size if best is None else min(best, size)
+        stats["smallest_bytes"] += best or 0
+    stats["images"] = len(variants)
+
+    # 3. 改写标签
+    out = []
+    pos = 0
+    for match, slot, src in targets:
+        tag = match.group(0)
+        by_format = variants[src]
+        sizes = SLOT_SIZES.get(slot, DEFAULT_SIZES)
+        source_format = tasks[src][5][-1]
+
+        def srcset(fmt):
+            return ", ".join(f"{rel} {width}w" for width, rel in by_format[fmt])
+
+        sources = "".join(
+            f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset(fmt)}" sizes="{sizes}">'
+            for fmt in tasks[src][5][:-1]
+        )
+        img = _add_attrs(tag, f' srcset="{srcset(source_format)}" sizes="{sizes}"')
+        out.append(html[pos:match.start()])
+        # display: contents 让 <picture> 不参与布局，模板中针对 img 的样式保持原效果
+        out.append(f'<picture style="display: contents">{sources}{img}</picture>')
+        pos = match.end()
+    out.append(html[pos:])
+
+    return "".join(out), stats
+
+
+def responsive_images_stage(html: str, ctx: dict) -> str:
+    """generate_landing_page.py 可选阶段入口"""
+    report = ctx["report"]
+    if Image is None:
+        report["stages"]["responsive-images"] = {"summary": "未安装 Pillow，已跳过"}
+        report["html_warnings"].append("响应式图片阶段需要 Pillow：pip install Pillow")
+        return html
+
+    options = ctx["options"]
+    widths = DEFAULT_WIDTHS
+    if options.get("responsive-widths"):
+        widths = tuple(int(w) for w in str(options["responsive-widths"]).split(",") if w.strip())
+    formats = DEFAULT_FORMATS
+    if options.get("responsive-formats"):
+        formats = tuple(f.strip().lower() for f in str(options["responsive-formats"]).split(",") if f.strip())
+
+    html, stats = build_responsive_images(html, ctx["output_dir"], widths, formats)
+    saved = stats["original_bytes"] - stats["smallest_bytes"]
+    stats["summary"] = (
+        f"{stats['images']} 张图片, {stats['variants']} 个变体"
+        f"（新编码 {stats['encoded']}, 复用 {stats['reused']}）, "
+        f"全宽最小变体节省 {saved / 1024:.1f} KB"
+    )
+    report["stages"]["responsive-images"] = stats
+    return html
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+模板指纹索引（Template Fingerprint Index）
+
+角色定位：TEMPLATE_SIGNATURES 的手写权重在真实页面上区分度不足，最高分与次高分经常只差零点几。
+本模块从 template/landing-page-NN.html 提取特征向量建立索引，识别时用余弦相似度
+（索引矩阵 × 页面向量）对全部模板排序，并给出校准后的置信度。
+parse_landing_page.identify_template 在 NumPy 可用时使用本索引。
+
+特征（直接用正则从 HTML 文本提取，不依赖 DOM 树；单进程每页约 1 ms）：
+  c:<class>      class 名              p:<片段>   class 名按 -/_ 拆出的片段（bento-cell → bento, cell）
+  i:<id>         元素 id               t:<标签>   标签名
+  v:<--变量>     CSS 自定义属性         k:<名称>   @keyframes 名
+权重为 (1 + log tf) × idf，逐行 L2 归一化，余弦相似度即矩阵乘法。
+
+置信度 = softmax(相似度 / T)。温度 T 在建索引时校准：用"保留模板 A 一半特征 + 混入模板 B 部分特征"
+合成的改造页作为样本，选使真实模板负对数似然最小的 T（温度缩放）。
+
+索引保存为 assets/template_index.npz（float32 矩阵 + 词表 + idf + T + 模板文件摘要），
+模板文件变化后自动重建；也可手动运行 build。
+
+用法：
+  python template_index.py build [--output=PATH]
+  python template_index.py classify <page.html | 目录> ... [--top=3] [--jobs=N] [--json]
+
+依赖：NumPy（pip install numpy）。未安装时 identify_template 退回关键词打分。
+"""
+
+import glob
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from functools import lru_cache
+from multiprocessing import Pool
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+
+SKILL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(SKILL_DIR, "template")
+DEFAULT_INDEX_PATH = os.path.join(SKILL_DIR, "assets", "template_index.npz")
+INDEX_VERSION = 1
+BATCH_SIZE = 512                                # 批量分类时每批页面数（限制稠密矩阵内存）
+TEMPERATURE_RANGE = (0.005, 1.0)                # 温度校准的搜索范围（对数均匀取 48 个点）
+CALIBRATION_KEEP = 0.5                          # 校准样本保留本模板特征的比例
+CALIBRATION_MIX = (0.1, 0.25, 0.4)              # 校准样本混入其他模板特征的比例
+
+_TAG_RE = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)([^>]*)")
+# 在拼接后的属性串上一次匹配全部 class / id，比在整页上逐处匹配快得多
+_ATTR_RE = re.compile(r"""\s(class|id)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""", re.I)
+_CSS_VAR_RE = re.compile(r"(--[a-zA-Z0-9_-]+)\s*:")
+_KEYFRAMES_RE = re.compile(r"@(?:-webkit-)?keyframes\s+([\w-]+)", re.I)
+_CLASS_PART_RE = re.compile(r"[a-z][a-z0-9]*")
+
+
+# ============================================================
+# 特征提取
+# ============================================================
+
+@lru_cache(maxsize=1 << 16)
+def _class_parts(cls: str) -> tuple:
+    """class 名按 -/_ 拆出的片段（与自身相同时为空）"""
+    parts = _CLASS_PART_RE.findall(cls)
+    return () if parts == [cls] else tuple(parts)
+
+
+def page_features(html_text: str) -> Counter:
+    """页面 → {特征名: 出现次数}"""
+    tags = _TAG_RE.findall(html_text)
+    features = Counter()
+    for tag, count in Counter(tag for tag, _ in tags).items():
+        features["t:" + tag.lower()] += count
+    ids, class_values = [], []
+    for attr, *values in _ATTR_RE.findall(" ".join(attrs for _, attrs in tags)):
+        (ids if attr.lower() == "id" else class_values).append("".join(values))
+    features.update("i:" + value.strip().lower() for value in ids)
+    for cls, count in Counter(" ".join(class_values).lower().split()).items():
+        features["c:" + cls] += count
+        for part in _class_parts(cls):
+            features["p:" + part] += count
+    features.update("v:" + name.lower() for name in _CSS_VAR_RE.findall(html_text))
+    features.update("k:" + name.lower() for name in _KEYFRAMES_RE.findall(html_text))
+    return features
+
+
+def _template_pages(template_dir: str) -> list:
+    """[(template_id, 路径), ...]，按编号排序"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(template_dir, "landing-page-*.html"))):
+        number = re.search(r"landing-page-(\d+)\.html$", path).group(1)
+        pages.append((f"template-{number}", path))
+    return pages
+
+
+def templates_digest(template_dir: str = TEMPLATE_DIR) -> str:
+    """模板文件内容摘要（含索引版本），用于判断索引是否过期"""
+    h = hashlib.sha1(f"v{INDEX_VERSION}".encode())
+    for tid, path in _template_pages(template_dir):
+        h.update(tid.encode())
+        with open(path, "rb") as f:
+            h.update(hashlib.sha1(f.read()).digest())
+    return h.hexdigest()
+
+
+# ============================================================
+# 索引
+# ============================================================
+
+def _weight_rows(counters: list, vocab: dict, idf) -> "np.ndarray":
+    """特征计数列表 → (N, V) 的 L2 归一化 tf-idf 矩阵；词表外的特征忽略"""
+    rows, cols, values = [], [], []
+    for row, features in enumerate(counters):
+        for name, count in features.items():
+            col = vocab.get(name)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+                values.append(1.0 + math.log(count))
+    matrix = np.zeros((len(counters), len(vocab)), dtype=np.float32)
+    matrix[rows, cols] = values
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _fit(counters: list) -> tuple:
+    """由模板特征建立 (词表, idf, 模板矩阵)；idf 采用平滑形式 log((1+n)/(1+df)) + 1"""
+    df = Counter()
+    for features in counters:
+        df.update(features.keys())
+    vocab = {name: col for col, name in enumerate(sorted(df))}
+    n = len(counters)
+    idf = np.array([math.log((1 + n) / (1 + df[name])) + 1 for name in sorted(df)], dtype=np.float32)
+    return vocab, idf, _weight_rows(counters, vocab, idf)
+
+
+def _softmax(similarities, temperature: float):
+    z = similarities / temperature
+    z = z - z.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _calibrate(counters: list, vocab: dict, idf, matrix) -> dict:
+    """
+    用合成的"改造页"校准温度：保留模板 A 一半的特征，再混入模板 B 的一部分特征
+    （比例见 CALIBRATION_MIX），标签为 A。返回 {"temperature", "heldout_accuracy",
+    "mean_confidence", "nll"}——准确率与平均置信度接近即说明校准有效。
+    """
+    rng = np.random.default_rng(0)
+    views, truth = [], []
+    for mix in CALIBRATION_MIX:
+        for i, own in enumerate(counters):
+            for j, other in enumerate(counters):
+                if i == j:
+                    continue
+                view = Counter({name: count for name, count in own.items() if rng.random() < CALIBRATION_KEEP})
+                for name, count in other.items():
+                    if rng.random() < mix:
+                        view[name] += count
+                views.append(view)
+                truth.append(i)
+    similarities = _weight_rows(views, vocab, idf) @ matrix.T
+    truth = np.array(truth)
+    best = None
+    for temperature in np.geomspace(*TEMPERATURE_RANGE, 48):
+        probs = _softmax(similarities, temperature)[np.arange(len(truth)), truth]
+        nll = float(-np.log(np.maximum(probs, 1e-12)).mean())
+        if best is None or nll < best[1]:
+            best = (float(temperature), nll)
+    confidence = _softmax(similarities, best[0]).max(axis=1)
+    return {
+        "temperature": round(best[0], 5),
+        "heldout_accuracy": round(float((similarities.argmax(axis=1) == truth).mean()), 4),
+        "mean_confidence": round(float(confidence.mean()), 4),
+        "nll": round(best[1], 4),
+    }
+
+
+class TemplateIndex:
+    """模板指纹索引：template_ids、vocab {特征名: 列}、idf、matrix (模板数 × V)、temperature"""
+
+    def __init__(self, template_ids: list, vocab: dict, idf, matrix, temperature: float,
+                 digest: str = "", calibration: dict = None):
+        self.template_ids = list(template_ids)
+        self.vocab = vocab
+        self.idf = idf
+        self.matrix = matrix
+        self.temperature = temperature
+        self.digest = digest
+        self.calibration = calibration or {}
+
+    @classmethod
+    def build(cls, template_dir: str = TEMPLATE_DIR) -> "TemplateIndex":
+        pages = _template_pages(template_dir)
+        if not pages:
+            raise ValueError(f"未找到模板文件: {template_dir}/landing-page-*.html")
+        counters = []
+        for _, path in pages:
+            with open(path, "r", encoding="utf-8") as f:
+                counters.append(page_features(f.read()))
+        vocab, idf, matrix = _fit(counters)
+        calibration = _calibrate(counters, vocab, idf, matrix)
+        return cls([tid for tid, _ in pages], vocab, idf, matrix, calibration["temperature"],
+                   templates_digest(template_dir), calibration)
+
+    def save(self, path: str = DEFAULT_INDEX_PATH):
+        """
+        先写入同目录的临时文件再 os.replace 原子替换：并行 worker 同时重建或中途中断时，
+        读取方只会看到旧文件或完整的新文件
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        names = sorted(self.vocab, key=self.vocab.get)
+        fd, tmp_path = tempfile.mkstemp(prefix=".template_index.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    version=np.array(INDEX_VERSION),
+                    template_ids=np.array(self.template_ids),
+                    vocab=np.array(names),
+                    idf=self.idf,
+                    matrix=self.matrix.astype(np.float32),
+                    temperature=np.array(self.temperature),
+                    digest=np.array(self.digest),
+                    calibration=np.array(json.dumps(self.calibration)),
+                )
+            # mkstemp 创建的文件权限为 0600，改回按 umask 计算的常规权限，共享目录中其他用户才能读取
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> "TemplateIndex":
+        """读取索引；文件不存在、已损坏或版本不符时返回 None"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != INDEX_VERSION:
+                    return None
+                vocab = {str(name): col for col, name in enumerate(data["vocab"])}
+                return cls([str(t) for t in data["template_ids"]], vocab, data["idf"], data["matrix"],
+                           float(data["temperature"]), str(data["digest"]),
+                           json.loads(str(data["calibration"])))
+        except Exception:  # 截断的 zip（BadZipFile）、缺字段等一律视为无索引，由调用方重建
+            return None
+
+    def rank_features(self, counters: list, top: int = None) -> list:
+        """
+        特征计数列表 → 每页的排序结果 [{"template_id", "similarity", "confidence"}, ...]。
+        按 BATCH_SIZE 分批做一次矩阵乘法，内存不随页面数增长。
+        """
+        results = []
+        limit = len(self.template_ids) if top is None else top
+        for start in range(0, len(counters), BATCH_SIZE):
+            similarities = _weight_rows(counters[start:start + BATCH_SIZE], self.vocab, self.idf) @ self.matrix.T
+            probs = _softmax(similarities, self.temperature)
+            order = np.argsort(-similarities, axis=1, kind="stable")[:, :limit]
+            for sims, conf, ranked in zip(similarities.tolist(), probs.tolist(), order.tolist()):
+                results.append([{"template_id": self.template_ids[i],
+                                 "similarity": round(sims[i], 4),
+                                 "confidence": round(conf[i], 4)} for i in ranked])
+        return results
+
+    def rank(self, html_text: str, top: int = None) -> list:
+        """单页排序结果"""
+        return self.rank_features([page_features(html_text)], top)[0]
+
+    def rank_many(self, html_texts, top: int = None) -> list:
+        """批量排序（批量模式）"""
+        return self.rank_features([page_features(text) for text in html_texts], top)
+
+
+# 进程内缓存：{(索引路径, 模板目录): TemplateIndex}
+_LOADED = {}
+
+
+def load_index(path: str = DEFAULT_INDEX_PATH, template_dir: str = TEMPLATE_DIR):
+    """
+    读取索引；不存在或模板文件已变化时重新构建并尽量写回磁盘。
+    NumPy 未安装或没有模板文件时返回 None。
+    """
+    if np is None:
+        return None
+    key = (path, template_dir)
+    if key in _LOADED:
+        return _LOADED[key]
+    try:
+        digest = templates_digest(template_dir)
+        index = TemplateIndex.load(path)
+        if index is None or index.digest != digest:
+            index = TemplateIndex.build(template_dir)
+            try:
+                index.save(path)
+            except OSError:
+                pass  # 只读目录：仅在内存中使用
+    except (OSError, ValueError):
+        index = None
+    _LOADED[key] = index
+    return index
+
+
+# ============================================================
+# 批量分类
+# ============================================================
+
+def _path_features(path: str) -> Counter:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return page_features(f.read())
+
+
+def classify_paths(paths: list, index: TemplateIndex, top: int = 3, jobs: int = 1):
+    """
+    逐个产出 (路径, 排序结果)。特征提取（读文件 + 正则）在 jobs 个进程中并行，
+    主进程每攒够 BATCH_SIZE 页做一次矩阵乘法；内存只与批大小有关。
+    """
+    def batches(features_iter):
+        batch = []
+        for path, features in zip(paths, features_iter):
+            batch.append((path, features))
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def emit(features_iter):
+        for batch in batches(features_iter):
+            ranked = index.rank_features([features for _, features in batch], top)
+            yield from zip((path for path, _ in batch), ranked)
+
+    if jobs <= 1 or len(paths) < 2:
+        yield from emit(map(_path_features, paths))
+        return
+    workers = min(jobs, len(paths))
+    with Pool(processes=workers) as pool:
+        yield from emit(pool.imap(_path_features, paths, max(1, min(64, len(paths) // (workers * 8)))))
+
+
+# ============================================================
+# 命令行
+# ============================================================
+
+def _collect_pages(args: list) -> list:
+    paths = []
+    for arg in args:
+        if os.path.isdir(arg):
+            paths.extend(sorted(glob.glob(os.path.join(arg, "**", "*.html"), recursive=True)))
+        else:
+            paths.append(arg)
+    return paths
+
+
+def main():
+    """命令行入口"""
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    if not args or args[0] not in ("build", "classify"):
+        print("模板指纹索引")
+        print()
+        print("用法:")
+        print("  python template_index.py build [--output=PATH]")
+        print("  python template_index.py classify <page.html | 目录> ... [--top=3] [--jobs=N] [--json]")
+        sys.exit(1)
+    if np is None:
+        print("✗ 需要 NumPy：pip install numpy", file=sys.stderr)
+        sys.exit(1)
+
+    if args[0] == "build":
+        output = flags.get("output") or DEFAULT_INDEX_PATH
+        started = time.perf_counter()
+        index = TemplateIndex.build()
+        index.save(output)
+        cal = index.calibration
+        print(f"✓ 索引已写入: {output}（{len(index.template_ids)} 个模板, {len(index.vocab)} 个特征, "
+              f"{os.path.getsize(output) / 1024:.1f} KB, {(time.perf_counter() - started) * 1000:.0f} ms）")
+        print(f"  温度 T={index.temperature}：校准样本识别准确率 {cal['heldout_accuracy']:.0%}，"
+              f"平均置信度 {cal['mean_confidence']:.0%}（NLL {cal['nll']:.3f}）")
+        return 0
+
+    index = load_index()
+    if index is None:
+        print(f"✗ 无法建立索引（模板目录: {TEMPLATE_DIR}）", file=sys.stderr)
+        sys.exit(1)
+    paths = _collect_pages(args[1:])
+    top = int(flags.get("top") or 3)
+    jobs = int(flags["jobs"]) if flags.get("jobs") else (os.cpu_count() or 1)
+    started = time.perf_counter()
+    results = []
+    counts = Counter()
+    for path, matches in classify_paths(paths, index, top, jobs):
+        counts[matches[0]["template_id"]] += 1
+        if "json" in flags:
+            results.append({"path": path, "matches": matches})
+            continue
+        best = matches[0]
+        others = ", ".join(f"{m['template_id']} {m['similarity']:.3f}" for m in matches[1:])
+        print(f"  {best['template_id']}  置信度 {best['confidence']:.0%}  相似度 {best['similarity']:.3f}"
+              f"  {path}" + (f"（其次: {others}）" if others else ""))
+    elapsed = time.perf_counter() - started
+
+    if "json" in flags:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    rate = len(paths) / elapsed if elapsed > 0 else float("inf")
+    print(f"\n  {len(paths)} 个页面，{elapsed * 1000:.1f} ms（{rate:,.0f} 页/秒，{jobs} 个进程）")
+    print("  " + ", ".join(f"{tid} ×{n}" for tid, n in sorted(counts.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    main()